@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Time pandasDOC create_table with the cells and the xml engine on frames of growing length
+
+Usage: python benchmarks/bench_doc_table.py [--rows 10 20 40 80] [--cols 15] [--engines cells xml]
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import os
+import sys
+import time
+
+import docx
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from mspandas import pandasDOC
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--rows', type=int, nargs='+', default=[10, 20, 40, 80])
+	parser.add_argument('--cols', type=int, default=15)
+	parser.add_argument('--engines', nargs='+', default=['cells', 'xml'])
+	args = parser.parse_args()
+
+	handler = pandasDOC.Handler()
+	rng = np.random.RandomState(0)
+	print('{:>8}'.format('cells') + ''.join('{:>10}'.format(engine) for engine in args.engines))
+	for rows in args.rows:
+		df = pd.DataFrame(rng.rand(rows, args.cols), columns=[str(col) for col in range(args.cols)])
+		times = []
+		for engine in args.engines:
+			doc = docx.Document()
+			start = time.time()
+			handler.create_table(doc, df.copy(), engine=engine)
+			times.append(time.time() - start)
+		print('{:>8}'.format(rows * args.cols) + ''.join('{:>9.2f}s'.format(t) for t in times))
+		sys.stdout.flush()
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Time formatting.format_numbers against formatting every value with str.format, and check that they agree
+
+Usage: python benchmarks/bench_number_format.py [--values 200000] [--formats '{:,.2f}' '{:.1%}' ...]
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from mspandas import formatting
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--values', type=int, default=200000)
+	parser.add_argument('--formats', nargs='+', default=['{:,.2f}', '{:.1%}', '{:,.0f}', '${:,.2f}', '{:.2e}'])
+	args = parser.parse_args()
+
+	rng = np.random.RandomState(0)
+	series = pd.Series(rng.randn(args.values) * 10.0 ** rng.randint(-3, 9, args.values))
+	print('{:>12}{:>12}{:>16}{:>8}'.format('format', 'str.format', 'format_numbers', 'same'))
+	for fmt in args.formats:
+		start = time.time()
+		expected = series.apply(lambda x: fmt.format(x))
+		loop = time.time() - start
+		start = time.time()
+		formatted = formatting.format_numbers(series, fmt)
+		vectorized = time.time() - start
+		print('{:>12}{:>11.2f}s{:>15.2f}s{:>8}'.format(fmt, loop, vectorized, str(list(formatted) == list(expected))))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Compare the time and peak memory of building a document and saving it against streaming it with Handler.stream_document
+
+Each mode runs in its own process so that its peak resident memory is measured on its own (unix only).
+
+Usage: python benchmarks/bench_stream_document.py [--tables 10 20 40] [--rows 300] [--cols 10]
+"""
+
+from __future__ import division, print_function
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import docx
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from mspandas import pandasDOC
+
+
+def build(mode, tables, rows, cols, path):
+	"""Write a document of headings and tables, either saved at the end or streamed, return the seconds taken"""
+	handler = pandasDOC.Handler()
+	rng = np.random.RandomState(0)
+	doc = docx.Document()
+	start = time.time()
+	if mode == 'save':
+		for i in range(tables):
+			doc.add_paragraph('Table {}'.format(i), style='Heading 1')
+			handler.create_table(doc, pd.DataFrame(rng.rand(rows, cols)), engine='xml')
+		doc.save(path)
+	else:
+		with handler.stream_document(doc, path) as writer:
+			for i in range(tables):
+				writer.add_paragraph('Table {}'.format(i), style='Heading 1')
+				writer.add_table(pd.DataFrame(rng.rand(rows, cols)), engine='xml')
+	return time.time() - start
+
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument('--tables', type=int, nargs='+', default=[10, 20, 40])
+	parser.add_argument('--rows', type=int, default=300)
+	parser.add_argument('--cols', type=int, default=10)
+	parser.add_argument('--mode', choices=['save', 'stream'], help='run a single mode in this process and print its seconds and peak memory')
+	args = parser.parse_args()
+
+	if not args.mode is None:
+		fd, path = tempfile.mkstemp(suffix='.docx')
+		os.close(fd)
+		try:
+			seconds = build(args.mode, args.tables[0], args.rows, args.cols, path)
+		finally:
+			os.remove(path)
+		# kilobytes on linux, bytes on macos
+		peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		if sys.platform == 'darwin':
+			peak = peak // 1024
+		print(seconds, peak)
+		return
+
+	print('{:>8}{:>10}{:>12}{:>10}{:>12}'.format('tables', 'save', 'save MB', 'stream', 'stream MB'))
+	for tables in args.tables:
+		row = []
+		for mode in ('save', 'stream'):
+			output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--mode', mode, '--tables', str(tables),
+											  '--rows', str(args.rows), '--cols', str(args.cols)])
+			seconds, peak = output.split()[-2:]
+			row += [float(seconds), int(peak) / 1024]
+		print('{:>8}{:>9.2f}s{:>12.0f}{:>9.2f}s{:>12.0f}'.format(tables, *row))
+		sys.stdout.flush()
+
+
+if __name__ == '__main__':
+	main()
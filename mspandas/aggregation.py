@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Aggregation stage shared by pandasPPT and pandasDOC
+
+Long-format data (one row per observation) is pivoted to the wide dataframe that create_table and create_chart write, as df.pivot_table
+would. The key columns of a source dataframe are factorized once and kept while the dataframe lives, so that several pivots of the same
+source (e.g. several charts of one dataset) pay for one pass over each key, and a pivot asked for again is returned as it was computed.
+
+Sources are taken as read only while they are memoized, call clear() after changing one in place.
+"""
+
+from __future__ import division
+
+import weakref
+
+import pandas as pd
+import numpy as np
+
+from mspandas.cache import normalize
+
+
+# memoized factorizations and pivots of every source dataframe, by id
+_sources = {}
+
+
+def _as_list(keys):
+	if keys is None:
+		return []
+	return list(keys) if isinstance(keys, (list, tuple)) else [keys]
+
+
+def _source(df):
+	"""Return the memo of a source dataframe, a new one when it was not seen before or its shape or columns changed
+	"""
+	key = id(df)
+	fingerprint = (df.shape, tuple(df.columns))
+	memo = _sources.get(key)
+	if memo is None or memo['ref']() is not df or memo['fingerprint'] != fingerprint:
+		def forget(ref, key=key):
+			# the id may already hold the memo of a newer dataframe
+			if key in _sources and _sources[key]['ref'] is ref:
+				del _sources[key]
+		memo = {'ref': weakref.ref(df, forget), 'fingerprint': fingerprint, 'codes': {}, 'pivots': {}}
+		_sources[key] = memo
+	return memo
+
+
+def factorize(df, column):
+	"""Return the codes and sorted distinct values of a key column of a source dataframe, memoized
+
+	Parameters
+	----------
+	df: pd.DataFrame
+		source dataframe
+	column: str
+		key column
+
+	Returns
+	-------
+	codes: np.ndarray
+		integer array of the position of each value in uniques, -1 for missing values
+	uniques: pd.Index
+		distinct values, sorted when they can be, values of a categorical column in the order of its categories and only those observed
+	"""
+	memo = _source(df)['codes']
+	if not column in memo:
+		try:
+			codes, uniques = pd.factorize(df[column], sort=True)
+		except TypeError:
+			# values which do not sort (e.g. mixed types)
+			codes, uniques = pd.factorize(df[column])
+		if len(uniques) < 2**31:
+			codes = codes.astype(np.int32)
+		memo[column] = (codes, pd.Index(uniques))
+	return memo[column]
+
+
+def pivot(df, index, columns=None, values=None, aggfunc='mean'):
+	"""Pivot long-format data to a wide dataframe, as df.pivot_table(index=index, columns=columns, values=values, aggfunc=aggfunc, observed=True)
+
+	Parameters
+	----------
+	df: pd.DataFrame
+		source dataframe, one row per observation
+	index: str or list
+		key columns of the rows of the pivot
+
+	Returns
+	-------
+	df: pd.DataFrame
+		aggregated values, rows and columns sorted by key, NaN where a combination of keys has no observation
+
+	Keyword Arguements
+	------------------
+	columns: str or list
+		key columns of the columns of the pivot, default None
+	values: str or list
+		columns aggregated, default None (all numeric columns which are not keys), with a list (or no columns keys) the columns of the pivot
+		start with a level of value columns
+	aggfunc: str or function
+		aggregation of the values of every combination of keys, as passed to groupby().agg (e.g. 'sum', 'mean', 'count', 'max'), default 'mean'
+
+	Notes
+	-----
+	The key columns of df are factorized once and memoized with every pivot of df, rows with a missing key are left out as pivot_table does.
+	Categorical keys keep only their observed categories (pivot_table keeps all of them unless observed=True), in the order of the categories.
+
+	df is taken as read only while it is memoized: a pivot of df changed in place with the same shape and columns is returned as it was
+	computed before the change, call clear(df) after changing it.
+	"""
+	if not isinstance(df, pd.DataFrame):
+		raise TypeError('pivot aggregates a dataframe, not {}'.format(type(df).__name__))
+	index, columns = _as_list(index), _as_list(columns)
+	keys = index + columns
+	if values is None:
+		value_columns = [column for column,dtype in df.dtypes.items() if not column in keys and pd.api.types.is_numeric_dtype(dtype)]
+		try:
+			# in order of their names, as pivot_table does
+			value_columns = sorted(value_columns)
+		except TypeError:
+			pass
+	else:
+		value_columns = _as_list(values)
+
+	memo = _source(df)['pivots']
+	try:
+		spec = normalize([index, columns, values, aggfunc])
+	except TypeError:
+		# aggfunc without a stable key (e.g. a lambda), the pivot is not memoized
+		spec = None
+	if spec in memo:
+		return memo[spec].copy()
+
+	# group of every row from the codes of its keys, rows with missing keys have none
+	factorized = [factorize(df, key) for key in keys]
+	sizes = [len(uniques) for codes,uniques in factorized]
+	if np.prod(np.array(sizes, dtype=float)) >= 2**63:
+		raise ValueError('too many combinations of keys to pivot: {}'.format(' x '.join(str(size) for size in sizes)))
+	ids = np.zeros(len(df), dtype=np.int64)
+	valid = np.ones(len(df), dtype=bool)
+	for (codes,uniques),size in zip(factorized, sizes):
+		ids = ids * size + codes
+		valid &= codes >= 0
+	frame = df[value_columns]
+	if not valid.all():
+		frame, ids = frame[valid], ids[valid]
+
+	# aggregate every group at once, groups in order of their keys
+	aggregated = frame.groupby(ids, sort=True).agg(aggfunc)
+	positions = np.unravel_index(aggregated.index.values, sizes) if len(keys) > 0 else []
+	aggregated.index = pd.MultiIndex(levels=[uniques for codes,uniques in factorized], codes=list(positions), names=keys)
+
+	if len(columns) > 0:
+		result = aggregated.unstack(level=list(range(len(index), len(keys))))
+		if not isinstance(values, (list, tuple)) and not values is None:
+			# a single value column is left out of the columns, as pivot_table does
+			result.columns = result.columns.droplevel(0)
+	else:
+		result = aggregated
+	if len(index) == 1:
+		result.index = result.index.get_level_values(0)
+	else:
+		result.index = result.index.remove_unused_levels()
+
+	if not spec is None:
+		memo[spec] = result
+	return result.copy()
+
+
+def clear(df=None):
+	"""Forget the memoized factorizations and pivots of a source dataframe, or of all dataframes
+
+	Keyword Arguements
+	------------------
+	df: pd.DataFrame
+		source dataframe, default None (all)
+	"""
+	if df is None:
+		_sources.clear()
+	else:
+		_sources.pop(id(df), None)
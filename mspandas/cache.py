@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""Content-addressed cache of rendered tables and charts
+
+Entries are keyed by a hash of the dataframe (values, index, columns and dtypes) and the normalized keyword arguments of the call
+that rendered them, and hold the generated xml fragments (and chart workbook) as bytes. Recent entries are kept in memory, least
+recently used first out, and all entries are stored in a cache directory capped in size, so that later processes find them too.
+"""
+
+from __future__ import division
+
+import collections
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import zipfile
+
+import pandas as pd
+
+from mspandas.template import CACHE_DIR
+
+
+# default directory of stored entries
+RENDER_DIR = os.path.join(CACHE_DIR, 'render')
+
+# version of the stored entries, part of every key so that entries of other versions are never read
+VERSION = 2
+
+
+def _function_name(value):
+	"""Return the module and qualified name of a module level function (or class attribute), None for anything else
+	"""
+	module, name = getattr(value, '__module__', None), getattr(value, '__qualname__', getattr(value, '__name__', None))
+	if module is None or name is None:
+		return None
+	# the function found under its name, lambdas, closures and bound methods are not
+	found = sys.modules.get(module)
+	for attribute in name.split('.'):
+		found = getattr(found, attribute, None)
+	return module + '.' + name if found is value else None
+
+
+def normalize(value):
+	"""Return a hashable, order independent text of a keyword argument value
+
+	Dicts are sorted by key, lists and tuples are normalized item by item, module level functions are taken by their module and name
+	and anything else by its repr. Raises TypeError for values without a stable text, i.e. whose repr holds a memory address
+	(lambdas, closures, bound methods and objects without a repr), they could match other values of a later call or process.
+	"""
+	if isinstance(value, dict):
+		return '{' + ', '.join(sorted(normalize(k) + ': ' + normalize(v) for k,v in value.items())) + '}'
+	if isinstance(value, (list, tuple)):
+		return '[' + ', '.join(normalize(v) for v in value) + ']'
+	if callable(value) and not isinstance(value, type):
+		name = _function_name(value)
+		if not name is None:
+			return '<function ' + name + '>'
+	text = repr(value)
+	if ' at 0x' in text:
+		raise TypeError('{} has no stable key'.format(text))
+	return text
+
+
+def frame_hash(df):
+	"""Return the sha1 of a dataframe, its values, index, columns and dtypes
+
+	Parameters
+	----------
+	df: pd.DataFrame
+		pandas dataframe object
+
+	Returns
+	-------
+	digest: str
+		hex sha1, None when the values can not be hashed (e.g. lists in cells)
+	"""
+	h = hashlib.sha1()
+	try:
+		h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+		for labels in (df.index, df.columns):
+			h.update(normalize([list(labels.names)] + [list(labels.get_level_values(level)) for level in range(labels.nlevels)]).encode('utf-8'))
+	except TypeError:
+		return None
+	h.update(normalize([str(dtype) for dtype in df.dtypes]).encode('utf-8'))
+	return h.hexdigest()
+
+
+class RenderCache():
+	"""Cache of rendered tables and charts, in memory and in a cache directory
+
+	Pass to a Handler to opt in, e.g. pandasPPT.Handler(cache=RenderCache()).
+
+	Keyword Arguements
+	------------------
+	max_entries: int
+		number of entries kept in memory, default 128
+	cache_dir: str
+		directory entries are stored in, default mspandas.cache.RENDER_DIR, None to keep them in memory only
+	max_bytes: int
+		size the cache directory is capped to, least recently used entries are removed past it, default 256MB
+
+	Methods
+	-------
+	key(kind, df, arguments)
+		Return the key of a render
+	get(key)
+		Return the entry of a key, None when it is not cached
+	set(key, entry)
+		Store an entry
+	clear()
+		Remove all entries from memory and the cache directory
+	"""
+
+	def __init__(self, max_entries=128, cache_dir=RENDER_DIR, max_bytes=256*2**20):
+		self.max_entries = max_entries
+		self.cache_dir = cache_dir
+		self.max_bytes = max_bytes
+		self._entries = collections.OrderedDict()
+
+	def key(self, kind, df, arguments, *extra):
+		"""Return the key of a render
+
+		Parameters
+		----------
+		kind: str
+			what is rendered, e.g. 'pandasPPT.create_table'
+		df: pd.DataFrame
+			rendered dataframe
+		arguments: dict
+			keyword arguments of the render
+		extra:
+			anything else the output depends on, e.g. the width of the target shape
+
+		Returns
+		-------
+		key: str
+			hex sha1, None when the dataframe can not be hashed or an argument has no stable key (e.g. a lambda, see normalize)
+		"""
+		digest = frame_hash(df)
+		if digest is None:
+			return None
+		try:
+			text = normalize([VERSION, kind, digest, arguments, list(extra)])
+		except TypeError:
+			return None
+		return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+	def get(self, key):
+		"""Return the entry of a key, None when it is not cached
+
+		Parameters
+		----------
+		key: str
+			key returned by RenderCache.key
+
+		Returns
+		-------
+		entry: dict
+			map of names to bytes, as stored with RenderCache.set
+		"""
+		# memory
+		try:
+			entry = self._entries.pop(key)
+			self._entries[key] = entry
+			return entry
+		except KeyError:
+			pass
+
+		# cache directory
+		path = self._path(key)
+		if path is None or not os.path.exists(path):
+			return None
+		try:
+			with zipfile.ZipFile(path) as f:
+				entry = dict((name, f.read(name)) for name in f.namelist())
+			# recently used
+			os.utime(path, None)
+		except (IOError, OSError, zipfile.BadZipfile):
+			# removed by another process, or unreadable
+			return None
+		self._remember(key, entry)
+		return entry
+
+	def set(self, key, entry):
+		"""Store an entry
+
+		Parameters
+		----------
+		key: str
+			key returned by RenderCache.key
+		entry: dict
+			map of names to bytes
+		"""
+		self._remember(key, entry)
+
+		path = self._path(key)
+		if path is None:
+			return
+		if not os.path.isdir(self.cache_dir):
+			try:
+				os.makedirs(self.cache_dir)
+			except OSError:
+				# created by another process
+				pass
+		blob = io.BytesIO()
+		with zipfile.ZipFile(blob, 'w', zipfile.ZIP_DEFLATED) as f:
+			for name,data in entry.items():
+				f.writestr(name, data)
+		with tempfile.NamedTemporaryFile('wb', dir=self.cache_dir, suffix='.tmp', delete=False) as f:
+			f.write(blob.getvalue())
+		try:
+			os.replace(f.name, path)
+		except AttributeError:
+			# python 2.7
+			if os.path.exists(path):
+				os.remove(path)
+			os.rename(f.name, path)
+		self._evict()
+
+	def clear(self):
+		"""Remove all entries from memory and the cache directory
+		"""
+		self._entries.clear()
+		if self.cache_dir is None or not os.path.isdir(self.cache_dir):
+			return
+		for name in os.listdir(self.cache_dir):
+			if name.endswith('.zip'):
+				try:
+					os.remove(os.path.join(self.cache_dir, name))
+				except OSError:
+					pass
+
+	def _path(self, key):
+		return None if self.cache_dir is None else os.path.join(self.cache_dir, key + '.zip')
+
+	def _remember(self, key, entry):
+		"""Keep an entry in memory, dropping the least recently used past max_entries
+		"""
+		self._entries.pop(key, None)
+		self._entries[key] = entry
+		while len(self._entries) > self.max_entries:
+			self._entries.popitem(last=False)
+
+	def _evict(self):
+		"""Remove the least recently used entries of the cache directory past max_bytes
+		"""
+		files = []
+		for name in os.listdir(self.cache_dir):
+			if name.endswith('.zip'):
+				try:
+					stat = os.stat(os.path.join(self.cache_dir, name))
+				except OSError:
+					continue
+				files.append((stat.st_mtime, stat.st_size, name))
+		size = sum(f[1] for f in files)
+		for mtime,nbytes,name in sorted(files):
+			if size <= self.max_bytes:
+				break
+			try:
+				os.remove(os.path.join(self.cache_dir, name))
+			except OSError:
+				pass
+			size -= nbytes
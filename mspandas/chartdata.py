@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""Chart data written straight from dataframe columns
+
+python-pptx renders the number caches of chart series and the embedded workbook one point (and cell) at a time from a ChartData object.
+These helpers render the same caches, and a minimal embedded workbook, from whole numpy columns instead.
+"""
+
+from __future__ import division
+
+import datetime
+import io
+import numbers
+import zipfile
+
+import pandas as pd
+import numpy as np
+
+from pptx.parts.embeddedpackage import EmbeddedXlsxPart
+
+
+# excel date numbers count days from 1899-12-31 (or 1904-01-01), 1900 is taken to be a leap year
+EPOCH_1900 = np.datetime64('1899-12-31', 'D')
+EPOCH_1904 = np.datetime64('1904-01-01', 'D')
+
+# date number format of categories, as written by python-pptx
+DATE_FORMAT = r'yyyy\-mm\-dd'
+
+
+def escape(text):
+	"""Escape an array of text for xml
+	"""
+	text = pd.Series(text, dtype=object)
+	return text.str.replace('&', '&amp;').str.replace('<', '&lt;').str.replace('>', '&gt;').values
+
+
+def number_text(values):
+	"""Render an array of numbers as python would print them (e.g. '0.1', '1e+16', '3')
+
+	Parameters
+	----------
+	values: array-like
+		numeric values
+
+	Returns
+	-------
+	text: np.ndarray
+		object array of text
+	"""
+	values = np.asarray(values)
+	if values.dtype.kind in 'iufb':
+		return values.astype(str).astype(object)
+	return np.array([str(value) for value in values], dtype=object)
+
+
+def excel_dates(values, date_1904=False):
+	"""Convert dates to excel date numbers (whole days)
+
+	Parameters
+	----------
+	values: array-like
+		dates, datetime.date, datetime.datetime or np.datetime64
+
+	Returns
+	-------
+	days: np.ndarray
+		float array of excel date numbers
+	"""
+	days = pd.to_datetime(pd.Index(values)).values.astype('datetime64[D]')
+	if date_1904:
+		return (days - EPOCH_1904).astype(np.int64).astype(float)
+	days = (days - EPOCH_1900).astype(np.int64)
+	# excel mistakes 1900 for a leap year
+	return np.where(days > 59, days + 1, days).astype(float)
+
+
+def date_index(index):
+	"""Return chart categories which are dates as a pd.DatetimeIndex of local times, None when they are not dates
+
+	Periods are taken at their start and times with a time zone at their local (wall clock) time, as excel dates have no time zone.
+
+	Parameters
+	----------
+	index: pd.Index
+		dataframe index, labels are categories
+
+	Returns
+	-------
+	dates: pd.DatetimeIndex
+		dates of the categories, with the name of index
+	"""
+	if isinstance(index, pd.MultiIndex):
+		return None
+	if isinstance(index, pd.PeriodIndex):
+		return index.to_timestamp()
+	if isinstance(index, pd.DatetimeIndex):
+		return index if index.tz is None else index.tz_localize(None)
+	if index.dtype == object and len(index) > 0 and isinstance(index[0], (datetime.date, np.datetime64)):
+		try:
+			dates = pd.to_datetime(index)
+		except (TypeError, ValueError):
+			# mixed with labels which are not dates
+			return None
+		return date_index(dates) if isinstance(dates, pd.DatetimeIndex) else None
+	return None
+
+
+def base_time_unit(dates):
+	"""Return the base unit of a date axis, 'years' when all dates are the first of a year, 'months' the first of a month, else 'days'
+	"""
+	if len(dates) > 0 and (dates.day == 1).all():
+		return 'years' if (dates.month == 1).all() else 'months'
+	return 'days'
+
+
+def categories(index, date_1904=False):
+	"""Render chart categories as python-pptx would from df.index
+
+	Parameters
+	----------
+	index: pd.Index
+		dataframe index, labels are categories
+
+	Returns
+	-------
+	numeric: bool
+		whether or not the categories are numbers (or dates), typed by the first label
+	dates: bool
+		whether or not the categories are dates
+	values: np.ndarray
+		category values written to the workbook, numbers (excel date numbers with the time of day for dates) or text
+	text: np.ndarray
+		object array of category text written to the chart cache
+	"""
+	if isinstance(index, pd.DatetimeIndex):
+		# converted as a whole, without boxing every label
+		dates = index
+	else:
+		labels = np.asarray(index, dtype=object)
+		first = labels[0] if len(labels) > 0 else ''
+		dates = pd.to_datetime(pd.Index(labels)) if isinstance(first, (datetime.date, datetime.datetime, np.datetime64)) else None
+	if not dates is None:
+		days = excel_dates(dates, date_1904=date_1904)
+		# whole days print as '%.1f', as python-pptx writes them to the chart, the workbook keeps the time of day
+		time = (dates - dates.normalize()).values.astype('timedelta64[ns]').astype(np.int64) / 86400e9
+		return True, True, days + time, number_text(days)
+	if isinstance(first, numbers.Number):
+		values = np.asarray(index)
+		return True, False, values, number_text(values if values.dtype.kind in 'iufb' else labels)
+	text = np.array(['' if label is None else str(label) for label in labels], dtype=object)
+	return False, False, text, text
+
+
+def category_levels(index):
+	"""Return the levels of multi-level chart categories from a pd.MultiIndex, innermost first as python-pptx lays them out
+
+	A category of an outer level spans the run of points where its label (and the labels of all levels outside it) repeat,
+	the innermost level holds every point. Runs are found from the index codes, and the labels of each level are converted to text once.
+
+	Parameters
+	----------
+	index: pd.MultiIndex
+		dataframe index, one level of categories per index level
+
+	Returns
+	-------
+	levels: list
+		(offsets, text) of every level, innermost first, offsets is an integer array of the first point of every category and text
+		an object array of their labels (dates as 'yyyy-mm-dd' when they have no time, missing labels as '')
+	"""
+	try:
+		codes = index.codes
+	except AttributeError:
+		# pandas < 0.24
+		codes = index.labels
+	changed = np.zeros(max(len(index) - 1, 0), dtype=bool)
+	levels = []
+	for level in range(index.nlevels):
+		level_codes = np.asarray(codes[level])
+		changed = changed | (level_codes[1:] != level_codes[:-1])
+		if level == index.nlevels - 1:
+			offsets = np.arange(len(index))
+		else:
+			offsets = np.flatnonzero(np.concatenate([[True], changed])) if len(index) > 0 else np.zeros(0, dtype=np.int64)
+		# missing labels have code -1, the last item
+		text = np.append(level_text(index.levels[level]), np.array([''], dtype=object))
+		levels.append((offsets, text[level_codes[offsets]]))
+	return levels[::-1]
+
+
+def level_text(labels):
+	"""Convert the distinct labels of a category level to text
+	"""
+	if isinstance(labels, pd.DatetimeIndex) and (labels.normalize() == labels).all():
+		return np.asarray(labels.strftime('%Y-%m-%d'), dtype=object)
+	if labels.dtype.kind in 'iufb':
+		return np.asarray(labels).astype(str).astype(object)
+	return np.array(['' if label is None else str(label) for label in labels], dtype=object)
+
+
+def levels_cache_xml(levels, count):
+	"""Render the point count and levels of a multi-level category cache (c:multiLvlStrCache)
+
+	Parameters
+	----------
+	levels: list
+		(offsets, text) of every level, innermost first, see category_levels
+	count: int
+		number of points
+
+	Returns
+	-------
+	xml: str
+		c:ptCount and c:lvl elements, with the c namespace prefix
+	"""
+	xml = '<c:ptCount val="{}"/>'.format(count)
+	for offsets,text in levels:
+		idx = np.asarray(offsets).astype(str).astype(object)
+		xml += '<c:lvl>' + ''.join('<c:pt idx="' + idx + '"><c:v>' + escape(text) + '</c:v></c:pt>') + '</c:lvl>'
+	return xml
+
+
+def cache_xml(text):
+	"""Render the point count and points of a chart cache (c:numCache or c:strCache)
+
+	Parameters
+	----------
+	text: np.ndarray
+		object array of point text, already escaped
+
+	Returns
+	-------
+	xml: str
+		c:ptCount and c:pt elements, with the c namespace prefix
+	"""
+	idx = np.arange(len(text)).astype(str).astype(object)
+	points = '<c:pt idx="' + idx + '"><c:v>' + text + '</c:v></c:pt>'
+	return '<c:ptCount val="{}"/>'.format(len(text)) + ''.join(points)
+
+
+def cell_numbers(values):
+	"""Render an array of numbers as worksheet cell values, as xlsxwriter writes them ('%.16G')
+	"""
+	return np.char.mod('%.16G', np.asarray(values, dtype=float)).astype(object)
+
+
+def column_letter(number):
+	"""Return the excel column reference of a column number, e.g. 1 is 'A' and 28 is 'AB'
+	"""
+	letters = ''
+	while number:
+		number, remainder = divmod(number - 1, 26)
+		letters = chr(ord('A') + remainder) + letters
+	return letters
+
+
+def _cells(refs, values, numeric, style=0):
+	"""Render a column of worksheet cells
+	"""
+	s = ' s="{}"'.format(style) if style else ''
+	if numeric:
+		return '<c r="' + refs + '"' + s + '><v>' + values + '</v></c>'
+	return '<c r="' + refs + '" t="inlineStr"' + s + '><is><t xml:space="preserve">' + values + '</t></is></c>'
+
+
+def workbook_blob(category_values, category_numeric, category_format, names, columns, number_format='General', category_levels=None):
+	"""Write a minimal xlsx workbook holding chart data in the layout of python-pptx
+
+	Categories are written to column A from row 2, series names to row 1 from column B and series values below their name.
+	Multi-level categories are written one column per level, outermost first, each label in the row of its first point, and series follow them.
+
+	Parameters
+	----------
+	category_values: np.ndarray
+		category numbers or text, see categories
+	category_numeric: bool
+		whether or not the categories are numbers
+	category_format: str
+		excel number format of the categories, e.g. 'General' or DATE_FORMAT
+	names: list
+		series names
+	columns: list
+		numeric arrays of series values
+
+	Returns
+	-------
+	blob: bytes
+		xlsx file
+
+	Keyword Arguements
+	------------------
+	number_format: str
+		excel number format of the series values, default 'General'
+	category_levels: list
+		(offsets, text) of every level of multi-level categories, innermost first (see category_levels), in place of category_values,
+		default None
+	"""
+
+	num_rows = len(category_values) + 1
+	rows = np.arange(2, num_rows + 1).astype(str).astype(object)
+
+	formats, style = _number_formats(category_format, number_format)
+
+	header = []
+	if category_levels is None:
+		depth = 1
+		body = [_cells('A' + rows, cell_numbers(category_values) if category_numeric else escape(category_values), category_numeric, style(category_format))]
+	else:
+		depth = len(category_levels)
+		body = []
+		for i,(offsets,text) in enumerate(category_levels[::-1]):
+			# missing labels are left blank
+			offsets, text = offsets[text != ''], text[text != '']
+			cells = np.full(len(rows), '', dtype=object)
+			cells[offsets] = _cells(column_letter(i + 1) + rows[offsets], escape(text), False)
+			body.append(cells)
+	for i,(name,values) in enumerate(zip(names, columns)):
+		col = column_letter(i + depth + 1)
+		header.append(_cells(np.array([col + '1'], dtype=object), escape([name]), False)[0])
+		body.append(_cells(col + rows, cell_numbers(values), True, style(number_format)))
+	body = np.column_stack(body) if len(rows) > 0 else np.empty((0, len(body)), dtype=object)
+	sheet_rows = ['<row r="1">' + ''.join(header) + '</row>']
+	sheet_rows += list('<row r="' + rows + '">' + np.array([''.join(row) for row in body], dtype=object) + '</row>')
+
+	return _xlsx_blob(sheet_rows, 'A1:{}{}'.format(column_letter(len(names) + depth), num_rows), formats,
+		cols='<cols><col min="1" max="{}" width="10.7109375" customWidth="1"/></cols>'.format(depth))
+
+
+def xy_header_row(series, points):
+	"""Return the worksheet row of the name of a series of an XY (or bubble) chart, its points follow from the next row
+
+	Series are written one below the other with a blank row in between, as python-pptx lays out XY chart data.
+	"""
+	return series * (points + 2) + 1
+
+
+def xy_workbook_blob(names, x_values, columns, bubble_sizes=None, number_format='General'):
+	"""Write a minimal xlsx workbook holding XY (or bubble) chart data in the layout of python-pptx
+
+	Each series is written to its own table, its name in column B of the first row, then x values in column A, y values in column B
+	and bubble sizes (headed 'Size') in column C, tables are separated by a blank row (see xy_header_row).
+
+	Parameters
+	----------
+	names: list
+		series names
+	x_values: np.ndarray
+		numeric array of x values, shared by all series
+	columns: list
+		numeric arrays of series y values
+
+	Returns
+	-------
+	blob: bytes
+		xlsx file
+
+	Keyword Arguements
+	------------------
+	bubble_sizes: np.ndarray
+		numeric array of bubble sizes shared by all series, default None (XY chart)
+	number_format: str
+		excel number format of the series y values, default 'General'
+	"""
+	points = len(x_values)
+	formats, style = _number_formats(number_format)
+	x_text = cell_numbers(x_values)
+	size_text = None if bubble_sizes is None else cell_numbers(bubble_sizes)
+
+	sheet_rows = []
+	for i,(name,values) in enumerate(zip(names, columns)):
+		header = xy_header_row(i, points)
+		head = _cells(np.array(['B{}'.format(header)], dtype=object), escape([name]), False)[0]
+		if not size_text is None:
+			head += _cells(np.array(['C{}'.format(header)], dtype=object), np.array(['Size'], dtype=object), False)[0]
+		sheet_rows.append('<row r="{}">{}</row>'.format(header, head))
+		rows = np.arange(header + 1, header + points + 1).astype(str).astype(object)
+		cells = _cells('A' + rows, x_text, True) + _cells('B' + rows, cell_numbers(values), True, style(number_format))
+		if not size_text is None:
+			cells = cells + _cells('C' + rows, size_text, True)
+		sheet_rows += list('<row r="' + rows + '">' + cells + '</row>')
+
+	last_row = xy_header_row(len(names) - 1, points) + points if len(names) > 0 else 1
+	return _xlsx_blob(sheet_rows, 'A1:{}{}'.format('B' if bubble_sizes is None else 'C', last_row), formats)
+
+
+def _number_formats(*formats):
+	"""Return the custom number formats of a workbook, and a function returning the style of a number format
+	"""
+	# number formats, 0 is General and 164 onwards are custom
+	custom = []
+	for fmt in formats:
+		if fmt != 'General' and not fmt in custom:
+			custom.append(fmt)
+	def style(fmt):
+		return 0 if fmt == 'General' else custom.index(fmt) + 1
+	return custom, style
+
+
+def _xlsx_blob(sheet_rows, dimension, formats, cols=''):
+	"""Package worksheet rows in a minimal xlsx workbook of a single sheet, Sheet1
+
+	Parameters
+	----------
+	sheet_rows: list
+		row elements of the worksheet, in order
+	dimension: str
+		range of the worksheet cells, e.g. 'A1:C10'
+	formats: list
+		custom number formats, styles 1 onwards (see _number_formats)
+
+	Returns
+	-------
+	blob: bytes
+		xlsx file
+	"""
+	ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+	sheet = (
+		'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+		'<worksheet {}><dimension ref="{}"/>{}'
+		'<sheetData>{}</sheetData></worksheet>'
+	).format(ns, dimension, cols, ''.join(sheet_rows))
+	styles = (
+		'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+		'<styleSheet {}>{}'
+		'<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+		'<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+		'<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+		'<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+		'<cellXfs count="{}"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>{}</cellXfs>'
+		'<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+		'</styleSheet>'
+	).format(
+		ns,
+		'<numFmts count="{}">{}</numFmts>'.format(len(formats), ''.join(['<numFmt numFmtId="{}" formatCode="{}"/>'.format(164 + i, escape([fmt])[0].replace('"', '&quot;')) for i,fmt in enumerate(formats)])) if formats else '',
+		len(formats) + 1,
+		''.join(['<xf numFmtId="{}" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'.format(164 + i) for i in range(len(formats))]),
+	)
+	workbook = (
+		'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+		'<workbook {} xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+		'<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+	).format(ns)
+	package_rels = (
+		'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+		'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+		'<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+		'</Relationships>'
+	)
+	workbook_rels = (
+		'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+		'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+		'<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+		'<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+		'</Relationships>'
+	)
+	content_types = (
+		'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+		'<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+		'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+		'<Default Extension="xml" ContentType="application/xml"/>'
+		'<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+		'<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+		'<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+		'</Types>'
+	)
+
+	blob = io.BytesIO()
+	with zipfile.ZipFile(blob, 'w', zipfile.ZIP_DEFLATED) as xlsx:
+		xlsx.writestr('[Content_Types].xml', content_types.encode('utf-8'))
+		xlsx.writestr('_rels/.rels', package_rels.encode('utf-8'))
+		xlsx.writestr('xl/workbook.xml', workbook.encode('utf-8'))
+		xlsx.writestr('xl/_rels/workbook.xml.rels', workbook_rels.encode('utf-8'))
+		xlsx.writestr('xl/styles.xml', styles.encode('utf-8'))
+		xlsx.writestr('xl/worksheets/sheet1.xml', sheet.encode('utf-8'))
+	return blob.getvalue()
+
+
+class DeferredXlsxPart(EmbeddedXlsxPart):
+	"""Embedded workbook of a chart which is only written when its blob is first read, i.e. when the presentation is saved
+
+	Create with DeferredXlsxPart.new(b'', package) and assign a callable returning the xlsx blob to build.
+	"""
+
+	build = None
+
+	@property
+	def blob(self):
+		if not self.build is None:
+			self._blob = self.build()
+			self.build = None
+		return self._blob
+
+	@blob.setter
+	def blob(self, blob):
+		self._blob = blob
+		self.build = None
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""Downsampling of long chart series
+
+Rows of a chart dataframe are reduced to a point budget before the chart is written, so that long series (e.g. minute level time series)
+do not write every point to the chart xml and the embedded workbook. Rows are picked for all series at once, so that series still share
+their categories and no series holds more points than the budget. Series are weighed by their range when a row is picked, a single
+series is downsampled as on its own.
+"""
+
+from __future__ import division
+
+import pandas as pd
+import numpy as np
+
+
+METHODS = ('lttb', 'minmax')
+
+
+def positions(index):
+	"""Return the x coordinate of every category of a chart
+
+	Categories are drawn evenly spaced, except dates (drawn on a time scale).
+
+	Parameters
+	----------
+	index: pd.Index
+		dataframe index, labels are categories
+
+	Returns
+	-------
+	x: np.ndarray
+		float array, times in nanoseconds for dates, positions otherwise
+	"""
+	if isinstance(index, pd.DatetimeIndex):
+		return index.asi8.astype(float)
+	return np.arange(len(index), dtype=float)
+
+
+def buckets(n, count):
+	"""Return the start of every bucket of points 1 to n-2, split in count buckets of (nearly) equal size, and n-1
+	"""
+	return np.unique(np.floor(np.linspace(1, n - 1, count + 1)).astype(np.int64))
+
+
+def weighed(y):
+	"""Scale every series to the range 0 to 1, so that series of large values do not outweigh the others when rows are picked
+
+	A single series is returned as it is.
+	"""
+	if y.shape[1] == 1:
+		return y
+	low, scale = y.min(axis=0), np.ptp(y, axis=0)
+	scale[scale == 0] = 1
+	return (y - low) / scale
+
+
+def lttb(x, y, max_points):
+	"""Pick rows with Largest-Triangle-Three-Buckets, shared by every series
+
+	The first and last rows are kept, and one row of every bucket in between: the one forming the largest triangles with the row
+	picked in the bucket before and the average of the bucket after, summed over the series.
+
+	Parameters
+	----------
+	x: np.ndarray
+		float array of x coordinates, shape (points,)
+	y: np.ndarray
+		float matrix of values, shape (points, series)
+	max_points: int
+		number of rows picked, at least 3
+
+	Returns
+	-------
+	picked: np.ndarray
+		integer array of picked positions, in order, shape (max_points,)
+	"""
+	n = len(y)
+	y = weighed(y)
+	starts = buckets(n, max_points - 2)
+	ends = np.append(starts[1:], n)
+	# averages of every bucket, and of the last point (the bucket after the last bucket)
+	averages_x = np.add.reduceat(x, starts) / (ends - starts)
+	averages_y = np.add.reduceat(y, starts, axis=0) / (ends - starts)[:, None]
+
+	picked = np.zeros(len(starts) + 1, dtype=np.int64)
+	for b in range(len(starts) - 1):
+		a = picked[b]
+		xa, ya = x[a], y[a]
+		xb, yb = x[starts[b]:ends[b]], y[starts[b]:ends[b]]
+		# twice the triangle area, all series at once
+		areas = np.abs((xa - averages_x[b+1]) * (yb - ya) - (xa - xb[:, None]) * (averages_y[b+1] - ya))
+		picked[b+1] = starts[b] + areas.sum(axis=1).argmax()
+	picked[-1] = n - 1
+	return picked
+
+
+def minmax(x, y, max_points):
+	"""Pick the lowest and highest row of every bucket, shared by every series
+
+	The first and last rows are kept, and the rows in between are split in max_points // 2 - 1 buckets. The lowest row of a bucket holds
+	the smallest value of any series and the highest row the largest, values of series weighed by their range.
+
+	Parameters
+	----------
+	x: np.ndarray
+		float array of x coordinates, shape (points,), unused, points are bucketed by position
+	y: np.ndarray
+		float matrix of values, shape (points, series)
+	max_points: int
+		number of rows picked, at least 4
+
+	Returns
+	-------
+	picked: np.ndarray
+		integer array of picked positions, shape (rows picked,)
+	"""
+	n = len(y)
+	y = weighed(y)
+	starts = buckets(n, max_points // 2 - 1)[:-1]
+	sizes = np.diff(np.append(starts, n - 1))
+	rows = np.arange(1, n - 1)
+	picked = [np.zeros(1, dtype=np.int64)]
+	for reduce,inner in ((np.minimum, y[1:n-1].min(axis=1)), (np.maximum, y[1:n-1].max(axis=1))):
+		extreme = np.repeat(reduce.reduceat(inner, starts - 1), sizes)
+		# first position of the extreme of every bucket
+		picked.append(np.minimum.reduceat(np.where(inner == extreme, rows, n), starts - 1))
+	picked.append(np.full(1, n - 1, dtype=np.int64))
+	return np.concatenate(picked)
+
+
+def frame(df, max_points, method='lttb'):
+	"""Reduce the rows of a chart dataframe to a point budget
+
+	Parameters
+	----------
+	df: pd.DataFrame
+		chart data, index holds the categories and each column a series, missing values already imputed
+	max_points: int
+		number of rows kept, i.e. points of every series
+
+	Returns
+	-------
+	df: pd.DataFrame
+		picked rows, in order, df itself when it is within the budget
+	dropped: pd.Series
+		number of points dropped from each series, indexed by the columns of df
+
+	Keyword Arguements
+	------------------
+	method: str
+		'lttb' keeps the rows of largest triangles (Largest-Triangle-Three-Buckets), 'minmax' the lowest and highest row of every bucket,
+		default 'lttb'
+	"""
+	if not method in METHODS:
+		raise ValueError('downsample method must be one of {}, not {!r}'.format(', '.join(METHODS), method))
+	if max_points < (3 if method == 'lttb' else 4):
+		raise ValueError('max_points is too small to downsample with {!r}: {}'.format(method, max_points))
+	if len(df) <= max_points or len(df.columns) == 0:
+		return df, pd.Series(0, index=df.columns)
+
+	y = df.values.astype(float)
+	picked = (lttb if method == 'lttb' else minmax)(positions(df.index), y, max_points)
+	rows = np.unique(picked)
+	return df.iloc[rows], pd.Series(len(df) - len(rows), index=df.columns)
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""Text formatting helpers shared by pandasPPT and pandasDOC
+
+Number formats are python format strings (e.g. '{:,.2f}', '{:.1%}'), they are compiled once and applied to whole columns at a time.
+"""
+
+from __future__ import division
+
+import re
+import string
+
+import pandas as pd
+import numpy as np
+
+
+# format spec subset which can be applied with numpy, anything else is formatted value by value
+_SPEC = re.compile(r'^(?P<sign>[-+ ]?)0?(?P<grouping>,?)(?:\.(?P<precision>\d+))?(?P<type>[fF%])$')
+
+# compiled number formats, keyed by format string
+_compiled = {}
+
+# number of leading values sampled to judge whether a column repeats its values
+SAMPLE_SIZE = 1024
+
+
+class NumberFormat():
+	"""Python number format string compiled for vectorized use
+
+	Parameters
+	----------
+	fmt: str
+		python format string with a single replacement field, e.g. '{:,.2f}', for help see: https://www.python.org/dev/peps/pep-3101/
+
+	Attributes
+	----------
+	vectorized: bool
+		whether or not the format is applied with numpy, otherwise falls back to fmt.format per value
+	"""
+
+	def __init__(self, fmt):
+		self.fmt = fmt
+		self.vectorized = False
+		try:
+			fields = list(string.Formatter().parse(fmt))
+		except ValueError:
+			# malformed, let str.format raise when used
+			return
+		if len(fields) == 0 or len(fields) > 2 or fields[0][1] not in ('', '0') or fields[0][3] is not None:
+			return
+		if len(fields) == 2 and fields[1][1] is not None:
+			return
+		match = _SPEC.match(fields[0][2])
+		if match is None:
+			return
+		self.prefix = fields[0][0]
+		self.suffix = fields[1][0] if len(fields) == 2 else ''
+		self.sign = match.group('sign')
+		self.grouping = match.group('grouping') == ','
+		self.percent = match.group('type') == '%'
+		self.precision = int(match.group('precision') or 6)
+		self.vectorized = True
+
+	def __call__(self, values):
+		"""Format an array of numbers
+
+		Parameters
+		----------
+		values: array-like
+			numeric values, must not contain missing values
+
+		Returns
+		-------
+		text: np.ndarray
+			object array of formatted strings
+		"""
+		values = np.asarray(values)
+		if not self.vectorized or len(values) == 0:
+			# python numbers format faster than numpy scalars
+			return np.array([self.fmt.format(x) for x in values.tolist()], dtype=object)
+
+		x = values.astype(float)
+		if self.percent:
+			x = x * 100
+		y = np.abs(x) * 10**self.precision
+
+		# python rounds the exact binary value, scaled values within a few ulps of a half (or too large to be exact) are formatted by python
+		with np.errstate(invalid='ignore'):
+			exact = np.isfinite(y) & (y < 2**53) & (np.abs(y - np.floor(y) - .5) > 2 * np.spacing(y))
+		q = np.where(exact, np.rint(y), 0).astype(np.int64)
+		integers, fractions = np.divmod(q, 10**self.precision)
+
+		# number of characters of each row
+		digits = np.maximum(np.searchsorted(_POW10, integers, side='right'), 1)
+		chars = digits + (digits - 1) // 3 if self.grouping else digits
+		negative = np.signbit(x)
+		length = chars + (negative | (self.sign in ('+', ' ')))
+
+		# work in order of length, so rows of equal length are contiguous
+		order = np.argsort(length, kind='mergesort')
+		integers, fractions, chars, negative, length = integers[order], fractions[order], chars[order], negative[order], length[order]
+
+		# lay out unicode code points right aligned, one column per value, digits are peeled off from the right
+		tail = ('.' + '0'*self.precision if self.precision > 0 else '') + ('%' if self.percent else '') + self.suffix
+		width = length[-1] + len(tail)
+		right = length[-1] - 1
+		codes = np.zeros((width, len(x)), dtype=np.uint32)
+		for i,c in enumerate(tail):
+			codes[right + 1 + i] = ord(c)
+		for i in range(self.precision, 0, -1):
+			fractions, c = np.divmod(fractions, 10)
+			codes[right + 1 + i] = c + ord('0')
+		for m in range(chars.max()):
+			if self.grouping and m % 4 == 3:
+				c = ord(',')
+			else:
+				integers, c = np.divmod(integers, 10)
+				c = c + ord('0')
+			codes[right - m] = np.where(chars > m, c, 0)
+		signed = length > chars
+		codes[(right - chars)[signed], np.flatnonzero(signed)] = np.where(negative, ord('-'), ord(self.sign or '-'))[signed]
+
+		# left align after the prefix
+		aligned = np.zeros((len(self.prefix) + width, len(x)), dtype=np.uint32)
+		for i,c in enumerate(self.prefix):
+			aligned[i] = ord(c)
+		bounds = np.concatenate([[0], np.flatnonzero(np.diff(length)) + 1, [len(x)]])
+		for a,b in zip(bounds[:-1], bounds[1:]):
+			n = length[a] + len(tail)
+			aligned[len(self.prefix):len(self.prefix) + n, a:b] = codes[width - n:, a:b]
+		text = np.empty(len(x), dtype=object)
+		text[order] = np.ascontiguousarray(aligned.T).view('U{}'.format(aligned.shape[0])).ravel().astype(object)
+
+		for i in np.flatnonzero(~exact):
+			text[i] = self.fmt.format(values[i].item())
+		return text
+
+
+# powers of ten as integers
+_POW10 = 10 ** np.arange(19, dtype=np.int64)
+
+
+def compile_format(fmt):
+	"""Return the compiled NumberFormat of a format string, compiling it on first use
+
+	Parameters
+	----------
+	fmt: str
+		python format string, e.g. '{:,.2f}'
+
+	Returns
+	-------
+	number_format: NumberFormat
+		callable formatting an array of numbers
+	"""
+	try:
+		return _compiled[fmt]
+	except KeyError:
+		_compiled[fmt] = NumberFormat(fmt)
+		return _compiled[fmt]
+
+
+def format_numbers(series, fmt):
+	"""Format a numeric series as text, missing values are formatted as 0
+
+	Parameters
+	----------
+	series: pd.Series
+		numeric data
+	fmt: str
+		python format string, e.g. '{:,.2f}'
+
+	Returns
+	-------
+	text: pd.Series
+		formatted text with the index of series
+	"""
+	values = np.asarray(series.fillna(0).values)
+	number_format = compile_format(fmt)
+	if values.dtype.kind in 'iufb' and repeated(values):
+		# format each distinct value once
+		codes, uniques = factorize(values)
+		text = number_format(uniques)[codes]
+	else:
+		text = number_format(values)
+	return pd.Series(text, index=series.index, name=series.name)
+
+
+def repeated(values, sample_size=SAMPLE_SIZE):
+	"""Whether or not an array repeats its values enough that formatting its distinct values pays off
+
+	Judged on its first sample_size values, at least half of which have to be repeats.
+	"""
+	sample = values[:sample_size]
+	return len(sample) > 1 and len(pd.unique(sample)) <= len(sample) // 2
+
+
+def factorize(values):
+	"""Encode a numeric array as codes into its distinct values
+
+	Floats are compared by their bits, so that -0.0 and 0.0 (formatted '-0.00' and '0.00') stay apart.
+
+	Parameters
+	----------
+	values: np.ndarray
+		numeric values, must not contain missing values
+
+	Returns
+	-------
+	codes: np.ndarray
+		integer array, values == uniques[codes]
+	uniques: np.ndarray
+		distinct values in order of appearance, of the dtype of values
+	"""
+	if values.dtype.kind == 'f':
+		keys = values.view('i{}'.format(values.itemsize))
+		codes, uniques = pd.factorize(keys)
+		return codes, np.asarray(uniques).astype(keys.dtype).view(values.dtype)
+	codes, uniques = pd.factorize(values)
+	return codes, np.asarray(uniques).astype(values.dtype)
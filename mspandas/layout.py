@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""Table layout helpers shared by pandasPPT and pandasDOC
+
+These helpers work on a dataframe which has already been prepared for writing (i.e. totals appended and all values converted to text),
+and describe the resulting table as matrices so that it can be written in a single pass instead of cell by cell.
+"""
+
+from __future__ import division
+
+import numpy as np
+
+from mspandas import metrics
+
+
+# cell roles, used to look up the formatting of each cell
+EMPTY = 0
+HEADER = 1
+INDEX = 2
+DATA = 3
+TOTALS = 4
+
+# ppt/word length units
+EMUS_PER_CM = 360000
+CM_PER_PT = 2.54 / 72
+
+# ppt cell margins standards in inches
+CELL_MARGINS = {
+	'normal': {'top': 0.05, 'bottom': 0.05, 'left': 0.1, 'right': 0.1},
+	'none': {'top': 0, 'bottom': 0, 'left': 0, 'right': 0},
+	'narrow': {'top': 0.05, 'bottom': 0.05, 'left': 0.05, 'right': 0.05},
+	'wide': {'top': 0.15, 'bottom': 0.15, 'left': 0.15, 'right': 0.15},
+	# custom style, does not exist in ppt, is half of narrow
+	'tight': {'top': 0.025, 'bottom': 0.025, 'left': 0.025, 'right': 0.025},
+}
+
+
+def table_grid(df, header=True, index=True, column_totals=False, row_totals=False):
+	"""Compute the text, role and banding of every cell in a table
+
+	Parameters
+	----------
+	df: pd.DataFrame
+		prepared dataframe, all values, index and column labels converted to text
+
+	Returns
+	-------
+	labels: np.ndarray
+		object matrix of cell text, shape (rows, cols) of the table
+	roles: np.ndarray
+		integer matrix of cell roles (EMPTY, HEADER, INDEX, DATA, TOTALS)
+	bands: np.ndarray
+		integer matrix of banded row parity (0 or 1), -1 where cells are never banded
+
+	Keyword Arguements
+	------------------
+	header: bool
+		whether or not to include header in table, default True
+	index: bool
+		whether or not to include index in table, default True
+	column_totals: bool
+		whether or not the last row of df holds column totals, default False
+	row_totals: bool
+		whether or not the last column of df holds row totals, default False
+
+	Notes
+	-----
+	Mirrors the cell by cell loops of create_table, including the way index names overwrite column names in the top left corner.
+	"""
+
+	row_offset = df.columns.nlevels if header else 0
+	col_offset = df.index.nlevels if index else 0
+	num_rows = len(df) + row_offset
+	num_cols = len(df.columns) + col_offset
+
+	labels = np.full((num_rows, num_cols), ' ', dtype=object)
+	roles = np.full((num_rows, num_cols), EMPTY, dtype=np.int8)
+	bands = np.full((num_rows, num_cols), -1, dtype=np.int8)
+
+	# header
+	if header:
+		roles[:row_offset, :] = HEADER
+		for level in range(df.columns.nlevels):
+			labels[level, col_offset:] = np.asarray(df.columns.get_level_values(level), dtype=object)
+		if index and any(name is not None for name in df.columns.names):
+			labels[:row_offset, :col_offset] = np.asarray(list(df.columns.names), dtype=object)[:, None]
+
+	# index
+	if index:
+		roles[row_offset:, :col_offset] = INDEX
+		bands[row_offset:, :col_offset] = ((np.arange(row_offset, num_rows) - df.columns.nlevels) % 2)[:, None]
+		for level in range(df.index.nlevels):
+			labels[row_offset:, level] = np.asarray(df.index.get_level_values(level), dtype=object)
+		if header and any(name is not None for name in df.index.names):
+			# index names keep header formatting
+			labels[row_offset-1, :col_offset] = np.asarray(list(df.index.names), dtype=object)
+
+	# data
+	roles[row_offset:, col_offset:] = DATA
+	bands[row_offset:, col_offset:] = (np.arange(len(df)) % 2)[:, None]
+	labels[row_offset:, col_offset:] = df.fillna(' ').values
+
+	# totals
+	if column_totals:
+		roles[num_rows-1, col_offset:col_offset+num_cols-df.index.nlevels] = TOTALS
+	if row_totals:
+		roles[row_offset:row_offset+num_rows-df.columns.nlevels, num_cols-1] = TOTALS
+
+	# empty strings and missing labels are written as a single space
+	labels[~labels.astype(bool)] = ' '
+
+	return labels, roles, bands
+
+
+def label_runs(labels):
+	"""Find the runs of repeated labels of every level of an index, but the innermost
+
+	A run of a level ends where its label changes or where a run of an outer level ends, as pandas sparsifies a MultiIndex.
+
+	Parameters
+	----------
+	labels: pd.Index
+		df.index or df.columns, can be pd.MultiIndex
+
+	Returns
+	-------
+	runs: np.ndarray
+		integer matrix (levels, labels), length of the run starting at each label, 0 for labels continuing a run and 1 for the innermost level
+	"""
+	runs = np.ones((labels.nlevels, len(labels)), dtype=np.int64)
+	changed = np.zeros(max(len(labels) - 1, 0), dtype=bool)
+	for level in range(labels.nlevels - 1):
+		values = np.asarray(labels.get_level_values(level), dtype=object)
+		changed = changed | (values[1:] != values[:-1])
+		starts = np.flatnonzero(np.concatenate([[True], changed])) if len(labels) > 0 else np.zeros(0, dtype=np.int64)
+		runs[level] = 0
+		runs[level, starts] = np.diff(np.append(starts, len(labels)))
+	return runs
+
+
+def label_spans(df, header=True, index=True):
+	"""Compute the spans of every cell in a table which merges runs of repeated MultiIndex labels
+
+	Header labels are merged across columns and index labels across rows, see label_runs.
+
+	Parameters
+	----------
+	df: pd.DataFrame
+		prepared dataframe, all values, index and column labels converted to text
+
+	Returns
+	-------
+	grid_spans: np.ndarray
+		integer matrix of the number of columns spanned by each cell, 0 for cells covered by a cell to their left
+	row_spans: np.ndarray
+		integer matrix of the number of rows spanned by each cell, 0 for cells covered by a cell above
+
+	Keyword Arguements
+	------------------
+	header: bool
+		whether or not to include header in table, default True
+	index: bool
+		whether or not to include index in table, default True
+	"""
+	row_offset = df.columns.nlevels if header else 0
+	col_offset = df.index.nlevels if index else 0
+	shape = (len(df) + row_offset, len(df.columns) + col_offset)
+
+	grid_spans = np.ones(shape, dtype=np.int64)
+	row_spans = np.ones(shape, dtype=np.int64)
+	if header:
+		grid_spans[:row_offset, col_offset:] = label_runs(df.columns)
+	if index:
+		row_spans[row_offset:, :col_offset] = label_runs(df.index).T
+	return grid_spans, row_spans
+
+
+def distinct(*keys):
+	"""Encode every cell of a table by its distinct combination of keys
+
+	Cells which share text and formatting render to the same xml, so it is rendered once per combination and expanded by code.
+
+	Parameters
+	----------
+	keys: np.ndarray
+		non-negative integer matrices of one shape, e.g. codes of the cell text, cell roles and column numbers
+
+	Returns
+	-------
+	codes: np.ndarray
+		integer matrix of the combination of every cell
+	first: np.ndarray
+		flat position of the first cell of each combination
+	"""
+	combined = np.zeros(keys[0].size, dtype=np.int64)
+	for key in keys:
+		key = np.asarray(key, dtype=np.int64).ravel()
+		combined = combined * (int(key.max()) + 1 if key.size > 0 else 1) + key
+	_, first, codes = np.unique(combined, return_index=True, return_inverse=True)
+	return codes.reshape(keys[0].shape), first
+
+
+def column_widths(df, table_width, index=True, index_size=8, text_size=8, min_col_w=4, font_name=None, padding=0, snap=1):
+	"""Compute table column widths proportional to the longest text in each column
+
+	Parameters
+	----------
+	df: pd.DataFrame
+		prepared dataframe, all values, index and column labels converted to text
+	table_width: int
+		width available to the table in EMU
+
+	Returns
+	-------
+	widths: list
+		column widths in EMU, index columns first
+
+	Keyword Arguements
+	------------------
+	index: bool
+		whether or not to include index in table, default True
+	index_size: int
+		index text size in font size, default 8
+	text_size: int
+		text size in font size, default 8
+	min_col_w: int
+		minimum column width in cm, default 4
+	font_name: str
+		font of the table text, columns are sized by the rendered width of their widest text in this font (see mspandas.metrics),
+		default None (sized by the number of characters of their longest text)
+	padding: float
+		left plus right cell margin in cm, added to text widths measured with font_name, default 0
+	snap: int
+		resolution in EMU that the document stores widths in (e.g. 635 for word twips), default 1
+
+	Notes
+	-----
+	Columns are first sized by their text, then shrunk proportionally if they overflow table_width, then stretched if they do not fill it,
+	all columns are solved at once as a vector.
+	"""
+
+	def stored(emu):
+		# widths as read back after being written to the document
+		return np.round(emu / snap).astype(np.int64) * snap
+
+	max_col_w = table_width / EMUS_PER_CM / 2 # (don't hog the table)
+
+	# text and text size of every column
+	columns = [np.asarray(df.index.get_level_values(level), dtype=object) for level in range(df.index.nlevels)] if index else []
+	columns += [np.asarray(df.iloc[:, ix], dtype=object) for ix in range(len(df.columns))]
+	text = np.column_stack(columns)
+	sizes = np.array([index_size]*(len(columns) - len(df.columns)) + [text_size]*len(df.columns), dtype=float)
+
+	# compute width dynamically based on max text size in column, proportional to text size
+	if font_name is None:
+		# whole cm from the number of characters
+		lengths = np.vectorize(len, otypes=[np.int64])(text).max(axis=0)
+		cm = np.ceil(np.minimum(np.maximum(lengths * 2 * (1 / sizes), min_col_w), max_col_w))
+	else:
+		cm = np.minimum(np.maximum(metrics.text_widths(text, font_name).max(axis=0) * sizes * CM_PER_PT + padding, min_col_w), max_col_w)
+	widths = stored(np.ceil(cm * EMUS_PER_CM).astype(np.int64))
+	w_columns = widths.sum()
+
+	# shrink columns proportionally if they overflow template table width
+	if w_columns > table_width:
+		widths = stored(widths - np.round(widths / w_columns * (w_columns - table_width)).astype(np.int64))
+		w_columns = widths.sum()
+
+	# stretch columns proportionally if they do not fill template table width
+	if w_columns < table_width:
+		widths = stored(widths + np.round(widths / w_columns * (table_width - w_columns)).astype(np.int64))
+
+	return widths.tolist()
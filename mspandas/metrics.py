@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""Font metrics used to estimate the rendered width of table text
+
+Glyph advance widths of the printable ascii characters (' ' through '~'), in thousandths of an em.
+Arial, Times New Roman and Courier New share their metrics with Helvetica, Times and Courier (Adobe core font metrics),
+Calibri is measured from the Office font. Any other character is given the average advance width of the lowercase letters.
+"""
+
+from __future__ import division
+
+from collections import OrderedDict
+
+import pandas as pd
+import numpy as np
+
+from mspandas import style
+
+
+# advance widths of characters 32-126 per font, in thousandths of an em
+GLYPH_WIDTHS = {
+	'Calibri': [
+		226, 266, 343, 507, 507, 718, 684, 186, 303, 303, 507, 507, 250, 306, 252, 386,
+		507, 507, 507, 507, 507, 507, 507, 507, 507, 507, 268, 268, 507, 507, 507, 463,
+		898, 579, 544, 533, 615, 488, 459, 631, 623, 252, 319, 520, 420, 855, 646, 662,
+		517, 673, 543, 459, 487, 642, 567, 890, 519, 487, 468, 307, 386, 307, 507, 497,
+		287, 479, 525, 423, 525, 498, 305, 471, 525, 229, 239, 455, 229, 799, 525, 527,
+		525, 525, 349, 391, 335, 525, 452, 715, 433, 453, 395, 314, 460, 314, 507,
+	],
+	'Arial': [
+		278, 278, 355, 556, 556, 889, 667, 222, 333, 333, 389, 584, 278, 333, 278, 278,
+		556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+		1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+		667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+		222, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+		556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+	],
+	'Times New Roman': [
+		250, 333, 408, 500, 500, 833, 778, 333, 333, 333, 500, 564, 250, 333, 250, 278,
+		500, 500, 500, 500, 500, 500, 500, 500, 500, 500, 278, 278, 564, 564, 564, 444,
+		921, 722, 667, 667, 722, 611, 556, 722, 722, 333, 389, 722, 611, 889, 722, 722,
+		556, 722, 667, 556, 611, 722, 722, 944, 722, 722, 611, 333, 278, 333, 469, 500,
+		333, 444, 500, 444, 500, 444, 333, 500, 500, 278, 278, 500, 278, 778, 500, 500,
+		500, 500, 333, 389, 278, 500, 500, 722, 500, 500, 444, 480, 200, 480, 541,
+	],
+	'Courier New': [
+		600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600,
+		600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600,
+		600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600,
+		600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600,
+		600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600,
+		600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600, 600,
+	],
+}
+
+# metric compatible fonts
+ALIASES = {
+	'Carlito': 'Calibri',
+	'Calibri Light': 'Calibri',
+	'Helvetica': 'Arial',
+	'Liberation Sans': 'Arial',
+	'Times': 'Times New Roman',
+	'Liberation Serif': 'Times New Roman',
+	'Courier': 'Courier New',
+	'Liberation Mono': 'Courier New',
+}
+
+
+
+class LRUCache():
+	"""Least recently used cache with a maximum number of entries
+
+	Parameters
+	----------
+	maxsize: int
+		number of entries kept, the least recently used entries are dropped beyond it
+	"""
+
+	def __init__(self, maxsize=2**16):
+		self.maxsize = maxsize
+		self._data = OrderedDict()
+
+	def __len__(self):
+		return len(self._data)
+
+	def get_many(self, keys, default=None):
+		"""Return the values of keys (default where missing) and mark the keys found as recently used
+		"""
+		values = [self._data.get(key, default) for key in keys]
+		for key,value in zip(keys, values):
+			if not value is default:
+				try:
+					self._data.move_to_end(key)
+				except AttributeError:
+					# python 2.7
+					self._data[key] = self._data.pop(key)
+		return values
+
+	def put_many(self, keys, values):
+		"""Store values under keys, dropping the least recently used entries if full
+		"""
+		for key in keys:
+			self._data.pop(key, None)
+		self._data.update(zip(keys, values))
+		while len(self._data) > self.maxsize:
+			self._data.popitem(last=False)
+
+	def clear(self):
+		self._data.clear()
+
+
+# text widths in em per font, keyed by text
+_caches = {}
+
+
+def glyph_widths(font_name=style.Font.name):
+	"""Return the glyph advance table of a font
+
+	Parameters
+	----------
+	font_name: str
+		font name, fonts without bundled metrics use the metrics of mspandas.style.Font.name
+
+	Returns
+	-------
+	advances: np.ndarray
+		advance widths in em of characters 32-126, followed by the width used for any other character
+	"""
+	font_name = ALIASES.get(font_name, font_name)
+	widths = GLYPH_WIDTHS.get(font_name, GLYPH_WIDTHS[ALIASES.get(style.Font.name, style.Font.name)])
+	other = np.mean(widths[ord('a')-32:ord('z')-32+1])
+	return np.append(np.asarray(widths, dtype=float), other) / 1000
+
+
+def text_widths(values, font_name=style.Font.name):
+	"""Estimate the rendered width of strings
+
+	Parameters
+	----------
+	values: array-like
+		strings
+
+	Returns
+	-------
+	widths: np.ndarray
+		width of each string in em, multiply by the font size for the width in points
+
+	Keyword Arguements
+	------------------
+	font_name: str
+		font name, fonts without bundled metrics use the metrics of mspandas.style.Font.name
+
+	Notes
+	-----
+	Each distinct string is looked up in an LRU cache of the font, the strings missing from it are measured together:
+	their code points are mapped to advance widths and summed per string with numpy.
+	"""
+	cache = _caches.setdefault(font_name, LRUCache())
+	codes, uniques = pd.factorize(np.asarray(values, dtype=object).ravel())
+	widths = np.array(cache.get_many(uniques, np.nan), dtype=float)
+
+	missing = np.flatnonzero(np.isnan(widths))
+	if len(missing) > 0:
+		text = uniques[missing]
+		lengths = pd.Series(text).str.len().values
+		points = np.frombuffer(u''.join(text).encode('utf-32-le'), dtype=np.uint32).astype(np.int64) - 32
+		advances = glyph_widths(font_name)
+		points[(points < 0) | (points >= len(advances) - 1)] = len(advances) - 1
+		total = np.concatenate([[0], np.cumsum(advances[points])])
+		ends = np.cumsum(lengths)
+		widths[missing] = total[ends] - total[ends - lengths]
+		cache.put_many(text, widths[missing])
+
+	return widths[codes].reshape(np.shape(values))
@@ -2,16 +2,33 @@
 
 from __future__ import division
 
-import sys
+import copy
+import io
+import json
+import os
+import re
+import tempfile
+import zipfile
 
 import pandas as pd
 import numpy as np
 
 import docx
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.table import WD_TABLE_ALIGNMENT, WD_TABLE_DIRECTION
+from docx.oxml.ns import nsdecls, nsmap, qn
 from docx.shared import RGBColor
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+from lxml import etree
 
 from mspandas import style
+from mspandas import formatting
+from mspandas import layout
+from mspandas import strings
+from mspandas import totals
+from mspandas import aggregation
+from mspandas.style import RGB
 
 
 class Handler():
@@ -21,13 +38,23 @@ class Handler():
 	-------
 	create_table(doc, df)
 		Create a doc table using a pandas dataframe
+	stream_document(doc, path)
+		Open a DocumentWriter streaming the body of doc to a file as it is built
+
+	Keyword Arguements
+	------------------
+	cache: mspandas.cache.RenderCache
+		cache of rendered tables, a table rendered before from the same dataframe and arguments is cloned from it, default None
 	"""
 
+	def __init__(self, cache=None):
+		self.cache = cache
+
 	def create_table(self, doc, df,
 					 style='Table Grid', section=None, overflow_margins=.5,
 					 header=True, index=True, header_names=None, index_names=None,
 					 column_totals=False, row_totals=False, column_totals_agg_map={}, row_totals_agg_map={}, column_totals_label='Total', row_totals_label='Total',
-					 header_size=8, header_bold=True, header_italic=False, header_text_color=None, header_color=None, merge_header=None,
+					 header_size=8, header_bold=True, header_italic=False, header_text_color=None, header_color=None, merge_header=None, merge_labels=False,
 					 index_size=8, index_bold=False, index_italic=False, index_text_color=None,
 					 totals_size=8, totals_bold=False, totals_italic=False, totals_text_color=None,
 					 text_size=8, text_bold=False, text_italic=False, text_color=None, text_font_name=style.Font.name,
@@ -36,7 +63,7 @@ class Handler():
 					 cell_margins='tight', banded_rows=False, row_height=None,
 					 highlight_first_row=True, hightlight_first_col=False, highlight_last_row=False,
 					 autofit=None, alignment=WD_TABLE_ALIGNMENT.CENTER, direction=WD_TABLE_DIRECTION.LTR,
-					 encoding='utf-8', encoding_errors='strict'):
+					 encoding='utf-8', encoding_errors='strict', text_styles=True, repeat_header=None, pivot=None, engine='cells'):
 		"""Create a doc table using a pandas dataframe
 
 		Parameters
@@ -44,7 +71,8 @@ class Handler():
 		doc: docx.Document
 			document object
 		df: pd.DataFrame
-			pandas dataframe object, can have pd.MultiIndex on either axis
+			pandas dataframe object, can have pd.MultiIndex on either axis,
+			or an iterator of dataframe chunks (e.g. pd.read_csv(..., chunksize=n)) which are appended to one table as they are read
 
 		Returns
 		-------
@@ -89,6 +117,8 @@ class Handler():
 			list of 3 RGB codes to fill and color header row, default None
 		merge_header: dict (or list of dicts)
 			map of start and end columns (index or name) to be merged in header with optional level and alignment, default None, example: {'start':0, 'end':3, 'level':1, 'alignment':'center'} with required keys "start", "end", and optional keys "level","alignment"
+		merge_labels: bool
+			whether or not to merge runs of repeated pd.MultiIndex labels, header labels across columns and index labels across rows (all levels but the innermost), default False
 		index_size: int
 			index text size in ppt font size, default 8
 		index_bold: bool
@@ -145,21 +175,40 @@ class Handler():
 			alignment of text in table, default CENTER
 		direction: docx.enum.table.WD_TABLE_DIRECTION
 			direction in which table columns are ordere (e.g. left to right, or right to left), default LTR
+		repeat_header: bool
+			whether or not to repeat the header rows at the top of every page, default None (True for dataframe chunks, otherwise False)
+		pivot: dict
+			long-format df (one row per observation, not chunks) is first aggregated to a wide dataframe by mspandas.aggregation.pivot with these arguements
+			(index, columns, values, aggfunc, as df.pivot_table), memoized per source dataframe, default None (df is written as it is)
+		text_styles: bool
+			whether or not to register text formatting once per document as paragraph styles which table cells refer to, otherwise every run is formatted, default True
+		engine: str
+			how the table is written, 'cells' fills the table cell by cell through python-docx, 'xml' builds all table rows in a single pass (much faster for large dataframes), default 'cells'
 
 		Notes
 		-----
 		See http://python-docx.readthedocs.io/en/latest/api/table.html
+
+		Dataframe chunks are written by the xml engine, only one chunk is held at a time. Column widths are computed from the first chunk and
+		column totals are sums of the numeric columns (column_totals_agg_map does not apply). An iterator without chunks raises ValueError.
 		"""
 
+		# aggregate long-format data
+		if not pivot is None:
+			df = aggregation.pivot(df, **pivot)
+
+		# render cache, the table depends on the dataframe, the arguments and the page width of the section, chunks are not cached
+		key = None
+		if not self.cache is None and isinstance(df, pd.DataFrame):
+			page = doc.sections[-1] if section is None else section
+			key = self._cache_key('pandasDOC.create_table', df, locals(), page.page_width, page.left_margin, page.right_margin)
+			if not key is None:
+				entry = self.cache.get(key)
+				if not entry is None:
+					return self._attach_table(doc, entry)
+
 		# ppt cell margins standards in inches
-		margins_master = {
-			'normal': {'top': 0.05, 'bottom': 0.05, 'left': 0.1, 'right': 0.1},
-			'none': {'top': 0, 'bottom': 0, 'left': 0, 'right': 0},
-			'narrow': {'top': 0.05, 'bottom': 0.05, 'left': 0.05, 'right': 0.05},
-			'wide': {'top': 0.15, 'bottom': 0.15, 'left': 0.15, 'right': 0.15},
-			# custom style, does not exist in ppt, is half of narrow
-			'tight': {'top': 0.025, 'bottom': 0.025, 'left': 0.025, 'right': 0.025},
-		}
+		margins_master = layout.CELL_MARGINS
 
 		# convert column alignment map to pptx enum codes
 		try:
@@ -169,153 +218,33 @@ class Handler():
 			# python 3
 			column_alignment_map = {k:docx.enum.text.WD_ALIGN_PARAGRAPH.__dict__[v.upper()] for k,v in column_alignment_map.items()}
 
-		# total columns and concat with data as last row
-		if column_totals:
-			names = list(df.index.names)
-			ordered_columns = list(df.columns)
-			try:
-				c_totals = df.fillna(0).agg({col:(column_totals_agg_map[col] if col in column_totals_agg_map else np.sum) for col in df.columns}).rename(column_totals_label)
-			except:
-				c_totals = []
-				for col,method in column_totals_agg_map.items():
-					t = df.fillna(0)[[col]].apply(method)
-					c_totals = c_totals + [t]
-				t = df.fillna(0)[[col for col in df.columns if col not in column_totals_agg_map.keys()]].sum()
-				c_totals = c_totals + [t]
-				c_totals = pd.concat(c_totals).rename(column_totals_label)
-			c_totals = c_totals.to_frame().T
-			# create multiindex if needed
-			for i in range(df.index.nlevels-1):
-			    c_totals['dummy'] = ' '
-			    c_totals = c_totals.set_index('dummy',append=True)
-			    c_totals.index.names = [None]*len(c_totals.index.names)
-			try:
-				df = pd.concat([df, c_totals], axis=0)
-			except TypeError:
-				# df index is categorical
-				# add Total category and append
-				df.index = df.index.add_categories(column_totals_label)
-				df = pd.concat([df, c_totals], axis=0)
-			df = df.reindex_axis(ordered_columns, axis=1)
-			df.index.names = names
-		# total rows and concat with data as last column
-		if row_totals:
-			ordered_index = list(df.index)
+		# iterator of dataframe chunks, the first chunk lays out the table and the others are appended to it
+		chunks = None
+		if not isinstance(df, pd.DataFrame):
+			chunks = iter(df)
 			try:
-				r_totals = df.T.fillna(0).agg({col:(row_totals_agg_map[col] if col in row_totals_agg_map else np.sum) for col in df.T.columns}).rename(row_totals_label)
-			except:
-				totals = []
-				for col,method in row_totals_agg_map.items():
-					t = df.T.fillna(0)[[col]].apply(method)
-					totals = totals + [t]
-				t = df.T.fillna(0)[[col for col in df.T.columns if col not in row_totals_agg_map.keys()]].sum()
-				totals = totals + [t]
-				r_totals = pd.concat(totals).rename(row_totals_label)
-			# TODO: Create multiindex if needed
-			try:
-				df = pd.concat([df, r_totals.to_frame()], axis=1)
-			except TypeError:
-				# df columns are categorical
-				# add Total category and append
-				df.columns = df.columns.add_categories(row_totals_label)
-				df = pd.concat([df, r_totals.to_frame()], axis=1)
-			df = df.reindex_axis(ordered_index, axis=0)
-		# save list of column data types
-		# accessed during dynamic formatting (e.g. paragraph alignment, column width calculations etc.)
-		if isinstance(df.columns, pd.MultiIndex):
-			numeric_cols = [(str(c1),str(c2)) for c1,c2 in df._get_numeric_data().columns]
-			char_cols = [(str(c1),str(c2)) for c1,c2 in df.columns if not (str(c1),str(c2)) in numeric_cols]
-		else:
-			numeric_cols = [str(col) for col in df._get_numeric_data().columns]
-			char_cols = [str(col) for col in df.columns if not str(col) in numeric_cols]
-		# counts
-		num_numeric_cols = len(numeric_cols) if len(numeric_cols) > 0 else 1
-		num_char_cols = len(char_cols) if len(char_cols) > 0 else 1
+				df = next(chunks)
+			except StopIteration:
+				# no chunk to take the columns of the table from
+				raise ValueError('df is an empty iterator of dataframe chunks, the table needs at least one chunk')
+			engine = 'xml'
+			if repeat_header is None:
+				repeat_header = True
+			# column totals are summed as chunks are read and written last
+			chunk_totals = column_totals
+			column_totals = False
+			raw_columns = df.columns
+			column_sums = totals.aggregate(df)
+			# columns are numeric or text as in the first chunk, whatever the values of later chunks
+			numeric = [pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes]
 
-		# convert numeric data to strings
-		for col in df.columns:
-			if col in df._get_numeric_data().columns:
-				fmt = number_format
-				if not number_format_map is None:
-					try:
-						fmt = number_format_map[col]
-					except KeyError:
-						# column was not specified in map
-						pass
-				df.loc[:,col] = df[col].fillna(0).apply(lambda x: fmt.format(x))
-			else:
-				# handle encoding for pptx intake
-				# convert all to unicode for acceptance
-				# values
-				while True:
-					try:
-						if (sys.version_info < (3, 0)):
-							df[col] = df[col].fillna('').apply(lambda s: unicode(s.encode(encoding), 'utf-8', errors=encoding_errors) if isinstance(s, unicode) else unicode(s, encoding))
-						else:
-							df[col] = df[col].fillna('').apply(lambda s: s.encode(encoding).decode('utf-8', errors=encoding_errors) if isinstance(s, str) else s.decode(encoding))
-						break
-					except (TypeError, AttributeError):
-						df[col] = df[col].astype(str).fillna('')
-						continue
-
-		# handle encoding for docx intake
-		# convert all to unicode for acceptance
-		# columns
-		names = df.columns.names
-		multi = []
-		for level in range(df.columns.nlevels):
-			values = []
-			for s in df.columns.get_level_values(level):
-				try:
-					if (sys.version_info < (3, 0)):
-						values.append(unicode(s.encode(encoding), 'utf-8', errors=encoding_errors) if isinstance(s, unicode) else unicode(s, encoding))
-					else:
-						values.append(s.encode(encoding).decode('utf-8', errors=encoding_errors) if isinstance(s, str) else s.decode(encoding))
-				except (TypeError, AttributeError):
-					# value is numeric
-					values.append(str(s))
-					pass
-			if isinstance(df.columns, pd.MultiIndex):
-				multi += [values]
-				if level == df.columns.nlevels - 1:
-					df.columns = pd.MultiIndex.from_arrays(multi)
-			else:
-				df.columns = values
-		df.columns.names = names
-		# indices
-		names = df.index.names
-		multi = []
-		for level in range(df.index.nlevels):
-			values = []
-			for s in df.index.get_level_values(level):
-				try:
-					if (sys.version_info < (3, 0)):
-						values.append(unicode(s.encode(encoding), 'utf-8', errors=encoding_errors) if isinstance(s, unicode) else unicode(s, encoding))
-					else:
-						values.append(s.encode(encoding).decode('utf-8', errors=encoding_errors) if isinstance(s, str) else s.decode(encoding))
-				except (TypeError, AttributeError):
-					# value is numeric
-					values.append(str(s))
-					pass
-			if isinstance(df.index, pd.MultiIndex):
-				multi += [values]
-				if level == df.index.nlevels - 1:
-					df.index = pd.MultiIndex.from_arrays(multi)
-			else:
-				df.index = values
-			df.index.names = names
-
-		# add custom index names
-		if not index_names is None:
-			for i,name in enumerate(index_names):
-				i = None if not isinstance(df.index, pd.MultiIndex) else i
-				df.index = df.index.set_names(name, level=i)
-
-		# add custom header names
-		if not header_names is None:
-			for i,name in enumerate(header_names):
-				i = None if not isinstance(df.columns, pd.MultiIndex) else i
-				df.columns = df.columns.set_names(name, level=i)
+		# total, format and encode dataframe
+		df, numeric_cols, char_cols = self._prepare_frame(df, column_totals=column_totals, row_totals=row_totals,
+														  column_totals_agg_map=column_totals_agg_map, row_totals_agg_map=row_totals_agg_map,
+														  column_totals_label=column_totals_label, row_totals_label=row_totals_label,
+														  header_names=header_names, index_names=index_names,
+														  number_format=number_format, number_format_map=number_format_map,
+														  encoding=encoding, encoding_errors=encoding_errors)
 
 		# define table dimensions
 		num_rows = len(df)
@@ -326,30 +255,18 @@ class Handler():
 		if index:
 			num_cols += df.index.nlevels
 
-		# insert table into shape
-		table = doc.add_table(rows=num_rows, cols=num_cols)
-
 		if section is None:
 			section = doc.sections[-1]
 
 		# save width of document section page from template
 		table_width = section.page_width - (section.left_margin*(1-overflow_margins)) - (section.right_margin*(1-overflow_margins))
 
-		# style
-		table.style = style
-
-		# alignment
-		table.alignment = alignment
-
-		# autofit
-		if not autofit is None:
-			table.allow_autofit = True
-			table.autofit = True
-			# TODO: FIGURE THIS OUW
-			#how = 0 if autofit == 'window' else 1 if autofit == 'content' else 2
-
-		#table direction
-		table.table_direction = direction
+		# customize table column widths
+		widths = None
+		if autofit is None:
+			padding = (margins_master[cell_margins]['left'] + margins_master[cell_margins]['right']) * 2.54
+			widths = layout.column_widths(df, table_width, index=index, index_size=index_size, text_size=text_size,
+										  font_name=text_font_name, padding=padding, snap=docx.shared.Length._EMUS_PER_TWIP)
 
 		# convert colors to docx RGB
 		if not header_text_color is None:
@@ -361,56 +278,269 @@ class Handler():
 		if not text_color is None:
 			text_color = RGBColor(*text_color)
 
-		# add header to table
-		if header:
-			for level in range(df.columns.nlevels):
-				for i in range(num_cols):
-					c = table.cell(level,i)
-					label = ' '
-					col = None
-					if index and i <= df.index.nlevels-1:
-						if any(name is not None for name in df.columns.names):
-							label = df.columns.names[level]
+		# run formatting of each cell role
+		fonts = {
+			layout.HEADER: (header_bold, header_italic, header_size, header_text_color),
+			layout.INDEX: (index_bold, index_italic, index_size, index_text_color),
+			layout.DATA: (text_bold, text_italic, text_size, text_color),
+			layout.TOTALS: (totals_bold, totals_italic, totals_size, totals_text_color if not totals_text_color is None else text_color),
+		}
+
+		# shading elements, built once and cloned into cells
+		header_shd = self._shd(RGBColor(*header_color)) if not header_color is None else None
+		band_shd = [self._shd(RGBColor(*RGB.grey_light)), self._shd(RGBColor(*RGB.grey_light2))]
+
+		# register text formatting as paragraph styles, once per document
+		styles = {}
+		if text_styles:
+			styles = {role:self._text_style(doc, *(font + (text_font_name,))) for role,font in fonts.items()}
+
+		if engine == 'xml':
+			# resolve paragraph alignment of each dataframe column
+			alignments = []
+			for col in df.columns:
+				if col in column_alignment_map:
+					alignments.append(column_alignment_map[col])
+				elif col in numeric_cols:
+					alignments.append(numeric_cols_alignment)
+				elif col in char_cols:
+					alignments.append(char_cols_alignment)
+				else:
+					alignments.append(None)
+			# insert table into document, all rows at once
+			table = self._add_table_xml(doc, df, widths, fonts, alignments, text_font_name, styles=styles,
+										header=header, index=index, column_totals=column_totals, row_totals=row_totals,
+										header_color=header_color, banded_rows=banded_rows, merge_labels=merge_labels)
+
+			# append the remaining chunks as they are read
+			if not chunks is None:
+				num_data_rows = len(df)
+				for chunk in chunks:
+					chunk = self._conform_chunk(chunk, numeric)
+					if chunk_totals:
+						column_sums = column_sums + totals.aggregate(chunk)
+					chunk, _, _ = self._prepare_frame(chunk, row_totals=row_totals, row_totals_agg_map=row_totals_agg_map, row_totals_label=row_totals_label,
+													  index_names=index_names, number_format=number_format, number_format_map=number_format_map,
+													  encoding=encoding, encoding_errors=encoding_errors)
+					table._tbl.extend(self._rows_xml(table, chunk, fonts, alignments, text_font_name, styles=styles,
+													 header=header, index=index, row_totals=row_totals, header_color=header_color,
+													 banded_rows=banded_rows, band_start=num_data_rows % 2, header_rows=False, merge_labels=merge_labels))
+					num_data_rows += len(chunk)
+				if chunk_totals:
+					# totals row of the numeric columns, the others are left empty
+					totals_row = pd.DataFrame(dict((i, [total if not pd.isnull(total) else '']) for i,total in enumerate(column_sums)), index=totals.label(column_totals_label, df.index.nlevels))
+					totals_row.columns = raw_columns
+					totals_row, _, _ = self._prepare_frame(totals_row, row_totals=row_totals, row_totals_agg_map=row_totals_agg_map, row_totals_label=row_totals_label,
+														   number_format=number_format, number_format_map=number_format_map,
+														   encoding=encoding, encoding_errors=encoding_errors)
+					table._tbl.extend(self._rows_xml(table, totals_row, fonts, alignments, text_font_name, styles=styles,
+													 header=header, index=index, column_totals=True, row_totals=row_totals, header_color=header_color,
+													 banded_rows=banded_rows, band_start=num_data_rows % 2, header_rows=False))
+		else:
+			# insert table into document, rows take their cell widths from the grid
+			table = self._add_table_grid(doc, num_cols, widths)
+			for i in range(num_rows):
+				table.add_row()
+
+			# add header to table
+			if header:
+				for level in range(df.columns.nlevels):
+					for i in range(num_cols):
+						c = table.cell(level,i)
+						label = ' '
+						col = None
+						if index and i <= df.index.nlevels-1:
+							if any(name is not None for name in df.columns.names):
+								label = df.columns.names[level]
+							else:
+								label = ' '
+						elif index and i < df.index.nlevels:
+							continue
+						elif index and i > df.index.nlevels-1:
+							col = i - df.index.nlevels
+							label = df.columns.get_level_values(level)[col]
 						else:
-							label = ' '
-					elif index and i < df.index.nlevels:
-						continue
-					elif index and i > df.index.nlevels-1:
-						col = i - df.index.nlevels
-						label = df.columns.get_level_values(level)[col]
+							col = i
+							label = df.columns.get_level_values(level)[col]
+						c.text = label or ' '
+						if header_color is not None:
+							c._tc.get_or_add_tcPr().append(copy.deepcopy(header_shd))
+						p = c.paragraphs[0]
+						if col is not None:
+							if df.columns[col] in column_alignment_map:
+								p.alignment = column_alignment_map[df.columns[col]]
+							else:
+								if df.columns[col] in numeric_cols:
+									p.alignment = numeric_cols_alignment
+								elif df.columns[col] in char_cols:
+									p.alignment = char_cols_alignment
+						if text_styles:
+							p.style = styles[layout.HEADER]
+							continue
+						try:
+							r = p.runs[0]
+							r.font.bold = header_bold
+							r.font.italic = header_italic
+							r.font.size = docx.shared.Pt(header_size)
+							if not header_text_color is None:
+								r.font.color.rgb = header_text_color
+							r.font.name = text_font_name
+						except IndexError:
+							# mysteriously no paragraph / run exists
+							pass
+
+			# add index to table
+			if index:
+				for level in range(df.index.nlevels):
+					for i in range(num_rows):
+						c = table.cell(i,level)
+						row = None
+						keep_header_formatting = False
+						if header and i == df.columns.nlevels-1:
+							if any(name is not None for name in df.index.names):
+								label = df.index.names[level]
+								keep_header_formatting = True
+							else:
+								if header:
+									continue
+								else:
+									label = ' '
+						elif header and i < df.columns.nlevels:
+							continue
+						elif header and i >= df.columns.nlevels:
+							row = i - df.columns.nlevels
+							label = df.index.get_level_values(level)[row]
+						else:
+							row = i
+							label = df.index.get_level_values(level)[row]
+						c.text = label or ' '
+						if banded_rows:
+							if not keep_header_formatting:
+								c._tc.get_or_add_tcPr().append(copy.deepcopy(band_shd[(i-df.columns.nlevels) % 2]))
+						if text_styles:
+							c.paragraphs[0].style = styles[layout.INDEX] if not keep_header_formatting else styles[layout.HEADER]
+							continue
+						try:
+							r = c.paragraphs[0].runs[0]
+							if not keep_header_formatting:
+								r.font.bold = index_bold
+								r.font.italic = index_italic
+								r.font.size = docx.shared.Pt(index_size)
+								if not index_text_color is None:
+									r.font.color.rgb = index_text_color
+								r.font.name = text_font_name
+							else:
+								r.font.bold = header_bold
+								r.font.italic = header_italic
+								r.font.size = docx.shared.Pt(header_size)
+								if not header_text_color is None:
+									r.font.color.rgb = header_text_color
+								r.font.name = text_font_name
+						except IndexError:
+							# mysteriously no paragraph / run exists
+							pass
+
+			# iterate thru dataframe matrix and add data table, cell by cell
+			# impute any missing data as empty string
+			mat = df.fillna(' ').values
+			for row in range(df.shape[0]):
+				for col in range(df.shape[1]):
+					if header and index:
+						c = table.cell(row+df.columns.nlevels,col+df.index.nlevels)
+					elif header and not index:
+						c = table.cell(row+df.columns.nlevels,col)
+					elif index and not header:
+						c = table.cell(row,col+df.index.nlevels)
 					else:
-						col = i
-						label = df.columns.get_level_values(level)[col]
-					c.text = label or ' '
-					c.margin_top = docx.shared.Inches(margins_master[cell_margins]['top'])
-					c.margin_bottom = docx.shared.Inches(margins_master[cell_margins]['bottom'])
-					c.margin_left = docx.shared.Inches(margins_master[cell_margins]['left'])
-					c.margin_right = docx.shared.Inches(margins_master[cell_margins]['right'])
-					if header_color is not None:
-						rgb = RGBColor(*header_color)
-						xml_shd = docx.oxml.parse_xml(r'<w:shd {} w:fill="{}"/>'.format(docx.oxml.ns.nsdecls('w'), rgb))
-						c._tc.get_or_add_tcPr().append(xml_shd)
+						c = table.cell(row,col)
+					c.text = mat[row,col] or ' '
+					# alternative accessor
+					#c.text = df.loc[df.index[row], df.columns[col]]
+					if banded_rows:
+						c._tc.get_or_add_tcPr().append(copy.deepcopy(band_shd[row % 2]))
 					p = c.paragraphs[0]
-					if col is not None:
-						if df.columns[col] in column_alignment_map:
-							p.alignment = column_alignment_map[df.columns[col]]
-						else:
-							if df.columns[col] in numeric_cols:
-								p.alignment = numeric_cols_alignment
-							elif df.columns[col] in char_cols:
-								p.alignment = char_cols_alignment
+					if df.columns[col] in column_alignment_map:
+						p.alignment = column_alignment_map[df.columns[col]]
+					else:
+						if df.columns[col] in numeric_cols:
+							p.alignment = numeric_cols_alignment
+						elif df.columns[col] in char_cols:
+							p.alignment = char_cols_alignment
+					if text_styles:
+						p.style = styles[layout.DATA]
+						continue
 					try:
 						r = p.runs[0]
-						r.font.bold = header_bold
-						r.font.italic = header_italic
-						r.font.size = docx.shared.Pt(header_size)
-						if not header_text_color is None:
-							r.font.color.rgb = header_text_color
+						r.font.bold = text_bold
+						r.font.italic = text_italic
+						r.font.size = docx.shared.Pt(text_size)
+						if not text_color is None:
+							r.font.color.rgb = text_color
 						r.font.name = text_font_name
 					except IndexError:
 						# mysteriously no paragraph / run exists
 						pass
 
+			# format totals
+			if column_totals:
+				for i in range(num_cols-df.index.nlevels):
+					if index:
+						c = table.cell(num_rows-1,i+df.index.nlevels)
+					else:
+						c = table.cell(num_rows-1,i)
+					if text_styles:
+						c.paragraphs[0].style = styles[layout.TOTALS]
+						continue
+					r = c.paragraphs[0].runs[0]
+					r.font.bold = totals_bold
+					r.font.italic = totals_italic
+					r.font.size = docx.shared.Pt(totals_size)
+					if not totals_text_color is None:
+						r.font.color.rgb = totals_text_color
+					r.font.name = text_font_name
+			if row_totals:
+				for i in range(num_rows-df.columns.nlevels):
+					if header:
+						c = table.cell(i+df.columns.nlevels,num_cols-1)
+					else:
+						c = table.cell(i,num_cols-1)
+					if text_styles:
+						c.paragraphs[0].style = styles[layout.TOTALS]
+						continue
+					r = c.paragraphs[0].runs[0]
+					r.font.bold = totals_bold
+					r.font.italic = totals_italic
+					r.font.size = docx.shared.Pt(totals_size)
+					if not totals_text_color is None:
+						r.font.color.rgb = totals_text_color
+					r.font.name = text_font_name
+
+			# merge runs of repeated labels
+			if merge_labels:
+				self._merge_spans(table, *layout.label_spans(df, header=header, index=index))
+
+		# style
+		table.style = style
+
+		# cell margins, written once as table default
+		self._set_cell_margins(table, margins_master[cell_margins])
+
+		# alignment
+		table.alignment = alignment
+
+		# autofit
+		if not autofit is None:
+			table.allow_autofit = True
+			table.autofit = True
+			# TODO: FIGURE THIS OUW
+			#how = 0 if autofit == 'window' else 1 if autofit == 'content' else 2
+		else:
+			# keep the solved grid widths
+			table.autofit = False
+
+		#table direction
+		table.table_direction = direction
+
 		# merge header cells
 		if header:
 			if not merge_header is None:
@@ -426,17 +556,14 @@ class Handler():
 					# cell texts were concatenated with \n, remove any cell text which was None or empty string
 					c.text = c.text.replace('\nnan','').replace('\n','').strip()
 					# apply formatting
-					c.margin_top = docx.shared.Inches(margins_master[cell_margins]['top'])
-					c.margin_bottom = docx.shared.Inches(margins_master[cell_margins]['bottom'])
-					c.margin_left = docx.shared.Inches(margins_master[cell_margins]['left'])
-					c.margin_right = docx.shared.Inches(margins_master[cell_margins]['right'])
 					if header_color is not None:
-						rgb = RGBColor(*header_color)
-						xml_shd = docx.oxml.parse_xml(r'<w:shd {} w:fill="{}"/>'.format(docx.oxml.ns.nsdecls('w'), rgb))
-						c._tc.get_or_add_tcPr().append(xml_shd)
+						c._tc.get_or_add_tcPr().append(copy.deepcopy(header_shd))
 					p = c.paragraphs[0]
 					if 'alignment' in merge_header.keys():
 						p.alignment = docx.enum.text.WD_ALIGN_PARAGRAPH.__dict__[merge_header['alignment'].upper()]
+					if text_styles:
+						p.style = styles[layout.HEADER]
+						continue
 					try:
 						r = p.runs[0]
 						r.font.bold = header_bold
@@ -449,206 +576,610 @@ class Handler():
 						# mysteriously no paragraph / run exists
 						pass
 
-		# add index to table
-		if index:
-			for level in range(df.index.nlevels):
-				for i in range(num_rows):
-					c = table.cell(i,level)
-					row = None
-					keep_header_formatting = False
-					if header and i == df.columns.nlevels-1:
-						if any(name is not None for name in df.index.names):
-							label = df.index.names[level]
-							keep_header_formatting = True
-						else:
-							if header:
-								continue
-							else:
-								label = ' '
-					elif header and i < df.columns.nlevels:
-						continue
-					elif header and i >= df.columns.nlevels:
-						row = i - df.columns.nlevels
-						label = df.index.get_level_values(level)[row]
-					else:
-						row = i
-						label = df.index.get_level_values(level)[row]
-					c.text = label or ' '
-					c.margin_top = docx.shared.Inches(margins_master[cell_margins]['top'])
-					c.margin_bottom = docx.shared.Inches(margins_master[cell_margins]['bottom'])
-					c.margin_left = docx.shared.Inches(margins_master[cell_margins]['left'])
-					c.margin_right = docx.shared.Inches(margins_master[cell_margins]['right'])
-					if banded_rows:
-						if not keep_header_formatting:
-							rgb = RGBColor(*style.RGB.grey_light) if (i-df.columns.nlevels) % 2 == 0 else RGBColor(*style.RGB.grey_light2)
-							xml_shd = docx.oxml.parse_xml(r'<w:shd {} w:fill="{}"/>'.format(docx.oxml.ns.nsdecls('w'), rgb))
-							c._tc.get_or_add_tcPr().append(xml_shd)
-					try:
-						r = c.paragraphs[0].runs[0]
-						if not keep_header_formatting:
-							r.font.bold = index_bold
-							r.font.italic = index_italic
-							r.font.size = docx.shared.Pt(index_size)
-							if not index_text_color is None:
-								r.font.color.rgb = index_text_color
-							r.font.name = text_font_name
-						else:
-							r.font.bold = header_bold
-							r.font.italic = header_italic
-							r.font.size = docx.shared.Pt(header_size)
-							if not header_text_color is None:
-								r.font.color.rgb = header_text_color
-							r.font.name = text_font_name
-					except IndexError:
-						# mysteriously no paragraph / run exists
-						pass
-
-		# iterate thru dataframe matrix and add data table, cell by cell
-		# impute any missing data as empty string
-		mat = df.fillna(' ').as_matrix()
-		for row in range(df.shape[0]):
-			for col in range(df.shape[1]):
-				if header and index:
-					c = table.cell(row+df.columns.nlevels,col+df.index.nlevels)
-				elif header and not index:
-					c = table.cell(row+df.columns.nlevels,col)
-				elif index and not header:
-					c = table.cell(row,col+df.index.nlevels)
-				else:
-					c = table.cell(row,col)
-				c.text = mat[row,col] or ' '
-				# alternative accessor
-				#c.text = df.loc[df.index[row], df.columns[col]]
-				c.margin_top = docx.shared.Inches(margins_master[cell_margins]['top'])
-				c.margin_bottom = docx.shared.Inches(margins_master[cell_margins]['bottom'])
-				c.margin_left = docx.shared.Inches(margins_master[cell_margins]['left'])
-				c.margin_right = docx.shared.Inches(margins_master[cell_margins]['right'])
-				if banded_rows:
-					rgb = RGBColor(*style.RGB.grey_light) if row % 2 == 0 else RGBColor(*style.RGB.grey_light2)
-					xml_shd = docx.oxml.parse_xml(r'<w:shd {} w:fill="{}"/>'.format(docx.oxml.ns.nsdecls('w'), rgb))
-					c._tc.get_or_add_tcPr().append(xml_shd)
-				p = c.paragraphs[0]
-				if df.columns[col] in column_alignment_map:
-					p.alignment = column_alignment_map[df.columns[col]]
-				else:
-					if df.columns[col] in numeric_cols:
-						p.alignment = numeric_cols_alignment
-					elif df.columns[col] in char_cols:
-						p.alignment = char_cols_alignment
-				try:
-					r = p.runs[0]
-					r.font.bold = text_bold
-					r.font.italic = text_italic
-					r.font.size = docx.shared.Pt(text_size)
-					if not text_color is None:
-						r.font.color.rgb = text_color
-					r.font.name = text_font_name
-				except IndexError:
-					# mysteriously no paragraph / run exists
-					pass
-
-		# format totals
-		if column_totals:
-			for i in range(num_cols-df.index.nlevels):
-				if index:
-					c = table.cell(num_rows-1,i+df.index.nlevels)
-				else:
-					c = table.cell(num_rows-1,i)
-				r = c.paragraphs[0].runs[0]
-				r.font.bold = totals_bold
-				r.font.italic = totals_italic
-				r.font.size = docx.shared.Pt(totals_size)
-				if not totals_text_color is None:
-					r.font.color.rgb = totals_text_color
-				r.font.name = text_font_name
-		if row_totals:
-			for i in range(num_rows-df.columns.nlevels):
-				if header:
-					c = table.cell(i+df.columns.nlevels,num_cols-1)
-				else:
-					c = table.cell(i,num_cols-1)
-				r = c.paragraphs[0].runs[0]
-				r.font.bold = totals_bold
-				r.font.italic = totals_italic
-				r.font.size = docx.shared.Pt(totals_size)
-				if not totals_text_color is None:
-					r.font.color.rgb = totals_text_color
-				r.font.name = text_font_name
-
 		# customize table row hieghts
 		if not row_height is None:
 			emu = row_height * docx.shared.Length._EMUS_PER_INCH
 			for r in table.rows:
 				r.height = docx.shared.Emu(round(emu))
 
-		if autofit is None:
-			# customize table column widths
-			min_col_w = 4 #cm
-			max_col_w = table_width / docx.shared.Length._EMUS_PER_CM / 2 # num_char_cols (don't hog the table)
-			w_columns = 0
-			for ix,col in enumerate(table.columns):
-				if index and ix < df.index.nlevels:
-					# compute width dynamically based on max text size in index, proportional to text size
-					cm = min( max( len(max([s for s in df.index.get_level_values(ix)], key=len)) * 2 * (1/index_size), min_col_w), max_col_w)
-					emu = docx.shared.Cm(int(np.ceil(cm)))
-					col.width = emu
-					for c in col.cells:
-						c.width = emu
-					w_columns += col.width
-					continue
-				elif index:
-					# adjust ppt table column index for dataframe indexing
-					df_ix = ix - df.index.nlevels
-				else:
-					# no index in ppt table, columns line up
-					df_ix = ix
-				# compute width dynamically based on max text size in column, proportional to text size
-				cm = min( max( len(max([s for s in df.loc[:,df.columns[df_ix]]], key=len)) * 2 * (1/text_size), min_col_w), max_col_w)
-				emu = docx.shared.Cm(int(np.ceil(cm)))
-				col.width = emu
-				for c in col.cells:
-					c.width = emu
-				w_columns += col.width
-
-			# check if column widths overflow template table width
-			if w_columns > table_width:
-				# compute overflow and adjust columns proportionally
-				w_overflow = w_columns - table_width
-				w_columns_over = w_columns
-				w_columns = 0
-				for ix,col in enumerate(table.columns):
-					# compute col's percent of table size
-					percent_of_table = col.width / w_columns_over
-					# compute factor of overflow as reduction amount
-					reduction_amount = percent_of_table * w_overflow
-					# reduce
-					emu = col.width - docx.shared.Emu(round(reduction_amount))
-					col.width = emu
-					for c in col.cells:
-						c.width = emu
-					w_columns += col.width
-
-			# check if column widths do not fill template table width
-			if w_columns < table_width:
-				# compute deficit and adjust columns proportionally
-				w_deficit = table_width - w_columns
-				w_columns_under = w_columns
-				w_columns = 0
-				for ix,col in enumerate(table.columns):
-					# compute col's percent of table size
-					percent_of_table = col.width / w_columns_under
-					# compute factor of deficit as extension amount
-					extension_amount = percent_of_table * w_deficit
-					# extend
-					emu = col.width + docx.shared.Emu(round(extension_amount))
-					col.width = emu
-					for c in col.cells:
-						c.width = emu
-					w_columns += col.width
+		# repeat header rows on every page
+		if header and repeat_header:
+			for tr in table._tbl.tr_lst[:df.columns.nlevels]:
+				trPr = tr.get_or_add_trPr()
+				trPr.insert_element_before(docx.oxml.OxmlElement('w:tblHeader'), 'w:tblCellSpacing', 'w:jc', 'w:hidden', 'w:ins', 'w:del', 'w:trPrChange')
 
 		# highlight rows, or columns
 		table.first_row = highlight_first_row
 		table.first_col = hightlight_first_col
 		table.last_row = highlight_last_row
 
+		if not key is None:
+			entry = {'tbl.xml': etree.tostring(table._tbl)}
+			if text_styles:
+				entry['styles.json'] = json.dumps([[font[0], font[1], font[2], None if font[3] is None else str(font[3]), text_font_name] for font in fonts.values()]).encode('utf-8')
+			self.cache.set(key, entry)
+
 		return table
+
+	def stream_document(self, doc, path):
+		"""Open a DocumentWriter streaming the body of doc to a file as it is built
+
+		Parameters
+		----------
+		doc: docx.Document
+			document object, used as the template of the written document (styles, sections, headers etc.)
+		path: str or file-like
+			file to write the document to
+
+		Returns
+		-------
+		writer: DocumentWriter
+			writer with add_table and add_paragraph methods, must be closed (or used as a context manager) to complete the file
+
+		Examples
+		--------
+		>>> with Handler.stream_document(docx.Document(), 'report.docx') as writer:
+		...     for df in frames:
+		...         writer.add_paragraph('Table', style='Heading 1')
+		...         writer.add_table(df)
+		"""
+		return DocumentWriter(doc, path, handler=self)
+
+	def _conform_chunk(self, chunk, numeric):
+		"""Cast the columns of a dataframe chunk to the kind they have in the first chunk
+
+		A text column which is all missing in a chunk is read as float (e.g. by pd.read_csv), it is written as text as it is in the first chunk,
+		and a numeric column read as object is converted to numbers where it can be.
+
+		Parameters
+		----------
+		chunk: pd.DataFrame
+			dataframe chunk, with the columns of the first chunk
+		numeric: list
+			whether or not each column of the first chunk is numeric
+
+		Returns
+		-------
+		chunk: pd.DataFrame
+			dataframe chunk, chunk itself when its columns already are of their kind
+		"""
+		columns = [chunk.iloc[:, i] for i in range(len(chunk.columns))]
+		changed = False
+		for i,is_numeric in enumerate(numeric):
+			if is_numeric and not pd.api.types.is_numeric_dtype(columns[i].dtype):
+				try:
+					columns[i] = pd.to_numeric(columns[i])
+					changed = True
+				except (ValueError, TypeError):
+					# text among the numbers, written as text
+					pass
+			elif not is_numeric and pd.api.types.is_numeric_dtype(columns[i].dtype):
+				columns[i] = columns[i].astype(object)
+				changed = True
+		if not changed:
+			return chunk
+		conformed = pd.concat(columns, axis=1)
+		conformed.columns = chunk.columns
+		return conformed
+
+	def _prepare_frame(self, df, column_totals=False, row_totals=False, column_totals_agg_map={}, row_totals_agg_map={}, column_totals_label='Total', row_totals_label='Total',
+					   header_names=None, index_names=None, number_format='{:,.2f}', number_format_map=None, encoding='utf-8', encoding_errors='strict'):
+		"""Append totals to a dataframe and convert all of its values, index and column labels to text
+
+		Parameters
+		----------
+		df: pd.DataFrame
+			pandas dataframe object, can have pd.MultiIndex on either axis
+
+		Returns
+		-------
+		df: pd.DataFrame
+			prepared dataframe
+		numeric_cols: list
+			labels of the columns which held numeric data
+		char_cols: list
+			labels of the other columns
+
+		Notes
+		-----
+		Keyword arguements are those of create_table.
+		"""
+
+		# total columns as last row and rows as last column
+		df = totals.append(df, column_totals=column_totals, row_totals=row_totals,
+						   column_totals_agg_map=column_totals_agg_map, row_totals_agg_map=row_totals_agg_map,
+						   column_totals_label=column_totals_label, row_totals_label=row_totals_label)
+		# save list of column data types
+		# accessed during dynamic formatting (e.g. paragraph alignment, column width calculations etc.)
+		if isinstance(df.columns, pd.MultiIndex):
+			numeric_cols = [(str(c1),str(c2)) for c1,c2 in df._get_numeric_data().columns]
+			char_cols = [(str(c1),str(c2)) for c1,c2 in df.columns if not (str(c1),str(c2)) in numeric_cols]
+		else:
+			numeric_cols = [str(col) for col in df._get_numeric_data().columns]
+			char_cols = [str(col) for col in df.columns if not str(col) in numeric_cols]
+
+		# convert numeric data to strings
+		for col in df.columns:
+			if col in df._get_numeric_data().columns:
+				fmt = number_format
+				if not number_format_map is None:
+					try:
+						fmt = number_format_map[col]
+					except KeyError:
+						# column was not specified in map
+						pass
+				df.loc[:,col] = formatting.format_numbers(df[col], fmt)
+			else:
+				# handle encoding for pptx intake
+				# convert all to unicode for acceptance
+				# values
+				df[col] = strings.column(df[col], encoding=encoding, encoding_errors=encoding_errors)
+
+		# handle encoding for docx intake
+		# convert all to unicode for acceptance
+		# columns and indices, level by level
+		df.columns = strings.labels(df.columns, encoding=encoding, encoding_errors=encoding_errors)
+		df.index = strings.labels(df.index, encoding=encoding, encoding_errors=encoding_errors)
+
+		# add custom index names
+		if not index_names is None:
+			for i,name in enumerate(index_names):
+				i = None if not isinstance(df.index, pd.MultiIndex) else i
+				df.index = df.index.set_names(name, level=i)
+
+		# add custom header names
+		if not header_names is None:
+			for i,name in enumerate(header_names):
+				i = None if not isinstance(df.columns, pd.MultiIndex) else i
+				df.columns = df.columns.set_names(name, level=i)
+
+		return df, numeric_cols, char_cols
+
+	def _add_table_xml(self, doc, df, widths, fonts, alignments, font_name, styles=None,
+					   header=True, index=True, column_totals=False, row_totals=False, header_color=None, banded_rows=False, merge_labels=False):
+		"""Insert a doc table built from a prepared dataframe in a single pass
+
+		Parameters
+		----------
+		doc: docx.Document
+			document object
+		df: pd.DataFrame
+			prepared dataframe, all values, index and column labels converted to text
+		widths: list
+			column widths in EMU, None keeps the python-docx default widths
+		fonts: dict
+			map of cell role (see mspandas.layout) to (bold, italic, size, color) run formatting
+		alignments: list
+			paragraph alignment of each dataframe column, None for no alignment
+		font_name: str
+			font name applied to all table text
+		styles: dict
+			map of cell role to registered paragraph style, replaces run formatting when given, default None
+
+		Returns
+		-------
+		table: docx.table.Table
+			docx table object
+
+		Notes
+		-----
+		Formatting xml is rendered once per cell role (or column) through python-docx and then stamped into every cell,
+		so the output matches the cell by cell engine without creating a python-docx proxy per cell.
+		"""
+
+		# empty table holding the document default table properties and grid
+		num_cols = len(df.columns) + (df.index.nlevels if index else 0)
+		table = self._add_table_grid(doc, num_cols, widths)
+		table._tbl.extend(self._rows_xml(table, df, fonts, alignments, font_name, styles=styles,
+										 header=header, index=index, column_totals=column_totals, row_totals=row_totals,
+										 header_color=header_color, banded_rows=banded_rows, merge_labels=merge_labels))
+
+		return table
+
+	def _rows_xml(self, table, df, fonts, alignments, font_name, styles=None,
+				  header=True, index=True, column_totals=False, row_totals=False, header_color=None, banded_rows=False, band_start=0, header_rows=True, merge_labels=False):
+		"""Build the rows of a doc table from a prepared dataframe
+
+		Parameters
+		----------
+		table: docx.table.Table
+			docx table object the rows are built for, cell widths are taken from its grid
+		df: pd.DataFrame
+			prepared dataframe, all values, index and column labels converted to text
+		fonts: dict
+			map of cell role (see mspandas.layout) to (bold, italic, size, color) run formatting
+		alignments: list
+			paragraph alignment of each dataframe column, None for no alignment
+		font_name: str
+			font name applied to all table text
+
+		Returns
+		-------
+		rows: list
+			w:tr elements, not yet part of the table
+
+		Keyword Arguements
+		------------------
+		styles: dict
+			map of cell role to registered paragraph style, replaces run formatting when given, default None
+		band_start: int
+			parity of the first banded row, used to continue banding across rows appended in chunks, default 0
+		header_rows: bool
+			whether or not to return the header rows, the header is still laid out so that rows appended to an existing table
+			are banded like the rest of the table, default True
+		merge_labels: bool
+			whether or not to merge runs of repeated MultiIndex labels (see layout.label_spans), cells covered by a merged cell are left
+			out of their row (across columns) or written without text (across rows), default False
+		"""
+
+		labels, roles, bands = layout.table_grid(df, header=header, index=index, column_totals=column_totals, row_totals=row_totals)
+		col_offset = df.index.nlevels if index else 0
+		grid_cols = table._tbl.tblGrid.gridCol_lst
+		twips = np.array([gridCol.w.twips for gridCol in grid_cols], dtype=np.int64)
+
+		# distinct labels, each is rendered once as run content
+		codes, uniques = pd.factorize(labels.ravel())
+		text = pd.Series(uniques)
+		content = np.where(text.str.len() > text.str.strip().str.len(), '<w:t xml:space="preserve">', '<w:t>').astype(object)
+		content = content + text.str.replace('&', '&amp;').str.replace('<', '&lt;').str.replace('>', '&gt;').values + '</w:t>'
+		for i in np.flatnonzero(text.str.contains('[\t\n\r]').values):
+			# tabs and line breaks become their own run content elements
+			r = docx.oxml.OxmlElement('w:r')
+			r.text = text[i]
+			content[i] = ''.join(self._xml(e) for e in r)
+
+		# cells are rendered once per distinct combination of text, role, banding, column and spans, and expanded by code
+		num_cols = labels.shape[1]
+		grid_spans, row_spans = layout.label_spans(df, header=header, index=index) if merge_labels else (np.ones(labels.shape, dtype=np.int64),)*2
+		combination, first = layout.distinct(codes.reshape(labels.shape), roles, bands + 1, np.broadcast_to(np.arange(num_cols), labels.shape), grid_spans, row_spans)
+		cols = first % num_cols
+		cell_roles, cell_bands = roles.ravel()[first], bands.ravel()[first]
+		cell_grid_spans, cell_row_spans = grid_spans.ravel()[first], row_spans.ravel()[first]
+
+		# cell width, spanning the grid columns of merged cells
+		edges = np.concatenate([[0], np.cumsum(twips)])
+		tcPr = '<w:tcPr><w:tcW w:type="dxa" w:w="' + (edges[cols + np.maximum(cell_grid_spans, 1)] - edges[cols]).astype(str).astype(object) + '"/>'
+		tcPr[cell_grid_spans > 1] += '<w:gridSpan w:val="' + cell_grid_spans[cell_grid_spans > 1].astype(str).astype(object) + '"/>'
+		tcPr[cell_row_spans > 1] += '<w:vMerge w:val="restart"/>'
+		tcPr[cell_row_spans == 0] += '<w:vMerge/>'
+
+		# cell shading
+		shd = np.full(len(first), '', dtype=object)
+		if not header_color is None:
+			shd[cell_roles == layout.HEADER] = '<w:shd w:fill="{}"/>'.format(RGBColor(*header_color))
+		if banded_rows:
+			band_shd = np.array(['<w:shd w:fill="{}"/>'.format(RGBColor(*RGB.grey_light)), '<w:shd w:fill="{}"/>'.format(RGBColor(*RGB.grey_light2))], dtype=object)
+			banded = cell_bands >= 0
+			shd[banded] = band_shd[(cell_bands[banded] + band_start) % 2]
+
+		# paragraph properties by cell role (style) and column (alignment), rendered once per combination
+		style_ids = {role:text_style.style_id for role,text_style in (styles or {}).items()}
+		column_alignments = [None] + alignments
+		aligned = np.zeros(num_cols, dtype=int)
+		aligned[col_offset:] = np.arange(1, len(column_alignments))
+		keys = cell_roles.astype(int) * len(column_alignments) + aligned[cols]
+		unique, inverse = np.unique(keys, return_inverse=True)
+		pPr = np.array([self._pPr_xml(column_alignments[k % len(column_alignments)], style_ids.get(k // len(column_alignments))) for k in unique], dtype=object)[inverse.ravel()]
+
+		# run formatting by cell role, left to the paragraph styles when registered
+		rPr = np.full(5, '', dtype=object)
+		if not styles:
+			rPr[1:] = [self._rPr_xml(*(fonts[role] + (font_name,))) for role in (layout.HEADER, layout.INDEX, layout.DATA, layout.TOTALS)]
+		rPr = rPr[cell_roles]
+
+		# cells covered by a merged cell above have no text, those covered by a merged cell to their left are left out
+		run = np.where((cell_roles == layout.EMPTY) | (cell_row_spans == 0), '', '<w:r>' + rPr + content[codes[first]] + '</w:r>')
+		cells = ('<w:tc>' + tcPr + shd + '</w:tcPr><w:p>' + pPr + run + '</w:p></w:tc>')[combination]
+		cells[grid_spans == 0] = ''
+		if header and not header_rows:
+			cells = cells[df.columns.nlevels:]
+		rows = docx.oxml.parse_xml('<w:tbl {}>{}</w:tbl>'.format(nsdecls('w'), ''.join(['<w:tr>' + ''.join(row) + '</w:tr>' for row in cells])))
+
+		return list(rows)
+
+	def _cache_key(self, kind, df, arguments, *extra):
+		"""Return the render cache key of a call, None when df can not be hashed or an argument has no stable key
+
+		Parameters
+		----------
+		kind: str
+			rendering method, e.g. 'pandasDOC.create_table'
+		df: pd.DataFrame
+			rendered dataframe
+		arguments: dict
+			locals() of the rendering method, the document, section and dataframe are left out
+		"""
+		arguments = dict((k,v) for k,v in arguments.items() if not k in ('self', 'doc', 'section', 'page', 'key', 'df'))
+		return self.cache.key(kind, df, arguments, *extra)
+
+	def _attach_table(self, doc, entry):
+		"""Append a cached table to the document, registering the paragraph styles its cells refer to
+		"""
+		if 'styles.json' in entry:
+			for bold,italic,size,color,font_name in json.loads(entry['styles.json'].decode('utf-8')):
+				self._text_style(doc, bold, italic, size, None if color is None else RGBColor.from_string(color), font_name)
+		table = doc.add_table(rows=0, cols=1)
+		tbl = docx.oxml.parse_xml(entry['tbl.xml'])
+		table._tbl.getparent().replace(table._tbl, tbl)
+		return docx.table.Table(tbl, table._parent)
+
+	def _merge_spans(self, table, grid_spans, row_spans):
+		"""Merge the cells of a table by their spans (see layout.label_spans)
+
+		Cells spanning grid columns take their width, the cells they cover are removed. Cells covered by a cell above lose their text.
+		"""
+		grid_cols = table._tbl.tblGrid.gridCol_lst
+		for tr,row_grid_spans,row_row_spans in zip(table._tbl.tr_lst, grid_spans, row_spans):
+			tcs = tr.tc_lst
+			for col in np.flatnonzero((row_grid_spans != 1) | (row_row_spans != 1)):
+				tc = tcs[col]
+				if row_grid_spans[col] == 0:
+					tr.remove(tc)
+					continue
+				if row_grid_spans[col] > 1:
+					tc.width = docx.shared.Emu(sum(gridCol.w for gridCol in grid_cols[col:col + row_grid_spans[col]]))
+					tc.get_or_add_tcPr().get_or_add_gridSpan().val = int(row_grid_spans[col])
+				if row_row_spans[col] > 1:
+					tc.vMerge = 'restart'
+				if row_row_spans[col] == 0:
+					tc.vMerge = 'continue'
+					for p in tc.p_lst:
+						for e in list(p):
+							if e.tag != qn('w:pPr'):
+								p.remove(e)
+
+	def _add_table_grid(self, doc, num_cols, widths):
+		"""Insert an empty doc table and write its column widths once to the table grid
+
+		Parameters
+		----------
+		doc: docx.Document
+			document object
+		num_cols: int
+			number of table columns
+		widths: list
+			column widths in EMU, None keeps the python-docx default widths
+
+		Returns
+		-------
+		table: docx.table.Table
+			docx table object without rows, rows added to it take their cell widths from the grid
+		"""
+		table = doc.add_table(rows=0, cols=num_cols)
+		if not widths is None:
+			for gridCol,emu in zip(table._tbl.tblGrid.gridCol_lst, widths):
+				gridCol.w = docx.shared.Emu(emu)
+		return table
+
+	def _xml(self, element):
+		"""Serialize a wordprocessing element without its namespace declaration
+		"""
+		return etree.tostring(element, encoding='unicode').replace(' ' + nsdecls('w'), '')
+
+	def _shd(self, rgb):
+		"""Create a cell shading element filled with an RGBColor
+		"""
+		return docx.oxml.parse_xml(r'<w:shd {} w:fill="{}"/>'.format(nsdecls('w'), rgb))
+
+	def _set_cell_margins(self, table, margins):
+		"""Write default cell margins of a table, replacing any existing ones
+
+		Parameters
+		----------
+		table: docx.table.Table
+			docx table object
+		margins: dict
+			cell margins in inches, keys 'top', 'bottom', 'left', 'right'
+		"""
+		tblPr = table._tbl.tblPr
+		for tblCellMar in tblPr.findall(qn('w:tblCellMar')):
+			tblPr.remove(tblCellMar)
+		tblCellMar = docx.oxml.parse_xml('<w:tblCellMar {}>{}</w:tblCellMar>'.format(nsdecls('w'), ''.join(
+			['<w:{} w:w="{}" w:type="dxa"/>'.format(side, docx.shared.Inches(margins[side]).twips) for side in ('top', 'left', 'bottom', 'right')])))
+		tblPr.insert_element_before(tblCellMar, 'w:tblLook', 'w:tblCaption', 'w:tblDescription', 'w:tblPrChange')
+
+	def _rPr_xml(self, bold, italic, size, color, font_name):
+		"""Render run properties xml as python-docx would write them
+		"""
+		r = docx.oxml.OxmlElement('w:r')
+		font = Run(r, None).font
+		font.bold = bold
+		font.italic = italic
+		font.size = docx.shared.Pt(size)
+		if not color is None:
+			font.color.rgb = color
+		font.name = font_name
+		return self._xml(r.rPr)
+
+	def _pPr_xml(self, alignment, style_id=None):
+		"""Render paragraph properties xml as python-docx would write them
+		"""
+		p = docx.oxml.OxmlElement('w:p')
+		if not style_id is None:
+			p.style = style_id
+		if not alignment is None:
+			Paragraph(p, None).alignment = alignment
+		return self._xml(p.pPr) if not p.pPr is None else ''
+
+	def _text_style(self, doc, bold, italic, size, color, font_name):
+		"""Return the paragraph style holding a table text formatting, registering it with the document on first use
+
+		Parameters
+		----------
+		doc: docx.Document
+			document object
+		bold: bool
+			whether or not text is bold
+		italic: bool
+			whether or not text is italic
+		size: int
+			text size in font size
+		color: docx.shared.RGBColor
+			text color, None inherits the color
+		font_name: str
+			font name
+
+		Returns
+		-------
+		style: docx.styles.style._ParagraphStyle
+			paragraph style based on the default paragraph style, named after its formatting (e.g. 'mspandas Calibri 8pt Bold')
+		"""
+		name = ' '.join(['mspandas', str(font_name), '{}pt'.format(size)] + (['Bold'] if bold else []) + (['Italic'] if italic else []) + ([str(color)] if not color is None else []))
+		try:
+			return doc.styles[name]
+		except KeyError:
+			text_style = doc.styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+			text_style.base_style = doc.styles.default(WD_STYLE_TYPE.PARAGRAPH)
+			text_style.font.bold = bold
+			text_style.font.italic = italic
+			text_style.font.size = docx.shared.Pt(size)
+			if not color is None:
+				text_style.font.color.rgb = color
+			text_style.font.name = font_name
+			return text_style
+
+
+class DocumentWriter():
+	"""Write the body of a Word document to a file as it is built, instead of holding the whole document tree until doc.save
+
+	Body elements (tables, paragraphs) are serialized to word/document.xml inside the zip package as soon as they are complete
+	and then dropped from the document tree, so memory stays flat as the document grows. All other parts of the package
+	(styles, numbering, headers, images etc.) are small and written from doc when the writer is closed.
+
+	Parameters
+	----------
+	doc: docx.Document
+		document object, used as the template of the written document, any content already in its body is written first
+	path: str or file-like
+		file to write the document to
+
+	Keyword Arguements
+	------------------
+	handler: Handler
+		handler creating tables, default None (a new Handler)
+
+	Methods
+	-------
+	add_table(df, **kwargs)
+		Create a doc table using a pandas dataframe (see Handler.create_table) and write it
+	add_paragraph(text, style)
+		Add a paragraph and write it
+	flush()
+		Write all complete body elements of doc, e.g. after adding content with the python-docx api
+	close()
+		Write the end of the body and the remaining package parts
+
+	Notes
+	-----
+	Elements are written once and emptied, python-docx objects returned for them can not be read or edited after they are flushed.
+	Each table is held in memory until it is complete, so peak memory is bounded by the largest table rather than the document.
+	"""
+
+	def __init__(self, doc, path, handler=None):
+		self.doc = doc
+		self.handler = Handler() if handler is None else handler
+		self._partname = doc.part.partname.lstrip('/')
+		self._zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+		try:
+			self._stream = self._zip.open(self._partname, mode='w', force_zip64=True)
+			self._spool = None
+		except TypeError:
+			# python 2.7, zip entries can not be written incrementally
+			self._spool = tempfile.NamedTemporaryFile(delete=False)
+			self._stream = self._spool
+
+		# document root and body tags, namespace declarations are written once on the root
+		root = doc.element
+		shell = etree.Element(root.tag, attrib=dict(root.attrib), nsmap=root.nsmap)
+		etree.SubElement(shell, qn('w:body'))
+		head, self._tail = etree.tostring(shell, encoding='UTF-8', xml_declaration=True, standalone=True).split(b'<w:body/>')
+		self._nsdecls = re.compile(b'|'.join([re.escape(' xmlns:{}="{}"'.format(prefix, uri).encode('utf-8')) for prefix,uri in root.nsmap.items() if not prefix is None]))
+		self._stream.write(head + b'<w:body>')
+		self.flush()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+	def add_table(self, df, **kwargs):
+		"""Create a doc table using a pandas dataframe and write it
+
+		Parameters
+		----------
+		df: pd.DataFrame
+			pandas dataframe object, or an iterator of dataframe chunks, passed to Handler.create_table with kwargs
+
+		Returns
+		-------
+		table: docx.table
+			docx table object, already written and emptied
+		"""
+		table = self.handler.create_table(self.doc, df, **kwargs)
+		self.flush()
+		return table
+
+	def add_paragraph(self, text='', style=None):
+		"""Add a paragraph and write it
+
+		Parameters
+		----------
+		text: str
+			paragraph text, default ''
+		style: str
+			paragraph style name, default None
+
+		Returns
+		-------
+		paragraph: docx.text.paragraph.Paragraph
+			docx paragraph object, already written and emptied
+		"""
+		paragraph = self.doc.add_paragraph(text, style=style)
+		self.flush()
+		return paragraph
+
+	def flush(self):
+		"""Write all body elements of doc except the final section properties, and drop them from the document tree
+		"""
+		body = self.doc.element.body
+		for element in list(body):
+			if element.tag == qn('w:sectPr'):
+				continue
+			self._write(element)
+			# emptied first, lxml moves removed elements to a new document node by node
+			element.clear()
+			body.remove(element)
+
+	def close(self):
+		"""Write the end of the body and the remaining package parts, completing the file
+		"""
+		if self._zip is None:
+			return
+		self.flush()
+		sectPr = self.doc.element.body.sectPr
+		if not sectPr is None:
+			self._write(sectPr)
+		self._stream.write(b'</w:body>' + self._tail)
+		self._stream.close()
+		if not self._spool is None:
+			self._zip.write(self._spool.name, self._partname)
+			os.remove(self._spool.name)
+
+		# remaining package parts, saved from doc now that its body is empty
+		package = io.BytesIO()
+		self.doc.save(package)
+		with zipfile.ZipFile(package) as source:
+			for info in source.infolist():
+				if info.filename != self._partname:
+					self._zip.writestr(info, source.read(info.filename))
+		self._zip.close()
+		self._zip = None
+
+	def _write(self, element):
+		"""Serialize a body element to the document part, without the namespace declarations of the document root
+		"""
+		xml = etree.tostring(element, encoding='UTF-8')
+		start = xml.index(b'>')
+		self._stream.write(self._nsdecls.sub(b'', xml[:start]))
+		self._stream.write(memoryview(xml)[start:])
@@ -2,16 +2,63 @@
 
 from __future__ import division
 
-import sys
+import copy
+import inspect
+import io
+import json
+import multiprocessing
+import re
 
 import pandas as pd
 import numpy as np
 
 import pptx
-from pptx.chart.data import ChartData
+from pptx.chart.data import BubbleChartData, ChartData, XyChartData
+from pptx.chart.datalabel import DataLabels
 from pptx.dml.color import RGBColor
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from pptx.opc.package import PartFactory
+from pptx.oxml.chart.datalabel import CT_DLbls
+from pptx.opc.packuri import PackURI
+from pptx.oxml.ns import nsdecls, qn
+from pptx.parts.chart import ChartPart
+from pptx.parts.slide import SlidePart
+from pptx.shapes.placeholder import PlaceholderGraphicFrame
+from pptx.table import _Cell
+from pptx.text.text import _Paragraph
+from lxml import etree
 
 from mspandas import style
+from mspandas import formatting
+from mspandas import layout
+from mspandas import strings
+from mspandas import totals
+from mspandas import chartdata
+from mspandas import downsample
+from mspandas import aggregation
+from mspandas.template import CACHE_DIR, TemplateIndex
+
+
+# chart types plotting x and y values of every point (bubble charts a size too) instead of values of categories
+XY_CHART_TYPES = (
+	pptx.enum.chart.XL_CHART_TYPE.XY_SCATTER,
+	pptx.enum.chart.XL_CHART_TYPE.XY_SCATTER_LINES,
+	pptx.enum.chart.XL_CHART_TYPE.XY_SCATTER_LINES_NO_MARKERS,
+	pptx.enum.chart.XL_CHART_TYPE.XY_SCATTER_SMOOTH,
+	pptx.enum.chart.XL_CHART_TYPE.XY_SCATTER_SMOOTH_NO_MARKERS,
+)
+# XY chart types drawing lines between points, and those drawing lines only
+XY_LINE_CHART_TYPES = XY_CHART_TYPES[1:]
+XY_NO_MARKER_CHART_TYPES = (
+	pptx.enum.chart.XL_CHART_TYPE.XY_SCATTER_LINES_NO_MARKERS,
+	pptx.enum.chart.XL_CHART_TYPE.XY_SCATTER_SMOOTH_NO_MARKERS,
+)
+BUBBLE_CHART_TYPES = (
+	pptx.enum.chart.XL_CHART_TYPE.BUBBLE,
+	pptx.enum.chart.XL_CHART_TYPE.BUBBLE_THREE_D_EFFECT,
+)
+
 
 class Handler():
 	"""Handler with helpful methods to assist in creation of Microsoft PowerPoint Documents.
@@ -22,12 +69,26 @@ class Handler():
 		Create dictionary object of template layouts in slide master from ppt object, where keys are layout names.
 	map_shapes(layout)
 		Create dictionary object of slide shapes in template layout from layout object, where keys are shape names.
+	index_template(template)
+		Return the memoized TemplateIndex of a template file, replacing repeated calls of map_layouts and map_shapes.
 	create_table(table, df)
 		Create a ppt table using a pandas dataframe
+	create_paginated_table(ppt, slide_layout, placeholder_name, df)
+		Create ppt tables of a pandas dataframe split across as many slides as needed
 	create_chart(chart, df)
 		Create a ppt chart using a pandas dataframe
+	render_slides(template, specs)
+		Render slides of pandas dataframes in a process pool and merge them into one presentation
+
+	Keyword Arguements
+	------------------
+	cache: mspandas.cache.RenderCache
+		cache of rendered tables and charts, a table or chart rendered before from the same dataframe and arguments is cloned from it, default None
 	"""
 
+	def __init__(self, cache=None):
+		self.cache = cache
+
 	def map_layouts(self, ppt, verbose=False):
 		"""Create dictionary object of template layouts in slide master from ppt object, where keys are layout names.
 
@@ -70,10 +131,36 @@ class Handler():
 					print('{} index: {}, type: {}'.format(shape.name, phf.idx, phf.type))
 		return shape_map
 
+	def index_template(self, template, cache_dir=CACHE_DIR):
+		"""Return the memoized TemplateIndex of a template file, replacing repeated calls of map_layouts and map_shapes.
+
+		Parameters
+		----------
+		template: str, bytes or file-like
+			path or content of the pptx template
+
+		Returns
+		-------
+		index: TemplateIndex
+			layouts and placeholders of the template by name, see mspandas.template
+
+		Keyword Arguements
+		------------------
+		cache_dir: str
+			directory the index is stored in as JSON, default mspandas.template.CACHE_DIR, None to keep it in memory only
+
+		Examples
+		--------
+		>>> index = Handler.index_template('template.pptx')
+		>>> slide = ppt.slides.add_slide(index.layout(ppt, 'Slide Layout with Chart'))
+		>>> chart = slide.placeholders[index.placeholder_idx('Slide Layout with Chart', 'Chart Placeholder')]
+		"""
+		return TemplateIndex.load(template, cache_dir=cache_dir)
+
 	def create_table(self, table, df,
 					 header=True, index=True, header_names=None, index_names=None,
 					 column_totals=False, row_totals=False, column_totals_agg_map={}, row_totals_agg_map={}, column_totals_label='Total', row_totals_label='Total',
-					 header_size=9, header_bold=True, header_italic=False, header_text_color=None, header_color=None, merge_header=None,
+					 header_size=9, header_bold=True, header_italic=False, header_text_color=None, header_color=None, merge_header=None, merge_labels=False,
 					 index_size=9, index_bold=False, index_italic=False, index_text_color=None,
 					 totals_size=9, totals_bold=False, totals_italic=False, totals_text_color=None,
 					 text_size=9, text_bold=False, text_italic=False, text_color=None, text_font_name=style.Font.name,
@@ -82,7 +169,7 @@ class Handler():
 					 numeric_cols_alignment=pptx.enum.text.PP_ALIGN.CENTER, char_cols_alignment=pptx.enum.text.PP_ALIGN.LEFT, column_alignment_map={},
 					 cell_margins='tight', banded_rows=True, row_height=.15,
 					 highlight_first_row=True, hightlight_first_col=False, highlight_last_row=False,
-					 encoding='utf-8', encoding_errors='strict'):
+					 encoding='utf-8', encoding_errors='strict', pivot=None, column_widths=None, prepared=None, engine='cells'):
 		"""Create a ppt table using a pandas dataframe
 
 		Parameters
@@ -129,6 +216,8 @@ class Handler():
 			list of 3 RGB codes to fill and color header row, default None
 		merge_header: dict (or list of dicts)
 			map of start and end columns (index or name) to be merged in header with optional level and alignment, default None, example: {'start':0, 'end':3, 'level':1, 'alignment':'center'} with required keys "start", "end", and optional keys "level","alignment"
+		merge_labels: bool
+			whether or not to merge runs of repeated pd.MultiIndex labels, header labels across columns and index labels across rows (all levels but the innermost), default False
 		index_size: int
 			index text size in ppt font size, default 9
 		index_bold: bool
@@ -177,21 +266,34 @@ class Handler():
 			whether or not to highlight first column, default True
 		highlight_last_row: bool
 			whether or not to highlight last row, default True
+		engine: str
+			how the table is written, 'cells' fills the table cell by cell through python-pptx, 'xml' builds the table xml in a single pass (much faster for large dataframes), default 'cells'
+		column_widths: list
+			column widths in EMU (index columns first), default None (computed from the table text)
+		prepared: tuple
+			(numeric_cols, char_cols) when df was already totaled and converted to text by _prepare_frame, default None
+		pivot: dict
+			long-format df (one row per observation) is first aggregated to a wide dataframe by mspandas.aggregation.pivot with these arguements
+			(index, columns, values, aggfunc, as df.pivot_table), memoized per source dataframe, default None (df is written as it is)
 
 		Notes
 		-----
 		See http://python-pptx.readthedocs.io/en/latest/api/table.html
 		"""
 
+		# aggregate long-format data
+		if not pivot is None and prepared is None:
+			df = aggregation.pivot(df, **pivot)
+
+		# render cache, the table depends on the dataframe, the arguments and the width of the placeholder
+		key = self._cache_key('pandasPPT.create_table', df, locals(), table.width) if prepared is None else None
+		if not key is None:
+			entry = self.cache.get(key)
+			if not entry is None:
+				return self._attach_table(table, entry)
+
 		# ppt cell margins standards in inches
-		margins_master = {
-			'normal': {'top': 0.05, 'bottom': 0.05, 'left': 0.1, 'right': 0.1},
-			'none': {'top': 0, 'bottom': 0, 'left': 0, 'right': 0},
-			'narrow': {'top': 0.05, 'bottom': 0.05, 'left': 0.05, 'right': 0.05},
-			'wide': {'top': 0.15, 'bottom': 0.15, 'left': 0.15, 'right': 0.15},
-			# custom style, does not exist in ppt
-			'tight': {'top': 0.025, 'bottom': 0.025, 'left': 0.025, 'right': 0.025},
-		}
+		margins_master = layout.CELL_MARGINS
 
 		# convert column alignment map to pptx enum codes
 		try:
@@ -201,153 +303,16 @@ class Handler():
 			# python 3
 			column_alignment_map = {k:pptx.enum.text.PP_ALIGN.__dict__[v.upper()] for k,v in column_alignment_map.items()}
 
-		# total columns and concat with data as last row
-		if column_totals:
-			names = list(df.index.names)
-			ordered_columns = list(df.columns)
-			try:
-				c_totals = df.fillna(0).agg({col:(column_totals_agg_map[col] if col in column_totals_agg_map else np.sum) for col in df.columns}).rename(column_totals_label)
-			except:
-				c_totals = []
-				for col,method in column_totals_agg_map.items():
-					t = df.fillna(0)[[col]].apply(method)
-					c_totals = c_totals + [t]
-				t = df.fillna(0)[[col for col in df.columns if col not in column_totals_agg_map.keys()]].sum()
-				c_totals = c_totals + [t]
-				c_totals = pd.concat(c_totals).rename(column_totals_label)
-			c_totals = c_totals.to_frame().T
-			# create multiindex if needed
-			for i in range(df.index.nlevels-1):
-			    c_totals['dummy'] = ' '
-			    c_totals = c_totals.set_index('dummy',append=True)
-			    c_totals.index.names = [None]*len(c_totals.index.names)
-			try:
-				df = pd.concat([df, c_totals], axis=0)
-			except TypeError:
-				# df index is categorical
-				# add Total category and append
-				df.index = df.index.add_categories(column_totals_label)
-				df = pd.concat([df, c_totals], axis=0)
-			df = df.reindex_axis(ordered_columns, axis=1)
-			df.index.names = names
-		# total rows and concat with data as last column
-		if row_totals:
-			ordered_index = list(df.index)
-			try:
-				r_totals = df.T.fillna(0).agg({col:(row_totals_agg_map[col] if col in row_totals_agg_map else np.sum) for col in df.T.columns}).rename(row_totals_label)
-			except:
-				totals = []
-				for col,method in row_totals_agg_map.items():
-					t = df.T.fillna(0)[[col]].apply(method)
-					totals = totals + [t]
-				t = df.T.fillna(0)[[col for col in df.T.columns if col not in row_totals_agg_map.keys()]].sum()
-				totals = totals + [t]
-				r_totals = pd.concat(totals).rename(row_totals_label)
-			# TODO: Create multiindex if needed
-			try:
-				df = pd.concat([df, r_totals.to_frame()], axis=1)
-			except TypeError:
-				# df columns are categorical
-				# add Total category and append
-				df.columns = df.columns.add_categories(row_totals_label)
-				df = pd.concat([df, r_totals.to_frame()], axis=1)
-			df = df.reindex_axis(ordered_index, axis=0)
-		# save list of column data types
-		# accessed during dynamic formatting (e.g. paragraph alignment, column width calculations etc.)
-		if isinstance(df.columns, pd.MultiIndex):
-			numeric_cols = [(str(c1),str(c2)) for c1,c2 in df._get_numeric_data().columns]
-			char_cols = [(str(c1),str(c2)) for c1,c2 in df.columns if not (str(c1),str(c2)) in numeric_cols]
+		# total, format and encode dataframe
+		if prepared is None:
+			df, numeric_cols, char_cols = self._prepare_frame(df, column_totals=column_totals, row_totals=row_totals,
+															  column_totals_agg_map=column_totals_agg_map, row_totals_agg_map=row_totals_agg_map,
+															  column_totals_label=column_totals_label, row_totals_label=row_totals_label,
+															  header_names=header_names, index_names=index_names,
+															  number_format=number_format, number_format_map=number_format_map,
+															  encoding=encoding, encoding_errors=encoding_errors)
 		else:
-			numeric_cols = [str(col) for col in df._get_numeric_data().columns]
-			char_cols = [str(col) for col in df.columns if not str(col) in numeric_cols]
-		# counts
-		num_numeric_cols = len(numeric_cols) if len(numeric_cols) > 0 else 1
-		num_char_cols = len(char_cols) if len(char_cols) > 0 else 1
-
-		# convert numeric data to strings
-		for col in df.columns:
-			if col in df._get_numeric_data().columns:
-				fmt = number_format
-				if not number_format_map is None:
-					try:
-						fmt = number_format_map[col]
-					except KeyError:
-						# column was not specified in map
-						pass
-				df.loc[:,col] = df[col].fillna(0).apply(lambda x: fmt.format(x))
-			else:
-				# handle encoding for pptx intake
-				# convert all to unicode for acceptance
-				# values
-				while True:
-					try:
-						if (sys.version_info < (3, 0)):
-							df[col] = df[col].fillna('').apply(lambda s: unicode(s.encode(encoding), 'utf-8', errors=encoding_errors) if isinstance(s, unicode) else unicode(s, encoding))
-						else:
-							df[col] = df[col].fillna('').apply(lambda s: s.encode(encoding).decode('utf-8', errors=encoding_errors) if isinstance(s, str) else s.decode(encoding))
-						break
-					except (TypeError, AttributeError):
-						df[col] = df[col].astype(str).fillna('')
-						continue
-
-		# handle encoding for pptx intake
-		# convert all to unicode for acceptance
-		# columns
-		names = df.columns.names
-		multi = []
-		for level in range(df.columns.nlevels):
-			values = []
-			for s in df.columns.get_level_values(level):
-				try:
-					if (sys.version_info < (3, 0)):
-						values.append(unicode(s.encode(encoding), 'utf-8', errors=encoding_errors) if isinstance(s, unicode) else unicode(s, encoding))
-					else:
-						values.append(s.encode(encoding).decode('utf-8', errors=encoding_errors) if isinstance(s, str) else s.decode(encoding))
-				except (TypeError, AttributeError):
-					# value is numeric
-					values.append(str(s))
-					pass
-			if isinstance(df.columns, pd.MultiIndex):
-				multi += [values]
-				if level == df.columns.nlevels - 1:
-					df.columns = pd.MultiIndex.from_arrays(multi)
-			else:
-				df.columns = values
-		df.columns.names = names
-		# indices
-		names = df.index.names
-		multi = []
-		for level in range(df.index.nlevels):
-			values = []
-			for s in df.index.get_level_values(level):
-				try:
-					if (sys.version_info < (3, 0)):
-						values.append(unicode(s.encode(encoding), 'utf-8', errors=encoding_errors) if isinstance(s, unicode) else unicode(s, encoding))
-					else:
-						values.append(s.encode(encoding).decode('utf-8', errors=encoding_errors) if isinstance(s, str) else s.decode(encoding))
-				except (TypeError, AttributeError):
-					# value is numeric
-					values.append(str(s))
-					pass
-			if isinstance(df.index, pd.MultiIndex):
-				multi += [values]
-				if level == df.index.nlevels - 1:
-					df.index = pd.MultiIndex.from_arrays(multi)
-			else:
-				df.index = values
-		df.index.names = names
-
-		# add custom index names
-		if not index_names is None:
-			for i,name in enumerate(index_names):
-				i = None if not isinstance(df.index, pd.MultiIndex) else i
-				df.index = df.index.set_names(name, level=i)
-
-		# add custom header names
-		if not header_names is None:
-			for i,name in enumerate(header_names):
-				i = None if not isinstance(df.columns, pd.MultiIndex) else i
-				df.columns = df.columns.set_names(name, level=i)
+			numeric_cols, char_cols = prepared
 
 		# define table dimensions
 		num_rows = len(df)
@@ -358,14 +323,14 @@ class Handler():
 		if index:
 			num_cols += df.index.nlevels
 
-		# insert table into shape
-		table_shape = table.insert_table(rows=num_rows, cols=num_cols)
-
-		# get table object from graphic frame
-		table = table_shape.table
-
 		# save desired width of table shape from template
-		table_width = table_shape.width
+		table_width = table.width
+
+		# customize table column widths
+		widths = column_widths
+		if widths is None:
+			padding = (margins_master[cell_margins]['left'] + margins_master[cell_margins]['right']) * 2.54
+			widths = layout.column_widths(df, table_width, index=index, index_size=index_size, text_size=text_size, font_name=text_font_name, padding=padding)
 
 		# convert colors to docx RGB
 		if not header_text_color is None:
@@ -377,56 +342,234 @@ class Handler():
 		if not text_color is None:
 			text_color = RGBColor(*text_color)
 
-		# add header to table
-		if header:
-			for level in range(df.columns.nlevels):
-				for i in range(num_cols):
-					c = table.cell(level,i)
-					label = ' '
-					col = None
-					if index and i <= df.index.nlevels-1:
-						if any(name is not None for name in df.columns.names):
-							label = df.columns.names[level]
+		if engine == 'xml':
+			# resolve paragraph alignment of each dataframe column
+			alignments = []
+			for col in df.columns:
+				if col in column_alignment_map:
+					alignments.append(column_alignment_map[col])
+				elif col in numeric_cols:
+					alignments.append(numeric_cols_alignment)
+				elif col in char_cols:
+					alignments.append(char_cols_alignment)
+				else:
+					alignments.append(None)
+			# run formatting of each cell role
+			fonts = {
+				layout.HEADER: (header_bold, header_italic, header_size, header_text_color),
+				layout.INDEX: (index_bold, index_italic, index_size, index_text_color),
+				layout.DATA: (text_bold, text_italic, text_size, text_color),
+				layout.TOTALS: (totals_bold, totals_italic, totals_size, totals_text_color if not totals_text_color is None else text_color),
+			}
+			# insert table into shape, all rows at once
+			table_shape = self._insert_table_xml(table, df, widths, fonts, alignments, margins_master[cell_margins], text_font_name,
+												 header=header, index=index, column_totals=column_totals, row_totals=row_totals,
+												 header_color=header_color, banded_rows=banded_rows, row_height=row_height, merge_labels=merge_labels)
+			table = table_shape.table
+		else:
+			# insert table into shape
+			table_shape = table.insert_table(rows=num_rows, cols=num_cols)
+
+			# get table object from graphic frame
+			table = table_shape.table
+
+			# fill elements, built once and cloned into cells
+			header_fill = self._solidFill(RGBColor(*header_color)) if not header_color is None else None
+			band_fill = [self._solidFill(RGBColor(*style.RGB.grey_light)), self._solidFill(RGBColor(*style.RGB.grey_light2))]
+
+			# add header to table
+			if header:
+				for level in range(df.columns.nlevels):
+					for i in range(num_cols):
+						c = table.cell(level,i)
+						label = ' '
+						col = None
+						if index and i <= df.index.nlevels-1:
+							if any(name is not None for name in df.columns.names):
+								label = df.columns.names[level]
+							else:
+								label = ' '
+						elif index and i < df.index.nlevels:
+							continue
+						elif index and i > df.index.nlevels-1:
+							col = i - df.index.nlevels
+							label = df.columns.get_level_values(level)[col]
 						else:
-							label = ' '
-					elif index and i < df.index.nlevels:
-						continue
-					elif index and i > df.index.nlevels-1:
-						col = i - df.index.nlevels
-						label = df.columns.get_level_values(level)[col]
+							col = i
+							label = df.columns.get_level_values(level)[col]
+						c.text = label or ' '
+						c.margin_top = pptx.util.Inches(margins_master[cell_margins]['top'])
+						c.margin_bottom = pptx.util.Inches(margins_master[cell_margins]['bottom'])
+						c.margin_left = pptx.util.Inches(margins_master[cell_margins]['left'])
+						c.margin_right = pptx.util.Inches(margins_master[cell_margins]['right'])
+						if not header_color is None:
+							self._set_fill(c, header_fill)
+						tf = c.text_frame
+						p = tf.paragraphs[0]
+						if col is not None:
+							if df.columns[col] in column_alignment_map:
+								p.alignment = column_alignment_map[df.columns[col]]
+							else:
+								if df.columns[col] in numeric_cols:
+									p.alignment = numeric_cols_alignment
+								if df.columns[col] in char_cols:
+									p.alignment = char_cols_alignment
+						try:
+							r = p.runs[0]
+							r.font.bold = header_bold
+							r.font.italic = header_italic
+							r.font.size = pptx.util.Pt(header_size)
+							if not header_text_color is None:
+								r.font.color.rgb = header_text_color
+							r.font.name = text_font_name
+						except IndexError:
+							# mysteriously no paragraph / run exists
+							pass
+
+			# add index to table
+			if index:
+				for level in range(df.index.nlevels):
+					for i in range(num_rows):
+						c = table.cell(i,level)
+						label = ' '
+						row = None
+						keep_header_formatting = False
+						if header and i == df.columns.nlevels-1:
+							if any(name is not None for name in df.index.names):
+								label = df.index.names[level]
+								keep_header_formatting = True
+							else:
+								if header:
+									continue
+								else:
+									label = ' '
+						elif header and i < df.columns.nlevels:
+							continue
+						elif header and i >= df.columns.nlevels:
+							row = i - df.columns.nlevels
+							label = df.index.get_level_values(level)[row]
+						else:
+							row = i
+							label = df.index.get_level_values(level)[row]
+						c.text = label or ' '
+						c.margin_top = pptx.util.Inches(margins_master[cell_margins]['top'])
+						c.margin_bottom = pptx.util.Inches(margins_master[cell_margins]['bottom'])
+						c.margin_left = pptx.util.Inches(margins_master[cell_margins]['left'])
+						c.margin_right = pptx.util.Inches(margins_master[cell_margins]['right'])
+						if banded_rows:
+							if not keep_header_formatting:
+								self._set_fill(c, band_fill[(i-df.columns.nlevels) % 2])
+						tf = c.text_frame
+						p = tf.paragraphs[0]
+						try:
+							r = p.runs[0]
+							if not keep_header_formatting:
+								r.font.bold = index_bold
+								r.font.italic = index_italic
+								r.font.size = pptx.util.Pt(index_size)
+								if not index_text_color is None:
+									r.font.color.rgb = index_text_color
+								r.font.name = text_font_name
+							else:
+								r.font.bold = header_bold
+								r.font.italic = header_italic
+								r.font.size = pptx.util.Pt(header_size)
+								if not header_text_color is None:
+									r.font.color.rgb = header_text_color
+								r.font.name = text_font_name
+						except IndexError:
+							# mysteriously no paragraph / run exists
+							pass
+
+			# iterate thru dataframe matrix and add data table, cell by cell
+			# impute any missing data as empty string
+			mat = df.fillna(' ').values
+			for row in range(df.shape[0]):
+				for col in range(df.shape[1]):
+					if header and index:
+						c = table.cell(row+df.columns.nlevels,col+df.index.nlevels)
+					elif header and not index:
+						c = table.cell(row+df.columns.nlevels,col)
+					elif index and not header:
+						c = table.cell(row,col+df.index.nlevels)
 					else:
-						col = i
-						label = df.columns.get_level_values(level)[col]
-					c.text = label or ' '
+						c = table.cell(row,col)
+					c.text = mat[row,col] or ' '
+					# alternative accessor
+					#c.text = df.loc[df.index[row], df.columns[col]]
 					c.margin_top = pptx.util.Inches(margins_master[cell_margins]['top'])
 					c.margin_bottom = pptx.util.Inches(margins_master[cell_margins]['bottom'])
 					c.margin_left = pptx.util.Inches(margins_master[cell_margins]['left'])
 					c.margin_right = pptx.util.Inches(margins_master[cell_margins]['right'])
-					if not header_color is None:
-						c.fill.solid()
-						c.fill.fore_color.rgb = RGBColor(*header_color)
+					if banded_rows:
+						self._set_fill(c, band_fill[row % 2])
 					tf = c.text_frame
 					p = tf.paragraphs[0]
-					if col is not None:
-						if df.columns[col] in column_alignment_map:
-							p.alignment = column_alignment_map[df.columns[col]]
-						else:
-							if df.columns[col] in numeric_cols:
-								p.alignment = numeric_cols_alignment
-							if df.columns[col] in char_cols:
-								p.alignment = char_cols_alignment
+					if df.columns[col] in column_alignment_map:
+						p.alignment = column_alignment_map[df.columns[col]]
+					else:
+						if df.columns[col] in numeric_cols:
+							p.alignment = numeric_cols_alignment
+						elif df.columns[col] in char_cols:
+							p.alignment = char_cols_alignment
 					try:
 						r = p.runs[0]
-						r.font.bold = header_bold
-						r.font.italic = header_italic
-						r.font.size = pptx.util.Pt(header_size)
-						if not header_text_color is None:
-							r.font.color.rgb = header_text_color
+						r.font.bold = text_bold
+						r.font.italic = text_italic
+						r.font.size = pptx.util.Pt(text_size)
+						if not text_color is None:
+							r.font.color.rgb = text_color
 						r.font.name = text_font_name
 					except IndexError:
 						# mysteriously no paragraph / run exists
 						pass
 
+			# format totals
+			if column_totals:
+				for i in range(num_cols-df.index.nlevels):
+					if index:
+						c = table.cell(num_rows-1,i+df.index.nlevels)
+					else:
+						c = table.cell(num_rows-1,i)
+					tf = c.text_frame
+					p = tf.paragraphs[0]
+					r = p.runs[0]
+					r.font.bold = totals_bold
+					r.font.italic = totals_italic
+					r.font.size = pptx.util.Pt(totals_size)
+					if not totals_text_color is None:
+						r.font.color.rgb = totals_text_color
+					r.font.name = text_font_name
+			if row_totals:
+				for i in range(num_rows-df.columns.nlevels):
+					if header:
+						c = table.cell(i+df.columns.nlevels,num_cols-1)
+					else:
+						c = table.cell(i,num_cols-1)
+					tf = c.text_frame
+					p = tf.paragraphs[0]
+					r = p.runs[0]
+					r.font.bold = totals_bold
+					r.font.italic = totals_italic
+					r.font.size = pptx.util.Pt(totals_size)
+					if not totals_text_color is None:
+						r.font.color.rgb = totals_text_color
+					r.font.name = text_font_name
+
+			# customize table row hieghts
+			if not row_height is None:
+				emu = row_height * pptx.util.Length._EMUS_PER_INCH
+				for r in table.rows:
+					r.height = pptx.util.Emu(round(emu))
+
+			# write column widths
+			for col,emu in zip(table.columns, widths):
+				col.width = emu
+
+			# merge runs of repeated labels
+			if merge_labels:
+				self._merge_spans(table, *layout.label_spans(df, header=header, index=index))
+
 		# merge header cells
 		if header:
 			if not merge_header is None:
@@ -447,203 +590,244 @@ class Handler():
 					if 'alignment' in merge_header.keys():
 						p.alignment = pptx.enum.text.PP_ALIGN.__dict__[merge_header['alignment'].upper()]
 
-		# add index to table
-		if index:
-			for level in range(df.index.nlevels):
-				for i in range(num_rows):
-					c = table.cell(i,level)
-					label = ' '
-					row = None
-					keep_header_formatting = False
-					if header and i == df.columns.nlevels-1:
-						if any(name is not None for name in df.index.names):
-							label = df.index.names[level]
-							keep_header_formatting = True
-						else:
-							if header:
-								continue
-							else:
-								label = ' '
-					elif header and i < df.columns.nlevels:
-						continue
-					elif header and i >= df.columns.nlevels:
-						row = i - df.columns.nlevels
-						label = df.index.get_level_values(level)[row]
-					else:
-						row = i
-						label = df.index.get_level_values(level)[row]
-					c.text = label or ' '
-					c.margin_top = pptx.util.Inches(margins_master[cell_margins]['top'])
-					c.margin_bottom = pptx.util.Inches(margins_master[cell_margins]['bottom'])
-					c.margin_left = pptx.util.Inches(margins_master[cell_margins]['left'])
-					c.margin_right = pptx.util.Inches(margins_master[cell_margins]['right'])
-					if banded_rows:
-						if not keep_header_formatting:
-							c.fill.solid()
-							c.fill.fore_color.rgb = RGBColor(*style.RGB.grey_light) if (i-df.columns.nlevels) % 2 == 0 else RGBColor(*style.RGB.grey_light2)
-					tf = c.text_frame
-					p = tf.paragraphs[0]
-					try:
-						r = p.runs[0]
-						if not keep_header_formatting:
-							r.font.bold = index_bold
-							r.font.italic = index_italic
-							r.font.size = pptx.util.Pt(index_size)
-							if not index_text_color is None:
-								r.font.color.rgb = index_text_color
-							r.font.name = text_font_name
-						else:
-							r.font.bold = header_bold
-							r.font.italic = header_italic
-							r.font.size = pptx.util.Pt(header_size)
-							if not header_text_color is None:
-								r.font.color.rgb = header_text_color
-							r.font.name = text_font_name
-					except IndexError:
-						# mysteriously no paragraph / run exists
-						pass
-
-		# iterate thru dataframe matrix and add data table, cell by cell
-		# impute any missing data as empty string
-		mat = df.fillna(' ').as_matrix()
-		for row in range(df.shape[0]):
-			for col in range(df.shape[1]):
-				if header and index:
-					c = table.cell(row+df.columns.nlevels,col+df.index.nlevels)
-				elif header and not index:
-					c = table.cell(row+df.columns.nlevels,col)
-				elif index and not header:
-					c = table.cell(row,col+df.index.nlevels)
-				else:
-					c = table.cell(row,col)
-				c.text = mat[row,col] or ' '
-				# alternative accessor
-				#c.text = df.loc[df.index[row], df.columns[col]]
-				c.margin_top = pptx.util.Inches(margins_master[cell_margins]['top'])
-				c.margin_bottom = pptx.util.Inches(margins_master[cell_margins]['bottom'])
-				c.margin_left = pptx.util.Inches(margins_master[cell_margins]['left'])
-				c.margin_right = pptx.util.Inches(margins_master[cell_margins]['right'])
-				if banded_rows:
-					c.fill.solid()
-					c.fill.fore_color.rgb = RGBColor(*style.RGB.grey_light) if row % 2 == 0 else RGBColor(*style.RGB.grey_light2)
-				tf = c.text_frame
-				p = tf.paragraphs[0]
-				if df.columns[col] in column_alignment_map:
-					p.alignment = column_alignment_map[df.columns[col]]
-				else:
-					if df.columns[col] in numeric_cols:
-						p.alignment = numeric_cols_alignment
-					elif df.columns[col] in char_cols:
-						p.alignment = char_cols_alignment
-				try:
-					r = p.runs[0]
-					r.font.bold = text_bold
-					r.font.italic = text_italic
-					r.font.size = pptx.util.Pt(text_size)
-					if not text_color is None:
-						r.font.color.rgb = text_color
-					r.font.name = text_font_name
-				except IndexError:
-					# mysteriously no paragraph / run exists
-					pass
-
-		# format totals
-		if column_totals:
-			for i in range(num_cols-df.index.nlevels):
-				if index:
-					c = table.cell(num_rows-1,i+df.index.nlevels)
-				else:
-					c = table.cell(num_rows-1,i)
-				tf = c.text_frame
-				p = tf.paragraphs[0]
-				r = p.runs[0]
-				r.font.bold = totals_bold
-				r.font.italic = totals_italic
-				r.font.size = pptx.util.Pt(totals_size)
-				if not totals_text_color is None:
-					r.font.color.rgb = totals_text_color
-				r.font.name = text_font_name
-		if row_totals:
-			for i in range(num_rows-df.columns.nlevels):
-				if header:
-					c = table.cell(i+df.columns.nlevels,num_cols-1)
-				else:
-					c = table.cell(i,num_cols-1)
-				tf = c.text_frame
-				p = tf.paragraphs[0]
-				r = p.runs[0]
-				r.font.bold = totals_bold
-				r.font.italic = totals_italic
-				r.font.size = pptx.util.Pt(totals_size)
-				if not totals_text_color is None:
-					r.font.color.rgb = totals_text_color
-				r.font.name = text_font_name
-
-		# customize table row hieghts
-		if not row_height is None:
-			emu = row_height * pptx.util.Length._EMUS_PER_INCH
-			for r in table.rows:
-				r.height = pptx.util.Emu(round(emu))
-
-		# customize table column widths
-		min_col_w = 4 #cm
-		max_col_w = table_width / pptx.util.Length._EMUS_PER_CM / 2 # num_char_cols (don't hog the table)
-		w_columns = 0
-		for ix,col in enumerate(table.columns):
-			if index and ix < df.index.nlevels:
-				# compute width dynamically based on max text size in index, proportional to text size
-				cm = min( max( len(max([s for s in df.index.get_level_values(ix)], key=len)) * 2 * (1/index_size), min_col_w), max_col_w)
-				col.width = pptx.util.Cm(int(np.ceil(cm)))
-				w_columns += col.width
-				continue
-			elif index:
-				# adjust ppt table column index for dataframe indexing
-				df_ix = ix - df.index.nlevels
-			else:
-				# no index in ppt table, columns line up
-				df_ix = ix
-			# compute width dynamically based on max text size in column, proportional to text size
-			cm = min( max( len(max([s for s in df.loc[:,df.columns[df_ix]]], key=len)) * 2 * (1/text_size), min_col_w), max_col_w)
-			col.width = pptx.util.Cm(int(np.ceil(cm)))
-			w_columns += col.width
-
-		# check if column widths overflow template table width
-		if w_columns > table_width:
-			# compute overflow and adjust columns proportionally
-			w_overflow = w_columns - table_width
-			w_columns_over = w_columns
-			w_columns = 0
-			for ix,col in enumerate(table.columns):
-				# compute col's percent of table size
-				percent_of_table = col.width / w_columns_over
-				# compute factor of overflow as reduction amount
-				reduction_amount = percent_of_table * w_overflow
-				# reduce
-				col.width = col.width - pptx.util.Emu(round(reduction_amount))
-				w_columns += col.width
-
-		# check if column widths do not fill template table width
-		if w_columns < table_width:
-			# compute deficit and adjust columns proportionally
-			w_deficit = table_width - w_columns
-			w_columns_under = w_columns
-			w_columns = 0
-			for ix,col in enumerate(table.columns):
-				# compute col's percent of table size
-				percent_of_table = col.width / w_columns_under
-				# compute factor of deficit as extension amount
-				extension_amount = percent_of_table * w_deficit
-				# extend
-				col.width = col.width + pptx.util.Emu(round(extension_amount))
-				w_columns += col.width
-
 		# highlight rows, or columns
 		table.first_row = highlight_first_row
 		table.first_col = hightlight_first_col
 		table.last_row = highlight_last_row
 
+		if not key is None:
+			# the table and its size, the position is the target shape's
+			xfrm = table_shape._element.find(qn('p:xfrm'))
+			self.cache.set(key, {'graphic.xml': etree.tostring(table_shape._element.find(qn('a:graphic'))), 'ext.xml': etree.tostring(xfrm.find(qn('a:ext')))})
+
 		return table_shape
 
+	def update_table(self, table, df,
+					 header=True, index=True, header_names=None, index_names=None,
+					 column_totals=False, row_totals=False, column_totals_agg_map={}, row_totals_agg_map={}, column_totals_label='Total', row_totals_label='Total',
+					 number_format='{:,.2f}', number_format_map=None, encoding='utf-8', encoding_errors='strict', merge_labels=False):
+		"""Update the text of a ppt table created by create_table with a new pandas dataframe, rewriting only the cells that changed
+
+		Parameters
+		----------
+		table: pptx.shapes.graphfrm.GraphicFrame
+			pptx table shape object returned by create_table (or read back from a saved presentation)
+		df: pd.DataFrame
+			pandas dataframe object, of the same shape as the dataframe the table was created from
+
+		Returns
+		-------
+		table: pptx.shapes.graphfrm.GraphicFrame
+			the same pptx table shape object
+
+		Keyword Arguements
+		------------------
+		header, index, header_names, index_names, column_totals, row_totals, column_totals_agg_map, row_totals_agg_map, column_totals_label,
+		row_totals_label, number_format, number_format_map, encoding, encoding_errors, merge_labels:
+			as passed to create_table when the table was created, they decide the text of every cell (cells covered by merged labels have none)
+
+		Notes
+		-----
+		Changed cells keep the paragraph and run formatting of their first run, cell fills, widths and merges are left as they are.
+		Raises ValueError when the table does not have the rows and columns the dataframe needs.
+		"""
+
+		# total, format and encode dataframe
+		df, numeric_cols, char_cols = self._prepare_frame(df, column_totals=column_totals, row_totals=row_totals,
+														  column_totals_agg_map=column_totals_agg_map, row_totals_agg_map=row_totals_agg_map,
+														  column_totals_label=column_totals_label, row_totals_label=row_totals_label,
+														  header_names=header_names, index_names=index_names,
+														  number_format=number_format, number_format_map=number_format_map,
+														  encoding=encoding, encoding_errors=encoding_errors)
+		labels, roles, bands = layout.table_grid(df, header=header, index=index, column_totals=column_totals, row_totals=row_totals)
+
+		tbl = table.table._tbl
+		tcs = [tr.tc_lst for tr in tbl.tr_lst]
+		if len(tcs) != labels.shape[0] or any(len(row) != labels.shape[1] for row in tcs):
+			raise ValueError('table has {} rows of {} cells, dataframe needs {} rows of {} cells'.format(
+				len(tcs), len(tbl.tblGrid.gridCol_lst), labels.shape[0], labels.shape[1]))
+
+		# text already in the table, cells create_table left empty are never written
+		paragraphs, t = '{}/{}'.format(qn('a:txBody'), qn('a:p')), qn('a:t')
+		text = np.array([['\n'.join([''.join([e.text or '' for e in p.iter(t)]) for p in tc.iterfind(paragraphs)]) for tc in row] for row in tcs], dtype=object)
+		labels = np.vectorize(str, otypes=[object])(labels)
+		changed = (text != labels) & (roles != layout.EMPTY)
+		if merge_labels:
+			# cells covered by a merged label are left without text, as create_table leaves them
+			grid_spans, row_spans = layout.label_spans(df, header=header, index=index)
+			changed &= (grid_spans != 0) & (row_spans != 0)
+		for row,col in zip(*np.nonzero(changed)):
+			self._set_cell_text(tcs[row][col], labels[row, col])
+
+		return table
+
+	def create_paginated_table(self, ppt, slide_layout, placeholder_name, df, rows_per_slide=None, title=None, template_index=None, **kwargs):
+		"""Create ppt tables of a pandas dataframe split across as many slides as needed
+
+		Parameters
+		----------
+		ppt: pptx.Presentation
+			presentation object, slides are appended to it
+		slide_layout: pptx.slide.SlideLayout
+			slide layout object holding the table placeholder, see map_layouts
+		placeholder_name: str
+			name of the table placeholder in slide_layout, see map_shapes
+		df: pd.DataFrame
+			pandas dataframe object, can have pd.MultiIndex on either axis
+
+		Returns
+		-------
+		tables: list
+			pptx table shape objects, one per slide
+
+		Keyword Arguements
+		------------------
+		rows_per_slide: int
+			number of dataframe rows on each slide, default None (as many rows of row_height as fit the placeholder below the header)
+		title: str
+			text of the title on every slide, default None
+		template_index: mspandas.template.TemplateIndex
+			index of the layouts of ppt the placeholder is looked up in, see index_template, default None (the memoized index of ppt's layouts)
+		**kwargs:
+			keyword arguements of create_table, applied to every slide
+
+		Notes
+		-----
+		The dataframe is totaled and converted to text and its column widths are computed once, every slide then gets a slice of its rows
+		under a repeated header. Totals are computed over the whole dataframe, column totals are written on the last slide.
+		Slides are added in one pass (see _add_slides), so the time taken grows linearly with the number of slides.
+		"""
+
+		def argspec(method):
+			try:
+				return inspect.getfullargspec(method)
+			except AttributeError:
+				# python 2.7
+				return inspect.getargspec(method)
+
+		# create_table options, defaults overridden by kwargs
+		spec = argspec(self.create_table)
+		options = dict(zip(spec.args[-len(spec.defaults):], spec.defaults))
+		options.update(kwargs)
+
+		# aggregate long-format data, then total, format and encode dataframe once
+		if not options['pivot'] is None:
+			df = aggregation.pivot(df, **options['pivot'])
+		prepare_args = argspec(self._prepare_frame).args
+		df, numeric_cols, char_cols = self._prepare_frame(df, **{k:v for k,v in options.items() if k in prepare_args})
+
+		# placeholder dimensions from the layout
+		if template_index is None:
+			template_index = TemplateIndex.load(ppt)
+		placeholder = template_index.placeholder(slide_layout.name, placeholder_name)
+		idx = placeholder['idx']
+
+		# column widths of all slides
+		widths = options['column_widths']
+		if widths is None:
+			margins = layout.CELL_MARGINS[options['cell_margins']]
+			widths = layout.column_widths(df, placeholder['width'], index=options['index'], index_size=options['index_size'], text_size=options['text_size'],
+										  font_name=options['text_font_name'], padding=(margins['left'] + margins['right']) * 2.54)
+
+		# rows of each slide, python-pptx default row height is 370840 EMU
+		if rows_per_slide is None:
+			height = 370840 if options['row_height'] is None else int(round(options['row_height'] * pptx.util.Length._EMUS_PER_INCH))
+			header_rows = df.columns.nlevels if options['header'] else 0
+			rows_per_slide = max(int(placeholder['height'] // height) - header_rows, 1)
+		starts = list(range(0, max(len(df), 1), rows_per_slide))
+
+		# add all slides, then fill them
+		slides = self._add_slides(ppt, slide_layout, len(starts))
+		tables = []
+		for slide,start in zip(slides, starts):
+			if not title is None and not slide.shapes.title is None:
+				slide.shapes.title.text = title
+			last = start + rows_per_slide >= len(df)
+			page_kwargs = dict(kwargs, pivot=None, column_totals=options['column_totals'] and last, column_widths=widths, prepared=(numeric_cols, char_cols))
+			tables.append(self.create_table(slide.placeholders[idx], df.iloc[start:start + rows_per_slide], **page_kwargs))
+
+		return tables
+
+	def render_slides(self, template, specs, processes=None, batch_size=None):
+		"""Render slides of pandas dataframes in a process pool and merge them into one presentation
+
+		Parameters
+		----------
+		template: str or file-like
+			pptx file of the template presentation
+		specs: list
+			slide specs, tuples of (layout name, placeholder name, df, kwargs), see map_layouts and map_shapes,
+			a table placeholder is filled with create_table and a chart placeholder with create_chart, using kwargs
+
+		Returns
+		-------
+		ppt: pptx.Presentation
+			template presentation with one slide appended per spec, in order of specs
+
+		Keyword Arguements
+		------------------
+		processes: int
+			number of worker processes, default None (number of cpus), 1 renders in this process without merging
+		batch_size: int
+			number of slides rendered by a worker at a time, default None (specs spread over 4 batches per process)
+
+		Notes
+		-----
+		Each worker loads the template once and renders batches of slides into it, a batch is returned as a saved presentation
+		and the slides it added are removed from the worker's template again. Slides added by each batch (i.e. after the slides the
+		template already holds) are then copied into the result
+		presentation with all parts they relate to (charts, embedded workbooks, images), parts get the next free part name of their
+		kind and relationship ids are rewritten where they change, so the result matches rendering the specs serially.
+		Where worker processes are spawned rather than forked (e.g. Windows), render_slides must be called under if __name__ == '__main__'.
+		"""
+
+		if hasattr(template, 'read'):
+			template = template.read()
+		else:
+			with open(template, 'rb') as f:
+				template = f.read()
+		ppt = pptx.Presentation(io.BytesIO(template))
+		index = self.index_template(template)
+		specs = list(specs)
+
+		if processes is None:
+			processes = multiprocessing.cpu_count()
+		if processes == 1 or len(specs) <= 1:
+			for spec in specs:
+				self._render_slide(ppt, index, *spec)
+			return ppt
+
+		if batch_size is None:
+			batch_size = max(-(-len(specs) // (processes * 4)), 1)
+		batches = [specs[i:i + batch_size] for i in range(0, len(specs), batch_size)]
+
+		# numbers of the part names already in the template by kind, copied parts are numbered after them
+		partnames = {}
+		for part in ppt.part.package.iter_parts():
+			stem, n, ext = re.match(r'^(.*?)(\d*)(\.\w+)$', part.partname).groups()
+			partnames.setdefault((stem, ext), set()).add(int(n or 0))
+		layouts = dict((slide_layout.name, slide_layout.part) for slide_layout in ppt.slide_layouts)
+
+		# slides are related to directly, python-pptx scans all relationships and slide ids of the presentation per slide
+		sldIdLst = ppt.slides._sldIdLst
+		slide_id = sldIdLst._next_id
+		template_slides = len(sldIdLst)
+		pool = multiprocessing.Pool(processes, initializer=_init_worker, initargs=(template, index))
+		try:
+			for blob in pool.imap(_render_batch, batches):
+				batch = pptx.Presentation(io.BytesIO(blob))
+				copies = {}
+				for slide in list(batch.slides)[template_slides:]:
+					slide_part = self._copy_part(slide.part, ppt.part.package, partnames, layouts, copies)
+					rId = ppt.part.rels._add_relationship(RT.SLIDE, slide_part)
+					sldIdLst._add_sldId(id=slide_id, rId=rId)
+					slide_id += 1
+		finally:
+			pool.close()
+			pool.join()
+
+		return ppt
+
 	def create_chart(self, chart, df,
 					 chart_type=pptx.enum.chart.XL_CHART_TYPE.LINE, #chart_style=1,
 					 text_font_name=style.Font.name,
@@ -655,9 +839,10 @@ class Handler():
 					 chart_legend=True, legend_in_layout=False, legend_position=pptx.enum.chart.XL_LEGEND_POSITION.BOTTOM,
 					 legend_text_size=10, legend_text_bold=False, legend_text_color=None,
 					 category_axis_label=None, value_axis_label=None,
-					 highlight_line=None, number_format=None,
+					 highlight_line=None, number_format=None, date_format=None,
 					 line_width=30000, bar_gap_width=None, bar_overlap=None,
-					 encoding='utf-8', encoding_errors='strict'):
+					 pivot=None, x_column=None, size_column=None, max_points=None, downsample_method='lttb',
+					 encoding='utf-8', encoding_errors='strict', workbook=True, engine=None):
 		"""Create a ppt chart using a pandas dataframe
 
 		Parameters
@@ -670,7 +855,8 @@ class Handler():
 		Returns
 		-------
 		chart: pptx.shapes.chart
-			pptx chart shape object, access chart.Chart for chart object inside placeholder shape
+			pptx chart shape object, access chart.Chart for chart object inside placeholder shape,
+			chart.dropped_points holds the number of points dropped from each series by downsampling, a dict keyed by series name
 
 		Keyword Arguements
 		------------------
@@ -730,44 +916,92 @@ class Handler():
 			name of line chart series (dataframe column) to be increased in wheight by 2x for emphasis, default None
 		number_format: str
 			formatted string as per Microsoft's standard, default is None (i.e ppt infers), for help see: http://python-pptx.readthedocs.io/en/latest/api/enum/ExcelNumFormat.html
+		date_format: str
+			number format of the date axis labels when the categories (or x values) are dates (e.g. 'mmm yyyy'), default None (i.e. yyyy-mm-dd)
 		line_width: int
 			width of line in EMU, default 30000
 		bar_gap_width: int
 			percent of bar width (from 0 to 500) to be set as gap width between bars, default None (i.e. ppt infers)
 		bar_overlap: int
 			percent of bar width (from -100 to 100) to be set as overlap amount of adjacent bars, default None (i.e. ppt infers)
+		pivot: dict
+			long-format df (one row per observation) is first aggregated to a wide dataframe by mspandas.aggregation.pivot with these arguements
+			(index, columns, values, aggfunc, as df.pivot_table), memoized per source dataframe, default None (df is written as it is)
+		x_column: str
+			column holding the x values of XY and bubble charts, default None (the index holds them)
+		size_column: str
+			column holding the bubble sizes of bubble charts, shared by all series, default None
+		max_points: int
+			number of rows (points of every series) kept of long (e.g. minute level) line series, rows are picked for all series at once, see mspandas.downsample,
+			does not apply to XY and bubble charts, default None (all points)
+		downsample_method: str
+			'lttb' keeps the rows of largest triangles (Largest-Triangle-Three-Buckets), 'minmax' the lowest and highest row of every bucket,
+			default 'lttb'
+		workbook: bool or str
+			embedded workbook holding the chart data, edited with 'Edit Data' in ppt, only applies to the numpy engine,
+			True writes it now, 'defer' writes it when the presentation is saved and False leaves it out (chart data is then read only), default True
+		engine: str
+			'chartdata' adds every point through python-pptx ChartData, 'numpy' writes the chart caches and workbook of all points from the dataframe columns
+			at once (much faster on long series, same chart), default None ('numpy' for XY and bubble charts, 'chartdata' otherwise)
 
 		Notes
 		-----
-		Your dataframe must be properly formatted! Use df.pivot_table() for typical transformation.
+		Your dataframe must be properly formatted! Use df.pivot_table(), or pivot for long-format data, for typical transformation.
 			- For chart type Line or Column, the dataframe index represents x axis, columns represents series, and values represents y axis.
 			- For chart type Pie, the dataframe should have a single row with no index where columns represents series and values represent size.
+			- For XY and bubble chart types, the index (or x_column) represents x axis, size_column the bubble sizes, and every other column a series of y values.
+			- Dates (pd.DatetimeIndex, pd.PeriodIndex or date labels) are written as excel dates on a date axis, in whole days of their local time,
+			  the axis counts days, months or years as the dates fall on the first of a month or year.
+			- A pd.MultiIndex represents multi-level categories, one level per index level with the outermost first (e.g. region, then day),
+			  the numpy engine writes them from the index codes in one pass (python-pptx ChartData nests them category by category).
+		With a render cache, a deferred workbook is written when the chart is stored in the cache.
 		"""
 
+		# aggregate long-format data
+		if not pivot is None:
+			df = aggregation.pivot(df, **pivot)
+
+		# render cache, the chart depends on the dataframe and the arguments
+		key = self._cache_key('pandasPPT.create_chart', df, locals())
+		if not key is None:
+			entry = self.cache.get(key)
+			if not entry is None:
+				chart_shape = self._attach_chart(chart, entry)
+				chart_shape.dropped_points = json.loads(entry['dropped_points.json'].decode('utf-8'))
+				return chart_shape
+
 		# impute any missing data as 0
 		df = df.fillna(0)
 
-		# create chart data
-		chart_data = ChartData()
+		# x values and bubble sizes of XY and bubble charts
+		xy = chart_type in XY_CHART_TYPES or chart_type in BUBBLE_CHART_TYPES
 
-		# assign categories to chart data
-		chart_data.categories = df.index
+		# python-pptx adds XY and bubble data point by point, they are written from the dataframe columns unless chartdata is asked for
+		if engine is None:
+			engine = 'numpy' if xy else 'chartdata'
 
-		# populate chart data
-		if chart_type == pptx.enum.chart.XL_CHART_TYPE.PIE:
-			# PIE charts are special, use only single column as series
-			for col in df.columns:
-				try:
-					chart_data.add_series(str(col), (list(df[col])))
-				except UnicodeEncodeError:
-					chart_data.add_series(col.encode('ascii', errors='ignore'), (list(df[col])))
+		# dates of a date axis
+		dates = chartdata.date_index(df.index if not xy or x_column is None else pd.Index(df[x_column]))
+		if not dates is None and (not xy or x_column is None):
+			df.index = dates
+
+		if xy:
+			x_values, bubble_sizes, df = self._xy_values(df, chart_type, x_column=x_column, size_column=size_column)
+
+		# keep a point budget of long series
+		dropped_points = pd.Series(0, index=df.columns)
+		if not max_points is None and not xy:
+			df, dropped_points = downsample.frame(df, max_points, method=downsample_method)
+		dropped_points = dict((str(col), int(count)) for col,count in dropped_points.items())
+
+		# the numpy engine lays out the chart from its first category (or point), then writes all points
+		data = df if engine == 'chartdata' else df.iloc[:1]
+
+		# create chart data
+		if xy:
+			chart_data = self._xy_chart_data(x_values[:len(data)], data, bubble_sizes=None if bubble_sizes is None else bubble_sizes[:len(data)])
 		else:
-			# iterate rows, add each row as series
-			for col,row in df.iteritems():
-				try:
-					chart_data.add_series(str(col), (list(row)))
-				except UnicodeEncodeError:
-					chart_data.add_series(col.encode('ascii', errors='ignore'), (list(row)))
+			chart_data = self._chart_data(data)
 
 		# insert chart into shape
 		chart_shape = chart.insert_chart(chart_type, chart_data)
@@ -775,6 +1009,16 @@ class Handler():
 		# get chart object from graphic frame
 		chart = chart_shape.chart
 
+		# write all points
+		if engine == 'numpy' and xy:
+			self._write_xy_chart_data(chart, x_values, df, bubble_sizes=bubble_sizes, workbook=workbook)
+		elif engine == 'numpy':
+			self._write_chart_data(chart, df, workbook=workbook)
+
+		# date axis
+		if not dates is None:
+			self._date_axis(chart, dates, date_format=date_format)
+
 		# convert colors to pptx RGB
 		if not chart_title_text_color is None:
 			chart_title_text_color = RGBColor(*chart_title_text_color)
@@ -822,21 +1066,26 @@ class Handler():
 		plot = chart.plots[0]
 
 		# labels
-		plot.has_data_labels = data_labels
+		if chart_type in XY_CHART_TYPES:
+			# python-pptx has no data labels of XY plots
+			labels = self._xy_data_labels(plot) if data_labels else None
+		else:
+			plot.has_data_labels = data_labels
+			labels = plot.data_labels if data_labels else None
 		if data_labels:
-			plot.data_labels.font.size = data_label_text_size
-			plot.data_labels.font.bold = data_label_text_bold
+			labels.font.size = data_label_text_size
+			labels.font.bold = data_label_text_bold
 			if not data_label_text_color is None:
-				plot.data_labels.font.color.rgb = data_label_text_color
-			plot.data_labels.font.name = text_font_name
+				labels.font.color.rgb = data_label_text_color
+			labels.font.name = text_font_name
 			if not data_label_position is None:
-				plot.data_labels.position = data_label_position
+				labels.position = data_label_position
 			if data_label_rotate:
 				# currently only supports rotation -270 degrees
-				txPr = plot.data_labels._element.get_or_add_txPr()
+				txPr = labels._element.get_or_add_txPr()
 				txPr.bodyPr.set('rot','-5400000')
 			if number_format:
-				plot.data_labels.number_format = number_format
+				labels.number_format = number_format
 
 		# set initial chart style (NOT WORKING)
 		# chart.chart_style = chart_style
@@ -849,7 +1098,17 @@ class Handler():
 					for i, slice in enumerate(series.points):
 						slice.format.fill.solid()
 						slice.format.fill.fore_color.rgb = RGBColor(*style.RGB.colorbar_colorbrewer[i])
-				if chart_type == pptx.enum.chart.XL_CHART_TYPE.LINE:
+				if chart_type in XY_CHART_TYPES:
+					if not chart_type in XY_NO_MARKER_CHART_TYPES:
+						series.marker.format.fill.solid()
+						series.marker.format.fill.fore_color.rgb = RGBColor(*style.RGB.colorbar_colorbrewer[i])
+						series.marker.format.line.color.rgb = RGBColor(*style.RGB.colorbar_colorbrewer[i])
+					if chart_type in XY_LINE_CHART_TYPES:
+						series.format.line.width = line_width
+						series.format.line.color.rgb = RGBColor(*style.RGB.colorbar_colorbrewer[i])
+						if not highlight_line is None and i == df.columns.get_loc(highlight_line):
+							series.format.line.width = line_width * 2
+				elif chart_type == pptx.enum.chart.XL_CHART_TYPE.LINE:
 					series.format.line.width = line_width
 					series.format.line.color.rgb = RGBColor(*style.RGB.colorbar_colorbrewer[i])
 					if not highlight_line is None and i == df.columns.get_loc(highlight_line):
@@ -920,4 +1179,802 @@ class Handler():
 				# only bar and column charts have this setting
 				pass
 
+		if not key is None:
+			entry = {'chart.xml': etree.tostring(chart._chartSpace)}
+			xlsx_part = chart.part.chart_workbook.xlsx_part
+			if not xlsx_part is None:
+				entry['workbook.xlsx'] = xlsx_part.blob
+			entry['dropped_points.json'] = json.dumps(dropped_points).encode('utf-8')
+			self.cache.set(key, entry)
+
+		chart_shape.dropped_points = dropped_points
 		return chart_shape
+
+	def refresh_chart(self, chart, df, workbook=True, engine=None, x_column=None, size_column=None):
+		"""Replace the categories and series data of an existing ppt chart with a pandas dataframe, keeping its formatting
+
+		Parameters
+		----------
+		chart: pptx.shapes.graphfrm.GraphicFrame
+			pptx graphic frame holding a chart, e.g. a styled chart of a template slide
+		df: pd.DataFrame
+			pandas dataframe object, formatted as for create_chart
+
+		Returns
+		-------
+		chart: pptx.shapes.graphfrm.GraphicFrame
+			the same pptx chart shape object
+
+		Keyword Arguements
+		------------------
+		workbook: bool or str
+			embedded workbook holding the chart data, only applies to the numpy engine,
+			True writes it now, 'defer' writes it when the presentation is saved and False leaves it out, default True
+		engine: str
+			'chartdata' replaces the data through python-pptx ChartData, 'numpy' writes the chart caches and workbook from the dataframe columns
+			at once, default None ('numpy' for XY and bubble charts, 'chartdata' otherwise)
+		x_column: str
+			column holding the x values of XY and bubble charts, default None (the index holds them)
+		size_column: str
+			column holding the bubble sizes of bubble charts, shared by all series, default None
+
+		Notes
+		-----
+		Series keep their formatting by position, series beyond the existing ones take the chart defaults and surplus series are removed.
+		Chart and axis titles, legend, axes and data labels are left as they are. Dates are written as create_chart writes them.
+		XY and bubble charts (by the type of the chart) are refreshed with x values and bubble sizes, as create_chart writes them.
+		"""
+
+		# impute any missing data as 0
+		df = df.fillna(0)
+
+		# x values and bubble sizes of XY and bubble charts
+		chart_type = chart.chart.chart_type
+		xy = chart_type in XY_CHART_TYPES or chart_type in BUBBLE_CHART_TYPES
+		if engine is None:
+			engine = 'numpy' if xy else 'chartdata'
+
+		# dates of a date axis, as create_chart writes them
+		dates = chartdata.date_index(df.index if not xy or x_column is None else pd.Index(df[x_column]))
+		if not dates is None and (not xy or x_column is None):
+			df.index = dates
+
+		if xy:
+			x_values, bubble_sizes, df = self._xy_values(df, chart_type, x_column=x_column, size_column=size_column)
+
+		# the numpy engine replaces the data of the first category (or point), then writes all points
+		data = df if engine == 'chartdata' else df.iloc[:1]
+		if xy:
+			chart.chart.replace_data(self._xy_chart_data(x_values[:len(data)], data, bubble_sizes=None if bubble_sizes is None else bubble_sizes[:len(data)]))
+		else:
+			chart.chart.replace_data(self._chart_data(data))
+
+		# write all points
+		if engine == 'numpy' and xy:
+			self._write_xy_chart_data(chart.chart, x_values, df, bubble_sizes=bubble_sizes, workbook=workbook)
+		elif engine == 'numpy':
+			self._write_chart_data(chart.chart, df, workbook=workbook)
+
+		# time unit of a date axis, its number format is kept
+		if not dates is None:
+			self._date_axis(chart.chart, dates)
+
+		return chart
+
+	def _prepare_frame(self, df, column_totals=False, row_totals=False, column_totals_agg_map={}, row_totals_agg_map={}, column_totals_label='Total', row_totals_label='Total',
+					   header_names=None, index_names=None, number_format='{:,.2f}', number_format_map=None, encoding='utf-8', encoding_errors='strict'):
+		"""Append totals to a dataframe and convert all of its values, index and column labels to text
+
+		Parameters
+		----------
+		df: pd.DataFrame
+			pandas dataframe object, can have pd.MultiIndex on either axis
+
+		Returns
+		-------
+		df: pd.DataFrame
+			prepared dataframe
+		numeric_cols: list
+			labels of the columns which held numeric data
+		char_cols: list
+			labels of the other columns
+
+		Notes
+		-----
+		Keyword arguements are those of create_table.
+		"""
+
+		# total columns as last row and rows as last column
+		df = totals.append(df, column_totals=column_totals, row_totals=row_totals,
+						   column_totals_agg_map=column_totals_agg_map, row_totals_agg_map=row_totals_agg_map,
+						   column_totals_label=column_totals_label, row_totals_label=row_totals_label)
+		# save list of column data types
+		# accessed during dynamic formatting (e.g. paragraph alignment, column width calculations etc.)
+		if isinstance(df.columns, pd.MultiIndex):
+			numeric_cols = [(str(c1),str(c2)) for c1,c2 in df._get_numeric_data().columns]
+			char_cols = [(str(c1),str(c2)) for c1,c2 in df.columns if not (str(c1),str(c2)) in numeric_cols]
+		else:
+			numeric_cols = [str(col) for col in df._get_numeric_data().columns]
+			char_cols = [str(col) for col in df.columns if not str(col) in numeric_cols]
+
+		# convert numeric data to strings
+		for col in df.columns:
+			if col in df._get_numeric_data().columns:
+				fmt = number_format
+				if not number_format_map is None:
+					try:
+						fmt = number_format_map[col]
+					except KeyError:
+						# column was not specified in map
+						pass
+				df.loc[:,col] = formatting.format_numbers(df[col], fmt)
+			else:
+				# handle encoding for pptx intake
+				# convert all to unicode for acceptance
+				# values
+				df[col] = strings.column(df[col], encoding=encoding, encoding_errors=encoding_errors)
+
+		# handle encoding for pptx intake
+		# convert all to unicode for acceptance
+		# columns and indices, level by level
+		df.columns = strings.labels(df.columns, encoding=encoding, encoding_errors=encoding_errors)
+		df.index = strings.labels(df.index, encoding=encoding, encoding_errors=encoding_errors)
+
+		# add custom index names
+		if not index_names is None:
+			for i,name in enumerate(index_names):
+				i = None if not isinstance(df.index, pd.MultiIndex) else i
+				df.index = df.index.set_names(name, level=i)
+
+		# add custom header names
+		if not header_names is None:
+			for i,name in enumerate(header_names):
+				i = None if not isinstance(df.columns, pd.MultiIndex) else i
+				df.columns = df.columns.set_names(name, level=i)
+
+		return df, numeric_cols, char_cols
+
+	def _insert_table_xml(self, table, df, widths, fonts, alignments, margins, font_name,
+						  header=True, index=True, column_totals=False, row_totals=False, header_color=None, banded_rows=True, row_height=.15, merge_labels=False):
+		"""Insert a ppt table built from a prepared dataframe in a single pass
+
+		Parameters
+		----------
+		table: pptx.shapes.placeholder.TablePlaceholder
+			table placeholder to insert the table into
+		df: pd.DataFrame
+			prepared dataframe, all values, index and column labels converted to text
+		widths: list
+			column widths in EMU
+		fonts: dict
+			map of cell role (see mspandas.layout) to (bold, italic, size, color) run formatting
+		alignments: list
+			paragraph alignment of each dataframe column, None for no alignment
+		margins: dict
+			cell margins in inches, keys 'top', 'bottom', 'left', 'right'
+		font_name: str
+			font name applied to all table text
+
+		Returns
+		-------
+		table_shape: pptx.shapes.placeholder.PlaceholderGraphicFrame
+			pptx table shape object
+
+		Keyword Arguements
+		------------------
+		merge_labels: bool
+			whether or not to merge runs of repeated MultiIndex labels (see layout.label_spans), covered cells are written without text, default False
+
+		Notes
+		-----
+		Formatting xml is rendered once per cell role (or column) through python-pptx and then stamped into every cell,
+		so the output matches the cell by cell engine without creating a python-pptx proxy per cell.
+		"""
+
+		labels, roles, bands = layout.table_grid(df, header=header, index=index, column_totals=column_totals, row_totals=row_totals)
+		num_rows, num_cols = labels.shape
+		col_offset = df.index.nlevels if index else 0
+
+		# graphic frame of the placeholder, python-pptx default row height is 370840 EMU
+		table_shape = table.insert_table(rows=1, cols=num_cols)
+		tbl = table_shape.table._tbl
+		for tr in tbl.tr_lst:
+			tbl.remove(tr)
+		for gridCol,emu in zip(tbl.tblGrid.gridCol_lst, widths):
+			gridCol.w = pptx.util.Emu(emu)
+		height = 370840 if row_height is None else int(round(row_height * pptx.util.Length._EMUS_PER_INCH))
+		# graphic frame spans the table
+		table_shape.width = pptx.util.Emu(sum(widths))
+		table_shape.height = pptx.util.Emu(num_rows * height)
+
+		# distinct labels, each is escaped once
+		codes, uniques = pd.factorize(labels.ravel())
+		text = pd.Series(uniques)
+		escaped = text.str.replace('&', '&amp;').str.replace('<', '&lt;').str.replace('>', '&gt;').values
+		breaks = text.str.contains('[\x00-\x08\x0a-\x1f]').values
+
+		# paragraph alignment of header and data cells
+		alignments = [None]*col_offset + list(alignments)
+		column_pPr = np.array([''] * col_offset + [self._pPr_xml(a) for a in alignments[col_offset:]], dtype=object)
+		_, aligned = np.unique(column_pPr, return_inverse=True)
+
+		# cells are rendered once per distinct combination of text, role, banding, alignment and spans, and expanded by code
+		grid_spans, row_spans = layout.label_spans(df, header=header, index=index) if merge_labels else (np.ones(labels.shape, dtype=np.int64),)*2
+		combination, first = layout.distinct(codes.reshape(labels.shape), roles, bands + 1, np.broadcast_to(aligned, labels.shape), grid_spans, row_spans)
+		cols = first % num_cols
+		cell_roles, cell_bands, cell_codes = roles.ravel()[first], bands.ravel()[first], codes[first]
+		cell_grid_spans, cell_row_spans = grid_spans.ravel()[first], row_spans.ravel()[first]
+		covered = (cell_grid_spans == 0) | (cell_row_spans == 0)
+
+		# cell properties
+		tcPr = '<a:tcPr marT="{}" marB="{}" marL="{}" marR="{}">'.format(*[pptx.util.Inches(margins[side]) for side in ('top', 'bottom', 'left', 'right')])
+		fill = np.full(len(first), '', dtype=object)
+		if not header_color is None:
+			fill[cell_roles == layout.HEADER] = self._solidFill_xml(RGBColor(*header_color))
+		if banded_rows:
+			band_fill = np.array([self._solidFill_xml(RGBColor(*style.RGB.grey_light)), self._solidFill_xml(RGBColor(*style.RGB.grey_light2))], dtype=object)
+			banded = cell_bands >= 0
+			fill[banded] = band_fill[cell_bands[banded]]
+		tcPr = np.where(cell_roles == layout.EMPTY, '<a:tcPr/>', tcPr + fill + '</a:tcPr>')
+
+		# run formatting by cell role
+		rPr = np.array([''] + [self._rPr_xml(*(fonts[role] + (font_name,))) for role in (layout.HEADER, layout.INDEX, layout.DATA, layout.TOTALS)], dtype=object)[cell_roles]
+
+		# text body, cells covered by a merged cell have none
+		run = np.where((cell_roles == layout.EMPTY) | covered, '', '<a:r>' + rPr + '<a:t>' + escaped[cell_codes] + '</a:t></a:r>')
+		txBody = '<a:txBody><a:bodyPr/><a:lstStyle/><a:p>' + column_pPr[cols] + run + '</a:p></a:txBody>'
+		for i in np.flatnonzero(breaks[cell_codes] & ~covered):
+			# line breaks split paragraphs and runs, let python-pptx lay them out
+			txBody[i] = self._txBody_xml(uniques[cell_codes[i]], alignments[cols[i]], fonts[cell_roles[i]], font_name)
+
+		# spans of merged cells
+		tc = np.full(len(first), '<a:tc', dtype=object)
+		tc[cell_row_spans > 1] += ' rowSpan="' + cell_row_spans[cell_row_spans > 1].astype(str).astype(object) + '"'
+		tc[cell_grid_spans > 1] += ' gridSpan="' + cell_grid_spans[cell_grid_spans > 1].astype(str).astype(object) + '"'
+		tc[cell_grid_spans == 0] += ' hMerge="1"'
+		tc[cell_row_spans == 0] += ' vMerge="1"'
+
+		cells = (tc + '>' + txBody + tcPr + '</a:tc>')[combination]
+		rows = pptx.oxml.parse_xml('<a:tbl {}>{}</a:tbl>'.format(nsdecls('a'), ''.join(['<a:tr h="{}">'.format(height) + ''.join(row) + '</a:tr>' for row in cells])))
+		tbl.extend(list(rows))
+
+		return table_shape
+
+	def _merge_spans(self, table, grid_spans, row_spans):
+		"""Merge the cells of a table by their spans (see layout.label_spans), cells covered by a merged cell lose their text
+		"""
+		tcs = [tr.tc_lst for tr in table._tbl.tr_lst]
+		for row,col in zip(*np.nonzero((grid_spans != 1) | (row_spans != 1))):
+			tc = tcs[row][col]
+			if row_spans[row, col] > 1:
+				tc.rowSpan = int(row_spans[row, col])
+			if grid_spans[row, col] > 1:
+				tc.gridSpan = int(grid_spans[row, col])
+			if grid_spans[row, col] == 0:
+				tc.hMerge = True
+			if row_spans[row, col] == 0:
+				tc.vMerge = True
+			if grid_spans[row, col] == 0 or row_spans[row, col] == 0:
+				# keep the first paragraph and its properties
+				p_lst = tc.txBody.p_lst
+				for p in p_lst[1:]:
+					tc.txBody.remove(p)
+				for e in list(p_lst[0]):
+					if e.tag != qn('a:pPr'):
+						p_lst[0].remove(e)
+
+	def _xml(self, element):
+		"""Serialize a drawingml element without its namespace declarations
+		"""
+		xml = etree.tostring(element, encoding='unicode')
+		for prefix in element.nsmap:
+			xml = xml.replace(' ' + nsdecls(prefix), '')
+		return xml
+
+	def _format_font(self, font, bold, italic, size, color, font_name):
+		"""Apply run formatting to a python-pptx font
+		"""
+		font.bold = bold
+		font.italic = italic
+		font.size = pptx.util.Pt(size)
+		if not color is None:
+			font.color.rgb = color
+		font.name = font_name
+
+	def _rPr_xml(self, bold, italic, size, color, font_name):
+		"""Render run properties xml as python-pptx would write them
+		"""
+		p = _Paragraph(pptx.oxml.parse_xml('<a:p {}/>'.format(nsdecls('a'))), None)
+		r = p.add_run()
+		self._format_font(r.font, bold, italic, size, color, font_name)
+		return self._xml(r._r.rPr)
+
+	def _pPr_xml(self, alignment):
+		"""Render paragraph properties xml as python-pptx would write them
+		"""
+		if alignment is None:
+			return ''
+		p = _Paragraph(pptx.oxml.parse_xml('<a:p {}/>'.format(nsdecls('a'))), None)
+		p.alignment = alignment
+		return self._xml(p._p.pPr)
+
+	def _solidFill_xml(self, rgb):
+		"""Render a solid fill xml of an RGBColor
+		"""
+		return '<a:solidFill><a:srgbClr val="{}"/></a:solidFill>'.format(rgb)
+
+	def _solidFill(self, rgb):
+		"""Create a solid fill element of an RGBColor
+		"""
+		return pptx.oxml.parse_xml(self._solidFill_xml(rgb).replace('<a:solidFill>', '<a:solidFill {}>'.format(nsdecls('a'))))
+
+	def _set_fill(self, cell, fill):
+		"""Replace the fill of a table cell with a copy of a fill element
+		"""
+		tcPr = cell._tc.get_or_add_tcPr()
+		tcPr._remove_eg_fillProperties()
+		tcPr._insert_solidFill(copy.deepcopy(fill))
+
+	def _txBody_xml(self, text, alignment, font, font_name):
+		"""Render a cell text body through python-pptx, used for text containing line breaks
+		"""
+		c = _Cell(pptx.oxml.parse_xml('<a:tc {}><a:txBody><a:bodyPr/><a:lstStyle/><a:p/></a:txBody><a:tcPr/></a:tc>'.format(nsdecls('a'))), None)
+		c.text = text
+		p = c.text_frame.paragraphs[0]
+		if not alignment is None:
+			p.alignment = alignment
+		try:
+			self._format_font(p.runs[0].font, *(font + (font_name,)))
+		except IndexError:
+			# no run exists
+			pass
+		return self._xml(c._tc.txBody)
+
+	def _set_cell_text(self, tc, text):
+		"""Replace the text of a table cell, keeping the paragraph and run formatting of its first run
+		"""
+		paragraphs = tc.xpath('a:txBody/a:p')
+		runs = tc.xpath('a:txBody/a:p/a:r')
+		if len(paragraphs) == 1 and len(runs) == 1 and not paragraphs[0].xpath('a:br|a:fld') and not re.search('[\x00-\x08\x0a-\x1f]', text):
+			# single run, replace its text
+			runs[0].find(qn('a:t')).text = text
+			return
+		pPr = paragraphs[0].pPr if len(paragraphs) > 0 else None
+		rPr = runs[0].rPr if len(runs) > 0 else None
+		# line breaks split paragraphs and runs, let python-pptx lay them out, formatting goes to the first run as in create_table
+		_Cell(tc, None).text = text
+		p = tc.xpath('a:txBody/a:p')[0]
+		if not pPr is None:
+			p.insert(0, copy.deepcopy(pPr))
+		r = p.find(qn('a:r'))
+		if not rPr is None and not r is None:
+			r.insert(0, copy.deepcopy(rPr))
+
+	def _cache_key(self, kind, df, arguments, *extra):
+		"""Return the render cache key of a call, None without a cache, when df can not be hashed or an argument has no stable key
+
+		Parameters
+		----------
+		kind: str
+			rendering method, e.g. 'pandasPPT.create_table'
+		df: pd.DataFrame
+			rendered dataframe
+		arguments: dict
+			locals() of the rendering method, the target shape and the dataframe are left out
+		"""
+		if self.cache is None:
+			return None
+		arguments = dict((k,v) for k,v in arguments.items() if not k in ('self', 'table', 'chart', 'df'))
+		return self.cache.key(kind, df, arguments, *extra)
+
+	def _attach_table(self, table, entry):
+		"""Insert a cached table into a table placeholder, at the position of the placeholder with the size of the cached table
+		"""
+		table_shape = table.insert_table(rows=1, cols=1)
+		xfrm = table_shape._element.find(qn('p:xfrm'))
+		# parsed as their own root, so that moving them into the slide does not rewrite their namespaces
+		xfrm.replace(xfrm.find(qn('a:ext')), pptx.oxml.parse_xml(entry['ext.xml']))
+		table_shape._element.replace(table_shape._element.find(qn('a:graphic')), pptx.oxml.parse_xml(entry['graphic.xml']))
+		return table_shape
+
+	def _attach_chart(self, chart, entry):
+		"""Insert a cached chart into a chart placeholder, as a new chart part holding the cached chart xml and workbook
+		"""
+		package = chart.part.package
+		chart_part = ChartPart.load(package.next_partname(ChartPart.partname_template), CT.DML_CHART, package, entry['chart.xml'])
+		# the workbook relationship of the cached chart belonged to its own part
+		chart_part._element._remove_externalData()
+		if 'workbook.xlsx' in entry:
+			chart_part.chart_workbook.update_from_xlsx_blob(entry['workbook.xlsx'])
+		rId = chart.part.relate_to(chart_part, RT.CHART)
+		graphicFrame = chart._new_chart_graphicFrame(rId, chart.left, chart.top, chart.width, chart.height)
+		chart._replace_placeholder_with(graphicFrame)
+		return PlaceholderGraphicFrame(graphicFrame, chart._parent)
+
+	def _chart_data(self, df):
+		"""Build python-pptx chart data from a dataframe, index holds the categories and each column a series
+
+		A pd.MultiIndex holds multi-level categories, one level per index level, see chartdata.category_levels.
+		"""
+		chart_data = ChartData()
+
+		# assign categories to chart data
+		if isinstance(df.index, pd.MultiIndex):
+			# categories of each level, outermost first, nested in the category of the level outside it spanning their first point
+			owners = None
+			for offsets,text in chartdata.category_levels(df.index)[::-1]:
+				if owners is None:
+					categories = [chart_data.add_category(label) for label in text]
+				else:
+					categories = [parents[owner].add_sub_category(label) for owner,label in zip(owners[offsets], text)]
+				# category spanning every point
+				parents, owners = categories, np.repeat(np.arange(len(categories)), np.diff(np.append(offsets, len(df))))
+		else:
+			chart_data.categories = df.index
+
+		# iterate columns, add each column as series
+		for col,row in df.items():
+			try:
+				chart_data.add_series(str(col), (list(row)))
+			except UnicodeEncodeError:
+				chart_data.add_series(col.encode('ascii', errors='ignore'), (list(row)))
+		return chart_data
+
+	def _xy_values(self, df, chart_type, x_column=None, size_column=None):
+		"""Split a dataframe into the x values, bubble sizes and y series of an XY (or bubble) chart
+
+		Returns
+		-------
+		x_values: np.ndarray
+			numeric array of x values, from x_column or the index (dates as excel date numbers)
+		bubble_sizes: np.ndarray
+			numeric array of bubble sizes from size_column, None unless chart_type is a bubble chart
+		df: pd.DataFrame
+			the other columns, y values of each series
+		"""
+		if chart_type in BUBBLE_CHART_TYPES and size_column is None:
+			raise ValueError('bubble charts need size_column, the column of bubble sizes')
+		x_values = df.index if x_column is None else pd.Index(df[x_column])
+		dates = chartdata.date_index(x_values)
+		numeric, dates, x_values, _ = chartdata.categories(x_values if dates is None else dates)
+		if not numeric and len(x_values) > 0:
+			raise ValueError('x values of XY charts must be numbers or dates, set x_column or the index')
+		bubble_sizes = None
+		if chart_type in BUBBLE_CHART_TYPES:
+			bubble_sizes = df[size_column].values
+		drop = [column for column in (x_column, size_column) if not column is None and column in df.columns]
+		if len(drop) > 0:
+			df = df.drop(columns=drop)
+		return np.asarray(x_values), bubble_sizes, df
+
+	def _date_axis(self, chart, dates, date_format=None):
+		"""Format the axis of the dates of a chart, its categories (a date axis) or x values (a value axis of XY charts)
+
+		Parameters
+		----------
+		chart: pptx.chart.chart.Chart
+			chart of dates
+		dates: pd.DatetimeIndex
+			categories or x values, see chartdata.date_index
+
+		Keyword Arguements
+		------------------
+		date_format: str
+			number format of the axis labels, default None (yyyy-mm-dd)
+		"""
+		dateAx = chart._chartSpace.find('.//' + qn('c:dateAx'))
+		if dateAx is None:
+			if not chart._chartSpace.xpath('.//c:scatterChart|.//c:bubbleChart'):
+				# charts without axes (e.g. pie charts)
+				return
+			# x values of XY charts are excel dates on a value axis
+			chart.category_axis.tick_labels.number_format = chartdata.DATE_FORMAT if date_format is None else date_format
+			return
+		unit = dateAx.find(qn('c:baseTimeUnit'))
+		if not unit is None:
+			unit.set('val', chartdata.base_time_unit(dates))
+		if not date_format is None:
+			chart.category_axis.tick_labels.number_format = date_format
+
+	def _xy_data_labels(self, plot):
+		"""Add data labels showing values to an XY plot, as plot.has_data_labels does for other plots
+		"""
+		dLbls = plot._element.find(qn('c:dLbls'))
+		if dLbls is None:
+			dLbls = CT_DLbls.new_dLbls()
+			dLbls.showVal.val = True
+			# after the series, before the axes
+			plot._element.find(qn('c:axId')).addprevious(dLbls)
+		return DataLabels(dLbls)
+
+	def _xy_chart_data(self, x_values, df, bubble_sizes=None):
+		"""Build python-pptx XY (or bubble) chart data point by point, each column of df holds the y values of a series
+		"""
+		chart_data = XyChartData() if bubble_sizes is None else BubbleChartData()
+		for col,row in df.items():
+			try:
+				series = chart_data.add_series(str(col))
+			except UnicodeEncodeError:
+				series = chart_data.add_series(col.encode('ascii', errors='ignore'))
+			if bubble_sizes is None:
+				for x,y in zip(x_values, row):
+					series.add_data_point(x, y)
+			else:
+				for x,y,size in zip(x_values, row, bubble_sizes):
+					series.add_data_point(x, y, size)
+		return chart_data
+
+	def _write_chart_data(self, chart, df, workbook=True):
+		"""Write the category and value caches of all chart series, and the embedded workbook, from dataframe columns
+
+		Parameters
+		----------
+		chart: pptx.chart.chart.Chart
+			chart inserted from the first row of df, its series caches are replaced
+		df: pd.DataFrame
+			chart data, index holds the categories and each column a series
+
+		Keyword Arguements
+		------------------
+		workbook: bool or str
+			True writes the embedded workbook now, 'defer' when the package is saved and False removes it, default True
+		"""
+		chart_space = chart._chartSpace
+		columns = [df.iloc[:, i].values for i in range(len(df.columns))]
+		levels = None
+		if isinstance(df.index, pd.MultiIndex):
+			# multi-level categories are text
+			levels = chartdata.category_levels(df.index)
+			numeric, dates, category_values = False, False, np.zeros(len(df), dtype=object)
+		else:
+			numeric, dates, category_values, category_text = chartdata.categories(df.index)
+
+		# embedded workbook, looked up while the chart holds a single point
+		number_format = chart_space.xpath('.//c:val//c:formatCode')
+		number_format = number_format[0].text if len(number_format) > 0 else 'General'
+		names = chart_space.xpath('.//c:ser/c:tx//c:v/text()')
+		# series the chart does not show (pie charts show the first) are in the workbook too, as python-pptx writes them
+		names += [str(col) for col in df.columns[len(names):]]
+		def build():
+			return chartdata.workbook_blob(category_values, numeric, chartdata.DATE_FORMAT if dates else 'General', names, columns,
+				number_format=number_format, category_levels=levels)
+		self._set_workbook(chart, build, workbook)
+
+		# series caches
+		if not levels is None:
+			category_xml = chartdata.levels_cache_xml(levels, len(df))
+		else:
+			if not numeric:
+				category_text = chartdata.escape(category_text)
+			category_xml = chartdata.cache_xml(category_text)
+		last_row = '${}'.format(len(df) + 1)
+		for ser,values in zip(chart_space.xpath('.//c:ser'), columns):
+			for ref,xml in ((ser.find(qn('c:cat')), category_xml), (ser.find(qn('c:val')), chartdata.cache_xml(chartdata.number_text(values)))):
+				if ref is None:
+					continue
+				# range of all rows
+				f = ref.find('.//' + qn('c:f'))
+				self._set_cache(ref, re.sub(r'\$\d+$', last_row, f.text), xml)
+
+	def _write_xy_chart_data(self, chart, x_values, df, bubble_sizes=None, workbook=True):
+		"""Write the x, y (and bubble size) caches of all XY (or bubble) chart series, and the embedded workbook, from numpy arrays
+
+		Parameters
+		----------
+		chart: pptx.chart.chart.Chart
+			chart inserted from the first point of every series, its series caches are replaced
+		x_values: np.ndarray
+			numeric array of x values, shared by all series
+		df: pd.DataFrame
+			chart data, each column holds the y values of a series
+
+		Keyword Arguements
+		------------------
+		bubble_sizes: np.ndarray
+			numeric array of bubble sizes shared by all series, default None (XY chart)
+		workbook: bool or str
+			True writes the embedded workbook now, 'defer' when the package is saved and False removes it, default True
+		"""
+		chart_space = chart._chartSpace
+		points = len(x_values)
+		columns = [df.iloc[:, i].values for i in range(len(df.columns))]
+
+		# embedded workbook, looked up while the chart holds a single point
+		number_format = chart_space.xpath('.//c:yVal//c:formatCode')
+		number_format = number_format[0].text if len(number_format) > 0 else 'General'
+		names = chart_space.xpath('.//c:ser/c:tx//c:v/text()')
+		def build():
+			return chartdata.xy_workbook_blob(names, x_values, columns, bubble_sizes=bubble_sizes, number_format=number_format)
+		self._set_workbook(chart, build, workbook)
+
+		# series caches, each series holds its own table of the worksheet
+		x_xml = chartdata.cache_xml(chartdata.number_text(x_values))
+		size_xml = None if bubble_sizes is None else chartdata.cache_xml(chartdata.number_text(bubble_sizes))
+		for i,(ser,values) in enumerate(zip(chart_space.xpath('.//c:ser'), columns)):
+			header = chartdata.xy_header_row(i, points)
+			name = ser.find('./' + qn('c:tx') + '//' + qn('c:f'))
+			if not name is None:
+				name.text = 'Sheet1!$B${}'.format(header)
+			for tag,col,xml in (('c:xVal', 'A', x_xml), ('c:yVal', 'B', chartdata.cache_xml(chartdata.number_text(values))), ('c:bubbleSize', 'C', size_xml)):
+				ref = ser.find(qn(tag))
+				if ref is None or xml is None:
+					continue
+				self._set_cache(ref, 'Sheet1!${0}${1}:${0}${2}'.format(col, header + 1, header + points), xml)
+
+	def _set_workbook(self, chart, build, workbook=True):
+		"""Replace the embedded workbook of a chart with the xlsx blob returned by build
+
+		True writes it now, 'defer' when the package is saved and False removes it.
+		"""
+		chart_part = chart.part
+		chart_space = chart._chartSpace
+		if workbook == 'defer' or not workbook:
+			# replace the workbook of the first row
+			xlsx_rId = chart_space.xlsx_part_rId
+			chart_space._remove_externalData()
+			if not xlsx_rId is None:
+				chart_part.drop_rel(xlsx_rId)
+			if workbook == 'defer':
+				xlsx_part = chartdata.DeferredXlsxPart.new(b'', chart_part.package)
+				xlsx_part.build = build
+				chart_part.chart_workbook.xlsx_part = xlsx_part
+		else:
+			chart_part.chart_workbook.update_from_xlsx_blob(build())
+
+	def _set_cache(self, ref, formula, xml):
+		"""Point a series data reference (e.g. c:val) at a worksheet range and replace its cache with all points, keeping its number format
+		"""
+		f = ref.find('.//' + qn('c:f'))
+		f.text = formula
+		cache = f.getnext()
+		code = cache.find(qn('c:formatCode'))
+		tag = cache.tag.split('}')[-1]
+		cache.getparent().replace(cache, pptx.oxml.parse_xml('<c:{0} {1}>{2}{3}</c:{0}>'.format(
+			tag, nsdecls('c'), '' if code is None else etree.tostring(code, encoding='unicode'), xml)))
+
+	def _add_slides(self, ppt, slide_layout, count):
+		"""Append slides of a layout to a presentation, as ppt.slides.add_slide does one at a time
+
+		python-pptx scans all parts, relationships and slide ids of the presentation for every slide it adds, here they are scanned once
+		and slides are related to directly. Slides get the lowest free part names, as package.next_partname gives them (add_slide numbers
+		slides by their count, which clashes with an existing part name after a slide was deleted).
+
+		Parameters
+		----------
+		ppt: pptx.Presentation
+			presentation object
+		slide_layout: pptx.slide.SlideLayout
+			slide layout object of ppt
+		count: int
+			number of slides
+
+		Returns
+		-------
+		slides: list
+			pptx slide objects, their placeholders cloned from the layout
+		"""
+		# free slide part numbers, lowest first as package.next_partname gives them, the package is scanned once
+		used = set()
+		for part in ppt.part.package.iter_parts():
+			match = re.match(r'^/ppt/slides/slide(\d+)\.xml$', part.partname)
+			if match:
+				used.add(int(match.group(1)))
+		numbers = []
+		number = 1
+		while len(numbers) < count:
+			if not number in used:
+				numbers.append(number)
+			number += 1
+
+		sldIdLst = ppt.slides._sldIdLst
+		slide_id = sldIdLst._next_id
+		slides = []
+		for i in range(count):
+			slide_part = SlidePart.new(PackURI('/ppt/slides/slide%d.xml' % numbers[i]), ppt.part.package, slide_layout.part)
+			rId = ppt.part.rels._add_relationship(RT.SLIDE, slide_part)
+			sldIdLst._add_sldId(id=slide_id + i, rId=rId)
+			slide = slide_part.slide
+			slide.shapes.clone_layout_placeholders(slide_layout)
+			slides.append(slide)
+		return slides
+
+	def _render_slide(self, ppt, index, layout_name, placeholder_name, df, kwargs=None):
+		"""Add a slide and fill its table or chart placeholder with a dataframe, layouts and placeholders are looked up in a TemplateIndex
+		"""
+		slide = ppt.slides.add_slide(index.layout(ppt, layout_name))
+		placeholder = slide.placeholders[index.placeholder_idx(layout_name, placeholder_name)]
+		placeholder_type = index.placeholder_type(layout_name, placeholder_name)
+		if placeholder_type == PP_PLACEHOLDER.TABLE:
+			return self.create_table(placeholder, df, **(kwargs or {}))
+		elif placeholder_type == PP_PLACEHOLDER.CHART:
+			return self.create_chart(placeholder, df, **(kwargs or {}))
+		raise ValueError('placeholder {} of layout {} is not a table or chart placeholder'.format(placeholder_name, layout_name))
+
+	def _copy_part(self, part, package, partnames, layouts, copies):
+		"""Copy a part and the parts it relates to into another package
+
+		Parameters
+		----------
+		part: pptx.opc.package.Part
+			part to copy, e.g. a slide part
+		package: pptx.opc.package.Package
+			package to copy to
+		partnames: dict
+			map of part name stem and extension to the numbers used in package, e.g. ('/ppt/charts/chart', '.xml'): {1, 2},
+			numbers of copied parts are added to it
+		layouts: dict
+			map of layout names to slide layout parts of package, which slide layouts are related to instead of being copied
+		copies: dict
+			map of parts already copied to their copies, parts related to more than once are copied once
+
+		Returns
+		-------
+		part: pptx.opc.package.Part
+			copied part, not yet related to by any part of package
+		"""
+
+		if part.partname in copies:
+			return copies[part.partname]
+
+		# next free part name of the same kind, e.g. /ppt/charts/chart3.xml
+		stem, ext = re.match(r'^(.*?)\d*(\.\w+)$', part.partname).groups()
+		used = partnames.setdefault((stem, ext), set())
+		n = len(used) + 1
+		while n in used:
+			n += 1
+		used.add(n)
+		partname = PackURI('{}{}{}'.format(stem, n, ext))
+		copied = PartFactory(partname, part.content_type, package, part.blob)
+		copies[part.partname] = copied
+
+		# relationships in the same order, related parts copied recursively
+		rIds = {}
+		for rId,rel in list(part.rels.items()):
+			if rel.is_external:
+				rIds[rId] = copied.relate_to(rel.target_ref, rel.reltype, is_external=True)
+			elif rel.reltype == RT.SLIDE_LAYOUT:
+				rIds[rId] = copied.relate_to(layouts[rel.target_part.slide_layout.name], rel.reltype)
+			else:
+				rIds[rId] = copied.relate_to(self._copy_part(rel.target_part, package, partnames, layouts, copies), rel.reltype)
+
+		# rewrite references to relationship ids which changed
+		rIds = dict((old, new) for old,new in rIds.items() if old != new)
+		if rIds and hasattr(copied, '_element'):
+			r = qn('r:id')[:-len('id')]
+			for element in copied._element.iter():
+				for key,value in element.attrib.items():
+					if key.startswith(r) and value in rIds:
+						element.set(key, rIds[value])
+
+		return copied
+
+
+# state of a render_slides worker process
+_worker = {}
+
+
+def _init_worker(template, index):
+	"""Load the template presentation once per render_slides worker process
+	"""
+	_worker['handler'] = Handler()
+	_worker['ppt'] = pptx.Presentation(io.BytesIO(template))
+	_worker['index'] = index
+	# slides of the template itself, kept in the worker's template across batches
+	_worker['template_slides'] = len(_worker['ppt'].slides._sldIdLst)
+
+
+def _render_batch(specs):
+	"""Render a batch of slide specs into the worker's template, returning the saved presentation
+	"""
+	handler, ppt = _worker['handler'], _worker['ppt']
+	for spec in specs:
+		handler._render_slide(ppt, _worker['index'], *spec)
+	blob = io.BytesIO()
+	ppt.save(blob)
+
+	# remove the batch again, its parts are no longer related to and are not saved with the next batch
+	sldIdLst = ppt.slides._sldIdLst
+	for sldId in list(sldIdLst)[_worker['template_slides']:]:
+		sldIdLst.remove(sldId)
+		ppt.part.drop_rel(sldId.rId)
+	return blob.getvalue()
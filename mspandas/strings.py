@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Text stage shared by pandasPPT and pandasDOC
+
+Values of columns which are not numeric, and index and column labels, are converted to text a whole column (or level) at a time.
+The types held by a column are checked once up front: text is re-encoded in one pass (and left as it is when the encoding is utf-8),
+bytes are decoded and anything else is converted with str, as the value by value conversion did before. Text columns and labels are
+factorized first, so that repeated values (region names, status flags, ...) are converted once.
+"""
+
+from __future__ import division
+
+import codecs
+
+import pandas as pd
+import numpy as np
+
+try:
+	text_type, binary_type = unicode, str
+except NameError:
+	# python 3
+	text_type, binary_type = str, bytes
+
+
+def recode(values, encoding='utf-8', encoding_errors='strict'):
+	"""Re-encode an array of text, as s.encode(encoding).decode('utf-8', errors=encoding_errors)
+
+	Parameters
+	----------
+	values: np.ndarray
+		object array of text
+
+	Returns
+	-------
+	values: np.ndarray
+		object array of text, values itself when the encoding is utf-8
+
+	Keyword Arguements
+	------------------
+	encoding: str
+		encoding of the text, default 'utf-8'
+	encoding_errors: str
+		how decoding errors are handled (e.g. 'strict', 'ignore' or 'replace'), default 'strict'
+	"""
+	if codecs.lookup(encoding).name == 'utf-8':
+		try:
+			# text encodes to utf-8 (i.e. has no lone surrogates) and decodes back to itself
+			u''.join(values).encode('utf-8')
+			return values
+		except UnicodeEncodeError:
+			# raised value by value below
+			pass
+	return np.array([text_type(s.encode(encoding), 'utf-8', encoding_errors) for s in values], dtype=object)
+
+
+def _convert(values, encoding, encoding_errors):
+	"""Convert an object array of text and bytes value by value
+	"""
+	return np.array([text_type(s.encode(encoding), 'utf-8', encoding_errors) if isinstance(s, text_type) else s.decode(encoding) for s in values], dtype=object)
+
+
+def _types(values):
+	return set(map(type, values))
+
+
+def column(series, encoding='utf-8', encoding_errors='strict'):
+	"""Convert the values of a column which is not numeric to text
+
+	Columns of text (and bytes) are factorized, or taken by their categorical codes, so that each distinct value is converted once
+	and expanded by code. Missing values of text columns are written as ''. Columns holding values other than text and bytes (numbers,
+	dates, ...) are converted with astype(str) first.
+
+	Parameters
+	----------
+	series: pd.Series
+		column of the dataframe
+
+	Returns
+	-------
+	series: pd.Series
+		text with the index and name of series
+
+	Keyword Arguements
+	------------------
+	encoding, encoding_errors:
+		as passed to create_table
+	"""
+	codes = None
+	if isinstance(series.dtype, pd.CategoricalDtype):
+		uniques = np.asarray(series.cat.categories, dtype=object)
+		if _types(uniques) <= set([text_type]):
+			codes = series.cat.codes.values
+		# astype(str) writes missing values as 'nan', unless fillna('') found '' among the categories
+		missing = '' if '' in set(uniques) else 'nan'
+	elif pd.api.types.is_string_dtype(series.dtype):
+		codes, uniques = pd.factorize(series.values)
+		uniques = np.asarray(uniques, dtype=object)
+		missing = ''
+
+	if not codes is None:
+		types = _types(uniques)
+		text = None
+		if types <= set([text_type]):
+			text = recode(uniques, encoding, encoding_errors)
+		elif types <= set([text_type, binary_type]):
+			text = _convert(uniques, encoding, encoding_errors)
+		if not text is None:
+			# missing values have code -1, the last item
+			return pd.Series(np.append(text, np.array([missing], dtype=object))[codes], index=series.index, name=series.name)
+
+	values = series.astype(str).values.astype(object)
+	return pd.Series(recode(values, encoding, encoding_errors), index=series.index, name=series.name)
+
+
+def level(labels, encoding='utf-8', encoding_errors='strict'):
+	"""Convert the labels of one index level to text
+
+	Parameters
+	----------
+	labels: pd.Index
+		labels of the level, e.g. df.index.get_level_values(0)
+
+	Returns
+	-------
+	values: np.ndarray
+		object array of text, labels which are not text or bytes are converted with str (missing values too)
+
+	Keyword Arguements
+	------------------
+	encoding, encoding_errors:
+		as passed to create_table
+	"""
+	if labels.dtype.kind in 'iufb':
+		return np.asarray(labels).astype(str).astype(object)
+	values = np.asarray(labels, dtype=object)
+	types = _types(values)
+	if types <= set([text_type]):
+		return recode(values, encoding, encoding_errors)
+	if types <= set([text_type, binary_type]):
+		return _convert(values, encoding, encoding_errors)
+	return np.array([
+		text_type(s.encode(encoding), 'utf-8', encoding_errors) if isinstance(s, text_type) else s.decode(encoding) if isinstance(s, binary_type) else str(s)
+		for s in values
+	], dtype=object)
+
+
+def labels(index, encoding='utf-8', encoding_errors='strict'):
+	"""Convert index (or column) labels to text, level by level
+
+	Parameters
+	----------
+	index: pd.Index
+		df.index or df.columns, can be pd.MultiIndex
+
+	Returns
+	-------
+	index: pd.Index
+		text labels with the names of index, pd.MultiIndex when index is
+
+	Keyword Arguements
+	------------------
+	encoding, encoding_errors:
+		as passed to create_table
+	"""
+	names = index.names
+	if isinstance(index, pd.MultiIndex):
+		try:
+			codes = index.codes
+		except AttributeError:
+			# pandas < 0.24
+			codes = index.labels
+		# distinct labels of each level are converted once, unless labels are missing or merge into one text (e.g. 1 and '1')
+		levels = [pd.Index(level(values, encoding, encoding_errors), dtype=object) for values in index.levels]
+		if all(values.is_unique for values in levels) and not any((c < 0).any() for c in codes):
+			index = index.set_levels(levels, verify_integrity=False)
+		else:
+			index = pd.MultiIndex.from_arrays([level(index.get_level_values(i), encoding, encoding_errors) for i in range(index.nlevels)])
+	elif index.dtype.kind in 'iufb':
+		index = pd.Index(level(index, encoding, encoding_errors), dtype=object)
+	else:
+		# distinct labels are converted once, unless labels are missing or compare equal across types (e.g. 1 and True)
+		codes, uniques = pd.factorize(index)
+		if (codes < 0).any() or (uniques.dtype == object and not _types(uniques) <= set([text_type, binary_type])):
+			index = pd.Index(level(index, encoding, encoding_errors), dtype=object)
+		else:
+			index = pd.Index(level(uniques, encoding, encoding_errors)[codes], dtype=object)
+	index.names = names
+	return index
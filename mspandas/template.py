@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""Index of the slide layouts and placeholders of a ppt template
+
+The index is built once per template file and keyed by the sha1 of its content. It is kept in memory for the process and stored
+as JSON in a cache directory, so that later processes load it instead of walking the slide master again.
+"""
+
+from __future__ import division
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+
+import pptx
+from pptx.enum.shapes import PP_PLACEHOLDER
+
+
+# default directory of stored indexes
+CACHE_DIR = os.path.join(tempfile.gettempdir(), 'mspandas')
+
+# version of the stored JSON, indexes of other versions are rebuilt
+VERSION = 1
+
+# indexes loaded in this process, keyed by template hash
+_indexes = {}
+
+
+class TemplateIndex():
+	"""Slide layouts and placeholders of a ppt template, by name
+
+	Parameters
+	----------
+	layouts: list
+		layouts in slide master order, dicts of 'name', 'index' (position in ppt.slide_layouts) and 'placeholders',
+		a list of dicts of placeholder 'name', 'idx', 'type' (PP_PLACEHOLDER value), 'left', 'top', 'width' and 'height' (EMU)
+
+	Keyword Arguements
+	------------------
+	key: str
+		sha1 of the template file, default None
+
+	Methods
+	-------
+	load(template)
+		Return the index of a template file, from memory, the cache directory, or by indexing it
+	from_presentation(ppt)
+		Index the layouts of a presentation object
+	layout(ppt, layout_name)
+		Return the slide layout object of ppt with this name
+	placeholder_idx(layout_name, placeholder_name)
+		Return the idx of a placeholder in a layout
+	placeholder_type(layout_name, placeholder_name)
+		Return the PP_PLACEHOLDER type of a placeholder in a layout
+	placeholder(layout_name, placeholder_name)
+		Return the idx, type, position and size of a placeholder in a layout
+
+	Notes
+	-----
+	Like Handler.map_layouts and Handler.map_shapes, the last layout (or placeholder) of a name wins when names repeat.
+	"""
+
+	def __init__(self, layouts, key=None):
+		self.key = key
+		self.layouts = layouts
+		self._layouts = dict((layout['name'], layout) for layout in layouts)
+		self._placeholders = dict((layout['name'], dict((placeholder['name'], placeholder) for placeholder in layout['placeholders'])) for layout in layouts)
+
+	@classmethod
+	def load(cls, template, cache_dir=CACHE_DIR):
+		"""Return the index of a template file, from memory, the cache directory, or by indexing it
+
+		Parameters
+		----------
+		template: str, bytes, file-like or pptx.Presentation
+			path or content of the pptx template, a file-like object is read and sought back to where it was,
+			a presentation object is keyed by its slide masters and layouts (the parts the index is built from)
+
+		Returns
+		-------
+		index: TemplateIndex
+			index of the template layouts
+
+		Keyword Arguements
+		------------------
+		cache_dir: str
+			directory the index is stored in as JSON, default mspandas.template.CACHE_DIR, None to keep it in memory only
+		"""
+		ppt = None
+		if isinstance(template, pptx.presentation.Presentation):
+			ppt = template
+			blob = b''.join(part.blob for slide_master in ppt.slide_masters for part in [slide_master.part] + [slide_layout.part for slide_layout in slide_master.slide_layouts])
+		elif isinstance(template, bytes):
+			blob = template
+		elif hasattr(template, 'read'):
+			# read from the caller's position and left there, e.g. for pptx.Presentation(template)
+			position = template.tell()
+			blob = template.read()
+			template.seek(position)
+		else:
+			with open(template, 'rb') as f:
+				blob = f.read()
+		key = hashlib.sha1(blob).hexdigest()
+
+		# this process
+		try:
+			return _indexes[key]
+		except KeyError:
+			pass
+
+		# earlier processes
+		path = None if cache_dir is None else os.path.join(cache_dir, 'template-{}.json'.format(key))
+		if not path is None and os.path.exists(path):
+			try:
+				with open(path) as f:
+					stored = json.load(f)
+				if stored['version'] == VERSION:
+					_indexes[key] = cls(stored['layouts'], key=key)
+					return _indexes[key]
+			except (ValueError, KeyError):
+				# unreadable, rebuilt below
+				pass
+
+		index = cls.from_presentation(pptx.Presentation(io.BytesIO(blob)) if ppt is None else ppt)
+		index.key = key
+		if not path is None:
+			index.save(path)
+		_indexes[key] = index
+		return index
+
+	@classmethod
+	def from_presentation(cls, ppt):
+		"""Index the layouts of a presentation object
+
+		Parameters
+		----------
+		ppt: pptx.Presentation
+			presentation object
+
+		Returns
+		-------
+		index: TemplateIndex
+			index of the presentation layouts, without a key
+		"""
+		layouts = []
+		for i,slide_layout in enumerate(ppt.slide_layouts):
+			placeholders = []
+			for shape in slide_layout.placeholders:
+				phf = shape.placeholder_format
+				placeholders.append({
+					'name': shape.name,
+					'idx': phf.idx,
+					'type': None if phf.type is None else int(phf.type),
+					'left': shape.left, 'top': shape.top, 'width': shape.width, 'height': shape.height,
+				})
+			layouts.append({'name': slide_layout.name, 'index': i, 'placeholders': placeholders})
+		return cls(layouts)
+
+	def save(self, path):
+		"""Store the index as JSON, replacing the file at path in one step
+
+		Parameters
+		----------
+		path: str
+			file path, its directory is created if needed
+		"""
+		directory = os.path.dirname(path)
+		if directory and not os.path.isdir(directory):
+			try:
+				os.makedirs(directory)
+			except OSError:
+				# created by another process
+				pass
+		with tempfile.NamedTemporaryFile('w', dir=directory or None, suffix='.tmp', delete=False) as f:
+			json.dump({'version': VERSION, 'key': self.key, 'layouts': self.layouts}, f)
+		try:
+			os.replace(f.name, path)
+		except AttributeError:
+			# python 2.7
+			if os.path.exists(path):
+				os.remove(path)
+			os.rename(f.name, path)
+
+	def layout_names(self):
+		"""Return the layout names in slide master order
+		"""
+		return [layout['name'] for layout in self.layouts]
+
+	def layout(self, ppt, layout_name):
+		"""Return the slide layout object of ppt with this name
+
+		Parameters
+		----------
+		ppt: pptx.Presentation
+			presentation object of the indexed template
+		layout_name: str
+			layout name from slide master
+
+		Returns
+		-------
+		layout: pptx.slide.SlideLayout
+			slide layout object
+		"""
+		return ppt.slide_layouts[self._layouts[layout_name]['index']]
+
+	def placeholder(self, layout_name, placeholder_name):
+		"""Return the idx, type, position and size of a placeholder in a layout
+
+		Parameters
+		----------
+		layout_name: str
+			layout name from slide master
+		placeholder_name: str
+			placeholder shape name in the layout
+
+		Returns
+		-------
+		placeholder: dict
+			'name', 'idx', 'type' (PP_PLACEHOLDER value), 'left', 'top', 'width' and 'height' (EMU, None where inherited and not set)
+		"""
+		return self._placeholders[layout_name][placeholder_name]
+
+	def placeholder_idx(self, layout_name, placeholder_name):
+		"""Return the idx of a placeholder in a layout, i.e. its key in slide.placeholders
+		"""
+		return self._placeholders[layout_name][placeholder_name]['idx']
+
+	def placeholder_type(self, layout_name, placeholder_name):
+		"""Return the PP_PLACEHOLDER type of a placeholder in a layout
+		"""
+		placeholder_type = self._placeholders[layout_name][placeholder_name]['type']
+		if placeholder_type is None:
+			return None
+		try:
+			return PP_PLACEHOLDER(placeholder_type)
+		except TypeError:
+			# python-pptx < 1.0, enum values are plain ints
+			return placeholder_type
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Totals stage shared by pandasPPT and pandasDOC
+
+Column totals (a last row) and row totals (a last column) are reduced from the numeric block of the dataframe at once,
+columns which are not numeric have no total. Aggregation maps override the sum of single columns (or rows).
+"""
+
+from __future__ import division
+
+import pandas as pd
+import numpy as np
+
+
+def label(text, nlevels, names=None):
+	"""Return the index of a totals row (or the columns of a totals column)
+
+	Parameters
+	----------
+	text: str
+		totals label, e.g. 'Total'
+	nlevels: int
+		number of levels of the index it is appended to, lower levels are labelled ' '
+
+	Returns
+	-------
+	index: pd.Index
+		single label index, pd.MultiIndex when nlevels > 1
+
+	Keyword Arguements
+	------------------
+	names: list
+		level names, default None
+	"""
+	if nlevels > 1:
+		return pd.MultiIndex.from_tuples([(text,) + (' ',)*(nlevels-1)], names=names)
+	return pd.Index([text], name=None if names is None else names[0])
+
+
+def aggregate(df, agg_map={}, axis=0):
+	"""Reduce the numeric block of a dataframe to column (or row) totals
+
+	Parameters
+	----------
+	df: pd.DataFrame
+		pandas dataframe object
+
+	Returns
+	-------
+	totals: np.ndarray
+		totals of every column (axis=0) or row (axis=1), NaN for columns which are not numeric
+
+	Keyword Arguements
+	------------------
+	agg_map: dict
+		map of column names (axis=0) or index labels (axis=1) to the aggregation applied instead of a sum (e.g. 'mean' or np.max), default {}
+	axis: int
+		0 totals each column, 1 totals each row
+
+	Notes
+	-----
+	Missing values count as 0, as in df.fillna(0).agg(agg_map).
+	"""
+	positions = np.flatnonzero([pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes])
+	values = df.iloc[:, positions].values
+	if values.dtype.kind not in 'iuf':
+		# bool, or bool mixed with numbers
+		values = values.astype(float)
+
+	# sums, NaN counts as 0
+	sums = np.nansum(values, axis=axis) if values.dtype.kind == 'f' else values.sum(axis=axis)
+	if axis == 0:
+		totals = np.full(df.shape[1], np.nan, dtype=object)
+		totals[positions] = sums
+	else:
+		# aggregations of rows may not be whole numbers
+		totals = sums if len(agg_map) == 0 else sums.astype(float)
+
+	# aggregations of single columns (or rows)
+	for key,method in agg_map.items():
+		labels = df.columns if axis == 0 else df.index
+		# every position of the label, none when it is not in df
+		for i in labels.get_indexer_for([key]):
+			if i < 0:
+				continue
+			totals[i] = df.iloc[:, i].fillna(0).agg(method) if axis == 0 else pd.Series(values[i]).fillna(0).agg(method)
+	return totals
+
+
+def append(df, column_totals=False, row_totals=False, column_totals_agg_map={}, row_totals_agg_map={}, column_totals_label='Total', row_totals_label='Total'):
+	"""Append column totals as a last row and row totals as a last column
+
+	Parameters
+	----------
+	df: pd.DataFrame
+		pandas dataframe object, can have pd.MultiIndex on either axis
+
+	Returns
+	-------
+	df: pd.DataFrame
+		new dataframe with totals, df itself when neither totals is asked for
+
+	Keyword Arguements
+	------------------
+	column_totals, row_totals, column_totals_agg_map, row_totals_agg_map, column_totals_label, row_totals_label:
+		as passed to create_table
+
+	Notes
+	-----
+	Row totals are computed after column totals, so the last cell holds the total of the totals row.
+	"""
+
+	# total columns and concat with data as last row
+	if column_totals:
+		names = list(df.index.names)
+		if any(dtype == bool for dtype in df.dtypes):
+			# bool columns are totaled as numbers, and written as numbers with their total
+			columns = df.columns
+			df = pd.concat([df.iloc[:, i].astype(np.int64) if dtype == bool else df.iloc[:, i] for i,dtype in enumerate(df.dtypes)], axis=1)
+			df.columns = columns
+		totals = aggregate(df, column_totals_agg_map, axis=0)
+		# one column at a time, so that every column keeps its own dtype
+		c_totals = pd.DataFrame(dict((i, [total]) for i,total in enumerate(totals)), index=label(column_totals_label, df.index.nlevels))
+		c_totals.columns = df.columns
+		try:
+			df = pd.concat([df, c_totals], axis=0)
+		except TypeError:
+			# df index is categorical
+			# add Total category and append
+			df.index = df.index.add_categories(column_totals_label)
+			df = pd.concat([df, c_totals], axis=0)
+		df.index.names = names
+
+	# total rows and concat with data as last column
+	if row_totals:
+		r_totals = pd.DataFrame(aggregate(df, row_totals_agg_map, axis=1), index=df.index, columns=label(row_totals_label, df.columns.nlevels, names=df.columns.names))
+		try:
+			df = pd.concat([df, r_totals], axis=1)
+		except TypeError:
+			# df columns are categorical
+			# add Total category and append
+			df.columns = df.columns.add_categories(row_totals_label)
+			df = pd.concat([df, r_totals], axis=1)
+
+	return df
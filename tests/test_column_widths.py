@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""layout.column_widths sizes columns by their widest text, shrunk or stretched to fill the table"""
+
+from __future__ import division
+
+import os
+
+import numpy as np
+import pandas as pd
+import pptx
+
+from mspandas import layout, metrics, pandasPPT
+
+CM = layout.EMUS_PER_CM
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'examples', 'example_report.pptx')
+
+
+def text_frame(rng, rows, cols, multiindex=False, longest=60):
+	words = lambda k: ['x' * rng.randint(0, longest) for _ in range(k)]
+	df = pd.DataFrame(dict(('c{}'.format(i), words(rows)) for i in range(cols)))
+	df.index = pd.MultiIndex.from_arrays([words(rows), words(rows)]) if multiindex else words(rows)
+	return df
+
+
+def test_stretched():
+	# index of 5 and column of 10 characters at size 8 are 1.25cm and 2.5cm, rounded up to whole cm and stretched to the table
+	df = pd.DataFrame({'a': ['x' * 10]}, index=['y' * 5])
+	assert layout.column_widths(df, 10 * CM, min_col_w=1) == [4 * CM, 6 * CM]
+	# at least min_col_w
+	assert layout.column_widths(df, 10 * CM, min_col_w=4) == [5 * CM, 5 * CM]
+
+
+def test_shrunk():
+	# 10cm, 10cm and 5cm of text overflow a 20cm table and are shrunk by a fifth
+	df = pd.DataFrame({'a': ['x' * 40], 'b': ['x' * 40], 'c': ['x' * 20]})
+	assert layout.column_widths(df, 20 * CM, index=False, min_col_w=1) == [8 * CM, 8 * CM, 4 * CM]
+	# no wider than half the table before shrinking
+	df = pd.DataFrame({'a': ['x' * 400], 'b': ['x' * 40]})
+	assert layout.column_widths(df, 20 * CM, index=False, min_col_w=1) == [10 * CM, 10 * CM]
+
+
+def test_random_frames():
+	rng = np.random.RandomState(1)
+	for trial in range(300):
+		df = text_frame(rng, rng.randint(1, 8), rng.randint(1, 25), multiindex=rng.rand() < .5)
+		index = rng.rand() < .8
+		snap = rng.choice([1, 635])
+		table_width = rng.choice([9144000, 6000000, 24000000, 3000000]) + rng.rand() * 1000
+		widths = layout.column_widths(df, table_width, index=index, min_col_w=rng.choice([1, 2, 4]), snap=snap)
+
+		assert len(widths) == len(df.columns) + (df.index.nlevels if index else 0)
+		assert all(isinstance(width, int) and width > 0 and width % snap == 0 for width in widths)
+		assert abs(sum(widths) - table_width) <= len(widths) * (snap + 1)
+		# columns of longer text are no narrower
+		lengths = [df.iloc[:, i].str.len().max() for i in range(len(df.columns))]
+		data = widths[-len(df.columns):]
+		for i in range(len(lengths)):
+			for j in range(len(lengths)):
+				if lengths[i] > lengths[j]:
+					assert data[i] >= data[j] - snap
+
+
+def test_font_metrics():
+	# as many characters, wide glyphs take wider columns when measured in a font
+	df = pd.DataFrame({'wide': ['WWWWWWWWWW', 'MMMMMMMM'], 'narrow': ['iiiiiiiiii', 'llllllll']})
+	table_width = 30 * CM
+	assert layout.column_widths(df, table_width, index=False) == [15 * CM, 15 * CM]
+
+	wide, narrow = layout.column_widths(df, table_width, index=False, min_col_w=0, font_name='Calibri')
+	assert wide + narrow == table_width
+	advances = metrics.glyph_widths('Calibri')
+	ratio = advances[ord('W') - 32] / advances[ord('i') - 32]
+	assert ratio > 3
+	assert abs(wide / narrow - ratio) < 1e-3
+
+	# metric compatible fonts measure alike
+	assert layout.column_widths(df, table_width, index=False, min_col_w=0, font_name='Carlito') == [wide, narrow]
+
+
+def test_font_metrics_cache(monkeypatch):
+	df = pd.DataFrame({'a': ['cached text', 'more'], 'b': ['another', 'cached text']}, index=['r1', 'r2'])
+	monkeypatch.delitem(metrics._caches, 'Arial', raising=False)
+	measured = []
+	glyph_widths = metrics.glyph_widths
+	monkeypatch.setattr(metrics, 'glyph_widths', lambda font_name: measured.append(font_name) or glyph_widths(font_name))
+
+	first = layout.column_widths(df, 20 * CM, font_name='Arial')
+	assert measured == ['Arial']
+	# distinct strings of the index and both columns
+	assert len(metrics._caches['Arial']) == 5
+
+	# measured strings are read back from the cache
+	second = layout.column_widths(df, 20 * CM, font_name='Arial')
+	assert second == first
+	assert measured == ['Arial']
+	assert len(metrics._caches['Arial']) == 5
+
+
+def test_create_table_measures_text_font():
+	# create_table sizes columns in its text font
+	handler = pandasPPT.Handler()
+	ppt = pptx.Presentation(TEMPLATE)
+	slide_layout = handler.map_layouts(ppt)['Two Content Modified']
+	slide = ppt.slides.add_slide(slide_layout)
+	df = pd.DataFrame({'wide': ['WWWWWWWWWWWWWWWWWWWW'], 'narrow': ['iiiiiiiiiiiiiiiiiiii']}, index=['r'])
+	table = handler.create_table(slide.placeholders[handler.map_shapes(slide_layout)['Table Placeholder 8']], df, text_font_name='Calibri', engine='xml').table
+	index, wide, narrow = [column.width for column in table.columns]
+	# the same number of characters, measured by their glyph widths rather than counted
+	assert wide > narrow
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""pandasDOC create_table of an iterator of dataframe chunks"""
+
+import docx
+import pandas as pd
+import pytest
+
+from mspandas import pandasDOC
+
+
+def chunks(df, size):
+	for start in range(0, len(df), size):
+		yield df.iloc[start:start + size]
+
+
+def test_chunks_match_dataframe():
+	df = pd.DataFrame({'a': range(10), 'b': [str(i) for i in range(10)]}, index=['r{}'.format(i) for i in range(10)])
+	handler = pandasDOC.Handler()
+	whole = handler.create_table(docx.Document(), df.copy(), engine='xml')
+	chunked = handler.create_table(docx.Document(), chunks(df, 3))
+	assert [cell.text for cell in chunked._cells] == [cell.text for cell in whole._cells]
+
+
+def test_empty_iterator():
+	handler = pandasDOC.Handler()
+	with pytest.raises(ValueError, match='empty iterator'):
+		handler.create_table(docx.Document(), iter([]))
+	# a generator rendering a table of an empty generator, StopIteration would surface as RuntimeError
+	def tables():
+		yield handler.create_table(docx.Document(), chunks(pd.DataFrame({'a': []}), 5))
+	with pytest.raises(ValueError, match='empty iterator'):
+		list(tables())
+
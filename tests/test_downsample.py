@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Downsampled charts hold at most max_points rows, i.e. points of every series, however many series they have"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pptx
+
+from mspandas import downsample, pandasPPT
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'examples', 'example_report.pptx')
+
+
+def lttb_reference(x, y, max_points):
+	"""Largest-Triangle-Three-Buckets of a single series, point by point"""
+	n = len(y)
+	starts = list(downsample.buckets(n, max_points - 2))
+	ends = starts[1:] + [n]
+	picked = [0]
+	for b in range(len(starts) - 1):
+		a = picked[-1]
+		cx, cy = x[starts[b+1]:ends[b+1]].mean(), y[starts[b+1]:ends[b+1]].mean()
+		areas = [abs((x[a] - cx) * (y[i] - y[a]) - (x[a] - x[i]) * (cy - y[a])) for i in range(starts[b], ends[b])]
+		picked.append(starts[b] + int(np.argmax(areas)))
+	return picked + [n - 1]
+
+
+def walks(rows, series, seed=0):
+	rng = np.random.RandomState(seed)
+	# series of very different scales
+	values = rng.randn(rows, series).cumsum(axis=0) * 10.0 ** rng.randint(0, 6, series)
+	return pd.DataFrame(values, index=pd.date_range('2024-01-01', periods=rows, freq='min'), columns=['s{}'.format(i) for i in range(series)])
+
+
+def test_single_series():
+	df = walks(5000, 1)
+	x = downsample.positions(df.index)
+	assert list(downsample.lttb(x, df.values, 97)) == lttb_reference(x, df.values[:, 0], 97)
+	sampled, dropped = downsample.frame(df, 97)
+	assert list(sampled.index) == list(df.index[lttb_reference(x, df.values[:, 0], 97)])
+	assert dropped.tolist() == [5000 - 97]
+
+
+def test_budget_holds_for_many_series():
+	for rows,series,max_points in ((50000, 50, 1000), (5000, 50, 500), (3000, 7, 100)):
+		df = walks(rows, series)
+		for method in downsample.METHODS:
+			sampled, dropped = downsample.frame(df, max_points, method=method)
+			assert len(sampled) <= max_points
+			assert sampled.index.is_monotonic_increasing
+			assert list(dropped.index) == list(df.columns)
+			assert (dropped == rows - len(sampled)).all()
+			# the first and last rows, and the extremes of the series of the largest scale, are kept
+			assert sampled.index[0] == df.index[0] and sampled.index[-1] == df.index[-1]
+			if method == 'minmax':
+				widest = (df.max() - df.min()).idxmax()
+				assert df[widest].idxmax() in sampled.index and df[widest].idxmin() in sampled.index
+
+
+def test_chart_reports_dropped_points_per_series():
+	df = walks(5000, 5)
+	ppt = pptx.Presentation(TEMPLATE)
+	slide_layout = pandasPPT.Handler().map_layouts(ppt)['Two Content Modified']
+	slide = ppt.slides.add_slide(slide_layout)
+	chart = pandasPPT.Handler().create_chart(slide.placeholders[pandasPPT.Handler().map_shapes(slide_layout)['Chart Placeholder 10']], df,
+											 max_points=500, engine='numpy', data_labels=False)
+	plot = chart.chart.plots[0]
+	assert len(plot.categories) <= 500
+	assert all(len(series.values) == len(plot.categories) for series in plot.series)
+	assert chart.dropped_points == dict((name, 5000 - len(plot.categories)) for name in df.columns)
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""create_paginated_table adds its slides in one pass, with the lowest free slide part names"""
+
+import io
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pptx
+
+from mspandas import pandasPPT
+from mspandas.template import TemplateIndex
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'examples', 'example_report.pptx')
+LAYOUT = 'Two Content Modified'
+PLACEHOLDER = 'Table Placeholder 8'
+
+
+def delete_slide(ppt, position):
+	sldId = ppt.slides._sldIdLst[position]
+	ppt.slides._sldIdLst.remove(sldId)
+	ppt.part.drop_rel(sldId.rId)
+
+
+def presentation_with_gap():
+	"""Template with two slides added and its first slide deleted, so that the slide part names have a gap"""
+	ppt = pptx.Presentation(TEMPLATE)
+	slide_layout = pandasPPT.Handler().map_layouts(ppt)[LAYOUT]
+	for i in range(2):
+		ppt.slides.add_slide(slide_layout)
+	delete_slide(ppt, 0)
+	return ppt, slide_layout
+
+
+def test_partnames_after_deleted_slide():
+	df = pd.DataFrame(np.arange(120).reshape(40, 3), columns=['a', 'b', 'c'])
+
+	ppt, slide_layout = presentation_with_gap()
+	tables = pandasPPT.Handler().create_paginated_table(ppt, slide_layout, PLACEHOLDER, df, rows_per_slide=10)
+	assert len(tables) == 4
+
+	# slide1.xml is free, python-pptx add_slide would name the first new slide slide3.xml (len(slides) + 1) a second time
+	partnames = [slide.part.partname for slide in ppt.slides]
+	assert partnames == ['/ppt/slides/slide{}.xml'.format(n) for n in (2, 3, 1, 4, 5, 6)]
+
+	blob = io.BytesIO()
+	ppt.save(blob)
+	names = zipfile.ZipFile(blob).namelist()
+	assert len(names) == len(set(names))
+	blob.seek(0)
+	assert len(pptx.Presentation(blob).slides) == 2 + len(tables)
+
+
+def test_default_index_is_memoized():
+	ppt = pptx.Presentation(TEMPLATE)
+	index = TemplateIndex.load(ppt, cache_dir=None)
+	assert TemplateIndex.load(ppt, cache_dir=None) is index
+	assert index.placeholder(LAYOUT, PLACEHOLDER) == TemplateIndex.from_presentation(ppt).placeholder(LAYOUT, PLACEHOLDER)
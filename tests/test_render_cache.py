@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""A table rendered from the render cache takes the position of its own placeholder and the size of the cached table"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pptx
+from lxml import etree
+from pptx.oxml.ns import qn
+
+from mspandas import pandasPPT
+from mspandas.cache import RenderCache
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'examples', 'example_report.pptx')
+LAYOUT = 'Two Content Modified'
+PLACEHOLDER = 'Table Placeholder 8'
+
+
+class CountingCache(RenderCache):
+
+	def __init__(self, **kwargs):
+		RenderCache.__init__(self, **kwargs)
+		self.hits = 0
+
+	def get(self, key):
+		entry = RenderCache.get(self, key)
+		self.hits += not entry is None
+		return entry
+
+
+def placeholder(ppt, left=None, top=None):
+	handler = pandasPPT.Handler()
+	slide_layout = handler.map_layouts(ppt)[LAYOUT]
+	slide = ppt.slides.add_slide(slide_layout)
+	shape = slide.placeholders[handler.map_shapes(slide_layout)[PLACEHOLDER]]
+	if not left is None:
+		shape.left, shape.top = left, top
+	return shape
+
+
+def test_cache_hit_keeps_placeholder_position():
+	df = pd.DataFrame(np.arange(12).reshape(4, 3) * 1.5, columns=['a', 'b', 'c'])
+	cache = CountingCache(cache_dir=None)
+	handler = pandasPPT.Handler(cache=cache)
+	ppt = pptx.Presentation(TEMPLATE)
+
+	# create_table formats the dataframe it is given in place
+	first = handler.create_table(placeholder(ppt), df.copy())
+	second = handler.create_table(placeholder(ppt, left=6000000, top=500000), df.copy())
+	assert cache.hits == 1
+
+	assert (second.left, second.top) == (6000000, 500000)
+	assert (first.left, first.top) != (second.left, second.top)
+	assert (second.width, second.height) == (first.width, first.height)
+	graphic = lambda shape: etree.tostring(shape._element.find(qn('a:graphic')))
+	assert graphic(second) == graphic(first)
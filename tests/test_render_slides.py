@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""render_slides in a process pool renders the same presentation, part by part, as rendering serially"""
+
+import os
+
+import pandas as pd
+import numpy as np
+from lxml import etree
+from pptx.opc.package import XmlPart
+
+from mspandas import pandasPPT
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'examples', 'example_report.pptx')
+
+
+def specs():
+	rng = np.random.RandomState(0)
+	out = []
+	for i in range(6):
+		df = pd.DataFrame(rng.rand(4, 3) * 100, columns=['a', 'b', 'c'], index=['s{}'.format(i)] + ['r{}'.format(j) for j in range(3)])
+		if i % 3 == 2:
+			out.append(('Two Content Modified', 'Chart Placeholder 10', df, dict(chart_title='chart {}'.format(i), engine='numpy' if i == 5 else 'chartdata')))
+		else:
+			out.append(('Two Content Modified', 'Table Placeholder 8', df, dict(engine='xml')))
+	return out
+
+
+def describe(ppt):
+	"""Return the layout and the text of the first table cell or the chart title of every slide"""
+	slides = []
+	for slide in ppt.slides:
+		text = []
+		for shape in slide.shapes:
+			if shape.has_table:
+				text.append(shape.table.cell(1, 0).text)
+			elif shape.has_chart and shape.chart.has_title:
+				text.append(shape.chart.chart_title.text_frame.text)
+		slides.append((slide.slide_layout.name, tuple(text)))
+	return slides
+
+
+def parts(ppt):
+	"""Return every part of the package by name: its content type, relationships and content, xml in canonical form"""
+	out = {}
+	for part in ppt.part.package.iter_parts():
+		rels = sorted((rel.rId, rel.reltype, rel.target_ref) for rel in part.rels.values())
+		content = etree.tostring(part._element, method='c14n') if isinstance(part, XmlPart) else part.blob
+		out[str(part.partname)] = (part.content_type, rels, content)
+	return out
+
+
+def test_parallel_matches_serial_on_template_with_slides():
+	handler = pandasPPT.Handler()
+	template_slides = len(pandasPPT.pptx.Presentation(TEMPLATE).slides)
+	assert template_slides > 0
+
+	serial = handler.render_slides(TEMPLATE, specs(), processes=1)
+	parallel = handler.render_slides(TEMPLATE, specs(), processes=2, batch_size=2)
+
+	assert len(serial.slides) == template_slides + len(specs())
+	assert describe(parallel) == describe(serial)
+
+	# slides, charts and their embedded workbooks, with the same names, relationships and order (the presentation part)
+	expected = parts(serial)
+	rendered = parts(parallel)
+	assert sorted(rendered) == sorted(expected)
+	for name in expected:
+		assert rendered[name] == expected[name], name
+	template = parts(pandasPPT.pptx.Presentation(TEMPLATE))
+	added = [name for name in expected if not name in template]
+	assert sum(name.startswith('/ppt/charts/') for name in added) == sum(name.startswith('/ppt/embeddings/') for name in added) == \
+		sum(spec[1] == 'Chart Placeholder 10' for spec in specs())
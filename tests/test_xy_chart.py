@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""XY and bubble charts are written from the dataframe columns by default, the same chart python-pptx ChartData writes point by point"""
+
+import io
+import os
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pptx
+from lxml import etree
+from pptx.chart.data import XySeriesData, BubbleSeriesData
+from pptx.enum.chart import XL_CHART_TYPE
+
+from mspandas import pandasPPT
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), '..', 'examples', 'example_report.pptx')
+LAYOUT = 'Two Content Modified'
+PLACEHOLDER = 'Chart Placeholder 10'
+
+
+def chart_placeholder():
+	handler = pandasPPT.Handler()
+	ppt = pptx.Presentation(TEMPLATE)
+	slide_layout = handler.map_layouts(ppt)[LAYOUT]
+	slide = ppt.slides.add_slide(slide_layout)
+	return slide.placeholders[handler.map_shapes(slide_layout)[PLACEHOLDER]]
+
+
+def rendered(chart):
+	"""Return the chart xml and the cells of its embedded workbook"""
+	worksheet = openpyxl.load_workbook(io.BytesIO(chart.part.chart_workbook.xlsx_part.blob)).active
+	return etree.tostring(chart._chartSpace), [[cell.value for cell in row] for row in worksheet.iter_rows()]
+
+
+def xy_frame(points=200):
+	rng = np.random.RandomState(0)
+	return pd.DataFrame({'x': rng.rand(points) * 10, 'y1': rng.randn(points), 'y2': rng.randint(0, 50, points), 's': rng.randint(1, 9, points)})
+
+
+def counted(add_data_point, added):
+	def wrapper(self, *args, **kwargs):
+		added.append(1)
+		return add_data_point(self, *args, **kwargs)
+	return wrapper
+
+
+def test_default_engine_writes_columns(monkeypatch):
+	added = []
+	for series_data in (XySeriesData, BubbleSeriesData):
+		monkeypatch.setattr(series_data, 'add_data_point', counted(series_data.add_data_point, added))
+
+	handler = pandasPPT.Handler()
+	for chart_type,kwargs in ((XL_CHART_TYPE.XY_SCATTER, {}), (XL_CHART_TYPE.BUBBLE, dict(size_column='s'))):
+		df = xy_frame() if chart_type == XL_CHART_TYPE.BUBBLE else xy_frame().drop(columns='s')
+		del added[:]
+		default = handler.create_chart(chart_placeholder(), df.copy(), chart_type=chart_type, x_column='x', **kwargs)
+		# one point per series to lay out the chart, then the columns
+		assert len(added) <= len(df.columns)
+
+		chartdata = handler.create_chart(chart_placeholder(), df.copy(), chart_type=chart_type, x_column='x', engine='chartdata', **kwargs)
+		assert rendered(default.chart) == rendered(chartdata.chart)
+
+
+def series_xml(chart):
+	return [etree.tostring(ser) for ser in chart._chartSpace.xpath('.//c:ser')]
+
+
+def test_refresh_keeps_xy_data():
+	handler = pandasPPT.Handler()
+	for chart_type,kwargs in ((XL_CHART_TYPE.XY_SCATTER_LINES, {}), (XL_CHART_TYPE.BUBBLE, dict(size_column='s'))):
+		old, new = xy_frame(50), xy_frame(80).iloc[::-1] * 2
+		if chart_type != XL_CHART_TYPE.BUBBLE:
+			old, new = old.drop(columns='s'), new.drop(columns='s')
+		for engine in ('chartdata', 'numpy'):
+			chart = handler.create_chart(chart_placeholder(), old.copy(), chart_type=chart_type, x_column='x', **kwargs)
+			handler.refresh_chart(chart, new.copy(), engine=engine, x_column='x', **kwargs)
+			assert chart.chart.chart_type == chart_type
+			assert len(chart.chart._chartSpace.xpath('.//c:cat')) == 0
+
+			expected = handler.create_chart(chart_placeholder(), new.copy(), chart_type=chart_type, x_column='x', engine=engine, **kwargs)
+			assert series_xml(chart.chart) == series_xml(expected.chart)
+			assert rendered(chart.chart)[1] == rendered(expected.chart)[1]